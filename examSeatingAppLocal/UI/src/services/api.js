@@ -1,5 +1,6 @@
 import axios from 'axios'
 import { useAppStore } from '@/stores/app'
+import { useAuthStore } from '@/stores/auth'
 
 // Create axios instance with base configuration
 const api = axios.create({
@@ -15,6 +16,11 @@ api.interceptors.request.use(
   (config) => {
     const appStore = useAppStore()
     appStore.setLoading(true)
+    // Session token from login, checked by the API when authentication is required
+    const token = localStorage.getItem('token')
+    if (token) {
+      config.headers.Authorization = `Bearer ${token}`
+    }
     return config
   },
   (error) => {
@@ -34,6 +40,16 @@ api.interceptors.response.use(
   (error) => {
     const appStore = useAppStore()
     appStore.setLoading(false)
+
+    // Token expired, revoked or signed with another key: back to the login page.
+    // Failed logins (also 401) stay on it with their error.
+    if (error.response?.status === 401 && error.config?.url !== '/auth/login') {
+      useAuthStore().endSession()
+      // Imported here: the router imports the auth store, which imports this module
+      import('@/router').then(({ default: router }) => router.push('/login'))
+      appStore.showError('Your session has ended, please log in again')
+      return Promise.reject(error)
+    }
     
     // Handle common errors with detailed messages
     let message = 'An error occurred'
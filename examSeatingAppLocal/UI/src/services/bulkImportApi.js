@@ -1,5 +1,10 @@
 import api from './api'
 
+// Milliseconds between import job status checks
+const JOB_POLL_INTERVAL = 1000
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms))
+
 export const bulkImportApi = {
   // Validate Excel file without importing
   async validateExcel(file) {
@@ -14,8 +19,8 @@ export const bulkImportApi = {
     return response.data
   },
 
-  // Import Excel file
-  async importExcel(file) {
+  // Import Excel file; the import runs in the background, onProgress gets the job while it does
+  async importExcel(file, onProgress) {
     const formData = new FormData()
     formData.append('file', file)
     
@@ -24,11 +29,11 @@ export const bulkImportApi = {
         'Content-Type': 'multipart/form-data'
       }
     })
-    return response.data
+    return this.waitForImport(response.data.jobId, onProgress)
   },
 
-  // Import selected classes from Excel file
-  async selectiveImportExcel(file, selectedClassData) {
+  // Import selected classes from Excel file, in the background like importExcel
+  async selectiveImportExcel(file, selectedClassData, onProgress) {
     const formData = new FormData()
     formData.append("file", file)
     formData.append("selected_classes", JSON.stringify(selectedClassData))
@@ -38,9 +43,31 @@ export const bulkImportApi = {
         "Content-Type": "multipart/form-data"
       }
     })
+    return this.waitForImport(response.data.jobId, onProgress)
+  },
+
+  // Get an import job: status, progress and, once finished, result or error
+  async getImportJob(jobId) {
+    const response = await api.get(`/bulk-import/jobs/${jobId}`)
     return response.data
   },
 
+  // Poll an import job until it finishes; resolves with its result, a failed
+  // import rejects with an error shaped like the response of a failed request
+  async waitForImport(jobId, onProgress) {
+    for (;;) {
+      const job = await this.getImportJob(jobId)
+      if (onProgress) onProgress(job)
+      if (job.status === 'completed') return job.result
+      if (job.status === 'failed') {
+        const error = new Error(job.error.detail)
+        error.response = { status: job.error.statusCode, data: { detail: job.error.detail } }
+        throw error
+      }
+      await sleep(JOB_POLL_INTERVAL)
+    }
+  },
+
   // Get template information
   async getTemplate() {
     const response = await api.get('/bulk-import/template')
@@ -84,7 +84,8 @@ async function transformNewFormatResponse(responseData, scheduleData) {
       studentName: student.studentName || 'Unknown Student',
       className: student.className, // This now includes shift (e.g., "Computer Science - Morning")
       classId: student.classId,
-      language: student.language // Include language information
+      language: student.language, // Include language information
+      seat: student.seat // Seat coordinate on the room grid: { row, bench, seat }
     }))
 
     roomAssignments.push({
@@ -93,6 +94,7 @@ async function transformNewFormatResponse(responseData, scheduleData) {
       room_building: roomData?.roomBuilding || 'Unknown Building',
       room_floor: roomData?.roomFloor || 'Unknown Floor',
       room_capacity: roomData?.roomCapacity || 50,
+      layout: responseData.room_layouts?.[roomNumber], // Seat grid used for this room
       students: transformedStudents
     })
   }
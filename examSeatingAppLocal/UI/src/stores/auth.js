@@ -33,6 +33,15 @@ export const useAuthStore = defineStore('auth', () => {
   }
 
   const logout = () => {
+    // Revoke the token server-side; the local session ends either way
+    if (token.value) {
+      api.post('/auth/logout', null, { headers: { Authorization: `Bearer ${token.value}` } }).catch(() => {})
+    }
+    endSession()
+  }
+
+  // Forget the session locally, e.g. once the API has refused its token
+  const endSession = () => {
     token.value = null
     user.value = null
     localStorage.removeItem('token')
@@ -62,6 +71,7 @@ export const useAuthStore = defineStore('auth', () => {
     // Actions
     login,
     logout,
+    endSession,
     initializeAuth
   }
 })
\ No newline at end of file
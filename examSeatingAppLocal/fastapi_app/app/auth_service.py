@@ -1,71 +1,60 @@
-import sqlite3
 from typing import List, Optional
 from fastapi import HTTPException
-from .database import get_db_cursor
+from .auth_tokens import SessionTokens
+from .data_version import writes_tables
 from .models import UserModel, UserResponseModel, LoginRequest
+from .repository import DuplicateKeyError, get_repository
 
 class AuthService:
     @staticmethod
     def authenticate_user(username: str, password: str) -> Optional[UserResponseModel]:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                "SELECT id, username, name, created_at FROM users WHERE username = ? AND password = ?",
-                (username, password)
+        user = get_repository().authenticate_user(username, password)
+        
+        if user:
+            return UserResponseModel(
+                id=user[0],
+                username=user[1],
+                name=user[2],
+                created_at=user[3]
             )
-            user = cursor.fetchone()
-            
-            if user:
-                return UserResponseModel(
-                    id=user[0],
-                    username=user[1],
-                    name=user[2],
-                    created_at=user[3]
-                )
-            return None
+        return None
     
     @staticmethod
     def get_all_users() -> List[UserResponseModel]:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                "SELECT id, username, name, created_at FROM users WHERE username != 'admin' ORDER BY created_at DESC"
+        return [
+            UserResponseModel(
+                id=user[0],
+                username=user[1],
+                name=user[2],
+                created_at=user[3]
             )
-            users = cursor.fetchall()
-            
-            return [
-                UserResponseModel(
-                    id=user[0],
-                    username=user[1],
-                    name=user[2],
-                    created_at=user[3]
-                )
-                for user in users
-            ]
+            for user in get_repository().list_users()
+        ]
     
     @staticmethod
+    @writes_tables("users")
     def create_user(user_data: UserModel) -> None:
-        with get_db_cursor() as cursor:
+        with get_repository().transaction() as tx:
             try:
-                cursor.execute(
-                    "INSERT INTO users (username, password, name) VALUES (?, ?, ?)",
-                    (user_data.username, user_data.password, user_data.name)
-                )
-            except sqlite3.IntegrityError:
+                tx.create_user(user_data.username, user_data.password, user_data.name)
+            except DuplicateKeyError:
                 raise HTTPException(
                     status_code=400,
                     detail="Username already exists"
                 )
     
     @staticmethod
+    @writes_tables("users")
     def delete_user(user_id: int) -> None:
-        with get_db_cursor() as cursor:
+        with get_repository().transaction() as tx:
             # Prevent deletion of admin user
-            cursor.execute("SELECT username FROM users WHERE id = ?", (user_id,))
-            user = cursor.fetchone()
+            username = tx.get_username(user_id)
             
-            if not user:
+            if username is None:
                 raise HTTPException(status_code=404, detail="User not found")
             
-            if user[0] == "admin":
+            if username == "admin":
                 raise HTTPException(status_code=400, detail="Cannot delete admin user")
             
-            cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
\ No newline at end of file
+            tx.delete_user(user_id)
+        SessionTokens.revoke_user(user_id)
\ No newline at end of file
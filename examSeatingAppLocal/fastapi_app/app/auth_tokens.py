@@ -0,0 +1,275 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from .config import settings
+from .models import UserResponseModel
+from .repository import get_repository
+
+
+# Bytes of a generated signing key; stored keys shorter than this are refused
+SECRET_BYTES = 32
+
+
+def _stored_secret() -> bytes:
+    """
+    The signing key kept in AUTH_SECRET_PATH, created on first use, so that
+    tokens survive restarts. Falls back to a key living as long as the
+    process when the file cannot be written.
+    """
+    path = settings.AUTH_SECRET_PATH or settings.DATABASE_PATH + ".secret"
+    try:
+        # Written in full under a temporary name, then linked into place: the key file is never
+        # seen half written, and processes starting together agree on whichever key was linked first
+        fd, temp_path = tempfile.mkstemp(prefix=".secret-", dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(SECRET_BYTES))
+                f.flush()
+                os.fsync(f.fileno())
+            os.link(temp_path, path)
+        finally:
+            os.unlink(temp_path)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        print(f"Warning: Cannot create session token key '{path}' ({e}), tokens will end with this process")
+        return secrets.token_bytes(SECRET_BYTES)
+
+    with open(path) as f:
+        text = f.read().strip()
+    try:
+        secret = bytes.fromhex(text)
+    except ValueError:
+        secret = b""
+    if len(secret) < SECRET_BYTES:
+        raise RuntimeError(f"Session token key '{path}' is invalid; remove it to have a new one created")
+    return secret
+
+
+class TokenClaims(NamedTuple):
+    user_id: int
+    username: str
+    name: str
+    issued_at: int
+    expires_at: int
+    token_id: str
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+class SessionTokens:
+    """
+    Stateless session tokens: "<payload>.<signature>", the payload being the
+    user and expiry as base64url JSON and the signature its HMAC-SHA256 with
+    AUTH_SECRET. Verifying needs no database lookup.
+
+    Verified tokens are kept in an LRU so repeat requests skip decoding and
+    the HMAC; a hit only checks expiry and revocation. Revocations (logout,
+    deleted users) take effect at once in this process. They are also stored
+    (revoked tokens in the repository, deleted users by their absence), and
+    checked with one indexed lookup when a token is first verified and again
+    once it has been cached for AUTH_REVOCATION_CHECK seconds, so other
+    workers and restarted processes refuse them too.
+    """
+
+    _lock = threading.Lock()
+    # Key used without AUTH_SECRET, see _stored_secret
+    _default_secret: Optional[bytes] = None
+    # token -> (claims, time the stored revocations were last checked)
+    _verified: "OrderedDict[str, Tuple[TokenClaims, float]]" = OrderedDict()
+    # token id -> expiry, pruned once expired
+    _revoked_tokens: Dict[str, int] = {}
+    _revoked_users: Set[int] = set()
+    _hits = 0
+    _misses = 0
+    _rejected = 0
+
+    @classmethod
+    def _secret(cls) -> bytes:
+        if settings.AUTH_SECRET:
+            return settings.AUTH_SECRET.encode("utf-8")
+        if cls._default_secret is None:
+            with cls._lock:
+                if cls._default_secret is None:
+                    cls._default_secret = _stored_secret()
+        return cls._default_secret
+
+    @classmethod
+    def _sign(cls, payload: str) -> str:
+        return _b64encode(hmac.new(cls._secret(), payload.encode("ascii"), hashlib.sha256).digest())
+
+    @classmethod
+    def issue(cls, user: UserResponseModel) -> str:
+        issued_at = int(time.time())
+        claims = {
+            "sub": user.id,
+            "usr": user.username,
+            "name": user.name,
+            "iat": issued_at,
+            "exp": issued_at + settings.AUTH_TOKEN_TTL,
+            "jti": secrets.token_hex(8),
+        }
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        return f"{payload}.{cls._sign(payload)}"
+
+    @classmethod
+    def _decode(cls, token: str) -> TokenClaims:
+        # Tokens are base64url text: anything else (which the signing and comparison below reject) is malformed
+        if not token.isascii():
+            raise _unauthorized("Invalid token")
+        payload, _, signature = token.partition(".")
+        if not signature or not hmac.compare_digest(signature, cls._sign(payload)):
+            raise _unauthorized("Invalid token")
+        try:
+            claims = json.loads(_b64decode(payload))
+            return TokenClaims(
+                claims["sub"], claims["usr"], claims["name"], claims["iat"], claims["exp"], claims["jti"]
+            )
+        except (ValueError, KeyError, TypeError):
+            raise _unauthorized("Invalid token")
+
+    @classmethod
+    def verify(cls, token: str) -> TokenClaims:
+        """Claims of a valid token; raises 401 if it is malformed, forged, expired or revoked"""
+        with cls._lock:
+            cached = cls._verified.get(token)
+            if cached is not None:
+                cls._hits += 1
+                cls._verified.move_to_end(token)
+
+        now = time.time()
+        if cached is None:
+            try:
+                claims = cls._decode(token)
+            except HTTPException:
+                with cls._lock:
+                    cls._rejected += 1
+                raise
+            checked_at = None
+            with cls._lock:
+                cls._misses += 1
+        else:
+            claims, checked_at = cached
+
+        if claims.expires_at <= now:
+            detail = "Token expired"
+        elif claims.token_id in cls._revoked_tokens or claims.user_id in cls._revoked_users:
+            detail = "Token revoked"
+        elif checked_at is not None and now - checked_at < settings.AUTH_REVOCATION_CHECK:
+            return claims
+        elif get_repository().token_revoked(claims.token_id, claims.user_id):
+            detail = "Token revoked"
+        else:
+            if settings.AUTH_TOKEN_CACHE_SIZE > 0:
+                with cls._lock:
+                    cls._verified[token] = (claims, now)
+                    cls._verified.move_to_end(token)
+                    while len(cls._verified) > settings.AUTH_TOKEN_CACHE_SIZE:
+                        cls._verified.popitem(last=False)
+            return claims
+
+        with cls._lock:
+            cls._rejected += 1
+            cls._verified.pop(token, None)
+        raise _unauthorized(detail)
+
+    @classmethod
+    def revoke(cls, claims: TokenClaims) -> None:
+        """Reject a token from now on, in every process"""
+        now = time.time()
+        with cls._lock:
+            cls._revoked_tokens = {
+                token_id: expires_at for token_id, expires_at in cls._revoked_tokens.items() if expires_at > now
+            }
+            cls._revoked_tokens[claims.token_id] = claims.expires_at
+        with get_repository().transaction() as tx:
+            tx.revoke_token(claims.token_id, claims.expires_at)
+
+    @classmethod
+    def revoke_user(cls, user_id: int) -> None:
+        """
+        Reject every token of a deleted user at once in this process (other
+        processes refuse them once the user is gone); user ids are never reused
+        """
+        with cls._lock:
+            cls._revoked_users.add(user_id)
+
+    @classmethod
+    def stats(cls) -> Dict[str, any]:
+        with cls._lock:
+            return {
+                "required": settings.AUTH_REQUIRED,
+                "hits": cls._hits,
+                "misses": cls._misses,
+                "rejected": cls._rejected,
+                "cached": len(cls._verified),
+                "max_cached": settings.AUTH_TOKEN_CACHE_SIZE,
+                "revoked_tokens": len(cls._revoked_tokens),
+                "revoked_users": len(cls._revoked_users),
+            }
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._verified.clear()
+            cls._revoked_tokens.clear()
+            cls._revoked_users.clear()
+            cls._hits = 0
+            cls._misses = 0
+            cls._rejected = 0
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+async def require_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+) -> Optional[TokenClaims]:
+    """
+    Route dependency: the claims of the request's bearer token. With
+    AUTH_REQUIRED on, a missing or invalid token is refused with 401;
+    otherwise both give None, so a stale token (expired, or signed with an
+    older key) left in a client does not lock it out. Async: a cached token
+    is checked without blocking and other ones with one indexed lookup,
+    cheaper than the thread pool FastAPI would otherwise run it in on every
+    request.
+    """
+    if credentials is None:
+        if settings.AUTH_REQUIRED:
+            raise _unauthorized("Not authenticated")
+        return None
+    try:
+        return SessionTokens.verify(credentials.credentials)
+    except HTTPException:
+        if settings.AUTH_REQUIRED:
+            raise
+        return None
+
+
+async def require_session(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+) -> TokenClaims:
+    """Route dependency for user management: a valid token is needed even with AUTH_REQUIRED off"""
+    if credentials is None:
+        raise _unauthorized("Not authenticated")
+    return SessionTokens.verify(credentials.credentials)
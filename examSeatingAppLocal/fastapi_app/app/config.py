@@ -1,9 +1,45 @@
 import os
-from typing import List
+from typing import List, Optional
 
 class Settings:
+    # Storage backend: "sqlite" (DATABASE_PATH) or "memory" (all data in this process)
+    STORAGE_BACKEND: str = os.environ.get("STORAGE_BACKEND", "sqlite")
+    MEMORY_SNAPSHOT_PATH: Optional[str] = os.environ.get("MEMORY_SNAPSHOT_PATH")  # Memory backend: load from / save to this file
+    MEMORY_SNAPSHOT_INTERVAL: float = 60.0  # Seconds between snapshots of changed data, 0 saves only at shutdown
+    
     # Database settings
     DATABASE_PATH: str = "database.db"
+    DB_POOL_SIZE: int = 8  # Pooled connections
+    DB_POOL_TIMEOUT: float = 10.0  # Seconds to wait for a free connection before answering 503
+    DB_BUSY_TIMEOUT_MS: int = 5000  # How long a connection waits on a locked database
+    DB_MMAP_SIZE: int = 256 * 1024 * 1024  # Bytes of the database file to memory-map
+    
+    # Executors for blocking work called from async routes
+    DB_EXECUTOR_WORKERS: int = 4  # Threads for SQLite imports and writes, at most DB_POOL_SIZE
+    PARSE_EXECUTOR_WORKERS: int = min(2, os.cpu_count() or 1)  # Processes for Excel parsing
+    EXCEL_PARALLEL_MIN_SHEETS: int = 4  # Workbooks with this many sheets are split across the parsing processes, 0 never splits
+    EXECUTOR_MAX_QUEUE: int = 32  # Calls waiting per executor before answering 503
+    
+    # Uploads: refused with 413 as soon as a limit is passed, spooled to a temp file past UPLOAD_SPOOL_BYTES
+    UPLOAD_MAX_BYTES: int = 64 * 1024 * 1024  # Largest multipart request body, 0 for no limit
+    EXCEL_UPLOAD_MAX_BYTES: int = 50 * 1024 * 1024  # Largest Excel file, 0 for no limit
+    CSV_UPLOAD_MAX_BYTES: int = 10 * 1024 * 1024  # Largest CSV file, 0 for no limit
+    UPLOAD_SPOOL_BYTES: int = 1024 * 1024  # Uploads kept in memory up to this size
+    
+    # Background Excel imports (/bulk-import/excel and /excel/selective)
+    IMPORT_JOB_WORKERS: int = 2  # Imports parsing or writing at the same time; others wait their turn
+    IMPORT_JOB_MAX_PENDING: int = 32  # Unfinished imports before new ones are answered 503
+    IMPORT_JOB_TTL: int = 3600  # Seconds a finished import's status and result are kept
+    
+    # Session tokens: HMAC-signed with AUTH_SECRET, or when unset with a random key
+    # created once in AUTH_SECRET_PATH (default: DATABASE_PATH + ".secret")
+    AUTH_SECRET: Optional[str] = os.environ.get("AUTH_SECRET")
+    AUTH_SECRET_PATH: Optional[str] = os.environ.get("AUTH_SECRET_PATH")
+    AUTH_TOKEN_TTL: int = 8 * 3600  # Seconds a token stays valid
+    AUTH_TOKEN_CACHE_SIZE: int = 4096  # Verified tokens remembered, 0 verifies every time
+    AUTH_REVOCATION_CHECK: int = 30  # Seconds a cached token is trusted before stored revocations are checked again
+    # Refuse requests without a valid token; AUTH_REQUIRED=0 opts out while clients move to tokens
+    AUTH_REQUIRED: bool = os.environ.get("AUTH_REQUIRED", "").lower() not in ("0", "false", "no")
     
     # CORS settings
     CORS_ORIGINS: List[str] = ["*"]
@@ -14,6 +50,28 @@ class Settings:
     # Scheduling settings
     MAX_STUDENTS_PER_CLASS_PER_ROOM: int = 20
     
+    # Seat layout settings (used for rooms without a configured grid)
+    DEFAULT_BENCHES_PER_ROW: int = 3
+    DEFAULT_SEATS_PER_BENCH: int = 2
+    SEAT_LAYOUT_SEARCH_LIMIT: int = 20000  # Search steps per room before falling back to greedy
+    
+    # Batch scheduling: worker processes used to plan sessions in parallel
+    SCHEDULE_BATCH_WORKERS: int = min(4, os.cpu_count() or 1)
+    
+    # "optimized" schedule mode: default search budget before falling back to greedy placement
+    OPTIMIZATION_TIME_BUDGET_MS: int = 2000
+    
+    # Serve listings and schedule loading from an in-memory copy of classes, students and rooms.
+    # Opt-in: only this process's writes refresh it, so enable only when no other process writes.
+    READ_MODEL_ENABLED: bool = os.environ.get("READ_MODEL_ENABLED", "").lower() in ("1", "true", "yes")
+    
+    # Student search page size: default and largest allowed
+    STUDENT_SEARCH_DEFAULT_LIMIT: int = 20
+    STUDENT_SEARCH_MAX_LIMIT: int = 100
+    
+    # Schedule result cache (entries), 0 disables caching
+    SCHEDULE_CACHE_SIZE: int = 128
+    
     # API settings
     API_TITLE: str = "Exam Seating App API"
     API_DESCRIPTION: str = "API for managing exam seating arrangements"
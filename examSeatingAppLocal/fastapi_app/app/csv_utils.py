@@ -1,9 +1,12 @@
 import csv
 import io
-import sqlite3
 from typing import Dict, List, Any
 from fastapi import HTTPException, UploadFile
-from .database import get_db_cursor
+from .config import settings
+from .data_version import writes_tables
+from .executors import db_executor
+from .repository import DuplicateKeyError, get_repository
+from .uploads import spool_upload
 
 class CSVProcessor:
     @staticmethod
@@ -13,23 +16,26 @@ class CSVProcessor:
             raise HTTPException(status_code=400, detail="File must be a CSV file")
         
         try:
-            content = await file.read()
-            csv_content = content.decode('utf-8')
-            csv_reader = csv.DictReader(io.StringIO(csv_content))
-            
-            # Validate required columns
-            required_columns = ['className', 'rollNumber', 'studentName']
-            CSVProcessor._validate_csv_columns(csv_reader, required_columns)
-            
-            # Process CSV data
-            csv_data = CSVProcessor._extract_student_data(csv_reader)
+            # Read row by row from the spooled upload instead of decoding it whole
+            with await spool_upload(file, settings.CSV_UPLOAD_MAX_BYTES) as upload:
+                with io.TextIOWrapper(upload.open(), encoding='utf-8', newline='') as csv_file:
+                    csv_reader = csv.DictReader(csv_file)
+                    
+                    # Validate required columns
+                    required_columns = ['className', 'rollNumber', 'studentName']
+                    CSVProcessor._validate_csv_columns(csv_reader, required_columns)
+                    
+                    # Process CSV data
+                    csv_data = CSVProcessor._extract_student_data(csv_reader)
             
             if not csv_data:
                 raise HTTPException(status_code=400, detail="No valid data found in CSV file")
             
             # Group by class name and process
-            return CSVProcessor._process_student_classes(csv_data)
+            return await db_executor.run(CSVProcessor._process_student_classes, csv_data)
             
+        except HTTPException:
+            raise
         except UnicodeDecodeError:
             raise HTTPException(status_code=400, detail="File encoding error. Please ensure the CSV file is UTF-8 encoded")
         except csv.Error as e:
@@ -44,22 +50,25 @@ class CSVProcessor:
             raise HTTPException(status_code=400, detail="File must be a CSV file")
         
         try:
-            content = await file.read()
-            csv_content = content.decode('utf-8')
-            csv_reader = csv.DictReader(io.StringIO(csv_content))
-            
-            # Validate required columns
-            required_columns = ['roomNumber', 'roomCapacity', 'roomFloor', 'roomBuilding']
-            CSVProcessor._validate_csv_columns(csv_reader, required_columns)
-            
-            # Process CSV data
-            csv_data = CSVProcessor._extract_room_data(csv_reader)
+            # Read row by row from the spooled upload instead of decoding it whole
+            with await spool_upload(file, settings.CSV_UPLOAD_MAX_BYTES) as upload:
+                with io.TextIOWrapper(upload.open(), encoding='utf-8', newline='') as csv_file:
+                    csv_reader = csv.DictReader(csv_file)
+                    
+                    # Validate required columns
+                    required_columns = ['roomNumber', 'roomCapacity', 'roomFloor', 'roomBuilding']
+                    CSVProcessor._validate_csv_columns(csv_reader, required_columns)
+                    
+                    # Process CSV data
+                    csv_data = CSVProcessor._extract_room_data(csv_reader)
             
             if not csv_data:
                 raise HTTPException(status_code=400, detail="No valid data found in CSV file")
             
-            return CSVProcessor._process_exam_rooms(csv_data)
+            return await db_executor.run(CSVProcessor._process_exam_rooms, csv_data)
             
+        except HTTPException:
+            raise
         except UnicodeDecodeError:
             raise HTTPException(status_code=400, detail="File encoding error. Please ensure the CSV file is UTF-8 encoded")
         except csv.Error as e:
@@ -116,15 +125,40 @@ class CSVProcessor:
                     detail=f"Invalid room capacity '{row['roomCapacity']}' in row {row_num}. Must be a positive number."
                 )
             
+            # Optional seat grid columns: all three or none
+            layout = {}
+            for column in ('roomRows', 'benchesPerRow', 'seatsPerBench'):
+                value = (row.get(column) or '').strip()
+                if not value:
+                    continue
+                try:
+                    layout[column] = int(value)
+                    if layout[column] <= 0:
+                        raise ValueError(f"{column} must be a positive number")
+                except ValueError:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Invalid {column} '{value}' in row {row_num}. Must be a positive number."
+                    )
+            if layout and len(layout) != 3:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Incomplete seat layout in row {row_num}. Provide roomRows, benchesPerRow and seatsPerBench together."
+                )
+            
             csv_data.append({
                 'roomNumber': row['roomNumber'].strip(),
                 'roomCapacity': capacity,
                 'roomFloor': row.get('roomFloor', '').strip() or 'Not specified',
-                'roomBuilding': row.get('roomBuilding', '').strip() or 'Not specified'
+                'roomBuilding': row.get('roomBuilding', '').strip() or 'Not specified',
+                'roomRows': layout.get('roomRows'),
+                'benchesPerRow': layout.get('benchesPerRow'),
+                'seatsPerBench': layout.get('seatsPerBench')
             })
         return csv_data
 
     @staticmethod
+    @writes_tables("classes", "students")
     def _process_student_classes(csv_data: List[Dict[str, str]]) -> Dict[str, Any]:
         """Process student classes and insert into database"""
         # Group by class name
@@ -140,20 +174,17 @@ class CSVProcessor:
         errors = []
         total_students = 0
         
-        with get_db_cursor() as cursor:
+        with get_repository().transaction() as tx:
             for class_name, students_data in classes_data.items():
                 try:
                     # Check if class already exists
-                    cursor.execute("SELECT id FROM classes WHERE className = ?", (class_name,))
-                    existing_class = cursor.fetchone()
+                    class_id = tx.find_class_id(class_name)
                     
-                    if existing_class:
-                        class_id = existing_class[0]
+                    if class_id is not None:
                         updated_classes.append(class_name)
                     else:
                         # Create new class
-                        cursor.execute("INSERT INTO classes (className) VALUES (?)", (class_name,))
-                        class_id = cursor.lastrowid
+                        class_id = tx.create_class(class_name, None)
                         created_classes.append(class_name)
                     
                     # Add students to the class
@@ -165,13 +196,10 @@ class CSVProcessor:
                         student_name = student_data['studentName']
                         
                         try:
-                            cursor.execute("""
-                                INSERT INTO students (rollNumber, studentName, classId)
-                                VALUES (?, ?, ?)
-                            """, (roll_number, student_name, class_id))
+                            tx.create_student(class_id, (roll_number, student_name, None, None))
                             students_added += 1
                             total_students += 1
-                        except sqlite3.IntegrityError:
+                        except DuplicateKeyError:
                             students_skipped += 1
                             errors.append(f"Student {roll_number} already exists in class {class_name}")
                     
@@ -194,36 +222,34 @@ class CSVProcessor:
         }
 
     @staticmethod
+    @writes_tables("examRooms")
     def _process_exam_rooms(csv_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Process exam rooms and insert into database"""
         rooms_added = 0
         rooms_skipped = 0
         errors = []
         
-        with get_db_cursor() as cursor:
+        with get_repository().transaction() as tx:
             for room_data in csv_data:
                 try:
                     # Check if room already exists
-                    cursor.execute("SELECT id FROM examRooms WHERE roomNumber = ?", (room_data['roomNumber'],))
-                    existing_room = cursor.fetchone()
-                    
-                    if existing_room:
+                    if tx.find_room_id(room_data['roomNumber']) is not None:
                         rooms_skipped += 1
                         errors.append(f"Room {room_data['roomNumber']} already exists")
                     else:
                         # Create new exam room
-                        cursor.execute("""
-                            INSERT INTO examRooms (roomNumber, roomCapacity, roomFloor, roomBuilding)
-                            VALUES (?, ?, ?, ?)
-                        """, (
+                        tx.create_room((
                             room_data['roomNumber'],
                             room_data['roomCapacity'],
                             room_data['roomFloor'],
-                            room_data['roomBuilding']
+                            room_data['roomBuilding'],
+                            room_data['roomRows'],
+                            room_data['benchesPerRow'],
+                            room_data['seatsPerBench']
                         ))
                         rooms_added += 1
                     
-                except sqlite3.IntegrityError as e:
+                except DuplicateKeyError as e:
                     rooms_skipped += 1
                     errors.append(f"Error adding room {room_data['roomNumber']}: {str(e)}")
                 except Exception as e:
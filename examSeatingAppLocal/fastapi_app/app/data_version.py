@@ -0,0 +1,98 @@
+import threading
+from collections import deque
+from functools import wraps
+from typing import Deque, Dict, FrozenSet, Optional, Set, Tuple
+
+# Versions of each tracked table whose changed keys are remembered
+CHANGE_LOG_SIZE = 256
+
+
+class DataVersion:
+    """
+    In-process version counters, one per table, bumped after every write.
+
+    Anything derived from table contents (cached schedules, ...) is keyed by
+    the versions of the tables it read, so a write makes it unreachable
+    instead of having to find and evict it. Versions are bumped after the
+    write transaction has finished, so a reader can never see a new version
+    together with old data.
+
+    For the tables in CHANGE_TRACKED, each version also records what the
+    write changed (students: the ids of the classes whose students changed),
+    so that copies of the table can be patched instead of reloaded.
+    """
+
+    TABLES = ("classes", "students", "examRooms", "users", "schedules")
+    CHANGE_TRACKED = ("students",)
+
+    _lock = threading.Lock()
+    _versions: Dict[str, int] = {table: 0 for table in TABLES}
+    # table -> (version, keys changed by the write that made it, None when unknown)
+    _changes: Dict[str, Deque[Tuple[int, Optional[FrozenSet[int]]]]] = {
+        table: deque(maxlen=CHANGE_LOG_SIZE) for table in CHANGE_TRACKED
+    }
+    # Keys recorded by the writes_tables calls running in each thread
+    _recording = threading.local()
+
+    @classmethod
+    def bump(cls, *tables: str, changes: Optional[Dict[str, Set[int]]] = None) -> None:
+        """Bump the tables' versions; changes holds the keys written per tracked table, if known"""
+        with cls._lock:
+            for table in tables:
+                cls._versions[table] += 1
+                if table in cls._changes:
+                    keys = changes.get(table) if changes is not None else None
+                    cls._changes[table].append((cls._versions[table], frozenset(keys) if keys is not None else None))
+
+    @classmethod
+    def get(cls, *tables: str) -> Tuple[int, ...]:
+        with cls._lock:
+            return tuple(cls._versions[table] for table in tables)
+
+    @classmethod
+    def changes(cls, table: str, after: int, upto: int) -> Optional[Set[int]]:
+        """
+        Keys changed in a tracked table by the versions after `after` up to
+        `upto`, or None when that is not known (a write that recorded nothing,
+        or versions older than the log).
+        """
+        with cls._lock:
+            log = cls._changes[table]
+            if upto - after > len(log) or (log and log[0][0] > after + 1):
+                return None
+            keys: Set[int] = set()
+            for version, changed in log:
+                if after < version <= upto:
+                    if changed is None:
+                        return None
+                    keys |= changed
+            return keys
+
+    @classmethod
+    def record(cls, table: str, *keys: int) -> None:
+        """Note keys changed in a tracked table by the write running in this thread"""
+        recording = getattr(cls._recording, "tables", None)
+        if recording is not None and table in recording:
+            recording[table].update(keys)
+
+
+def writes_tables(*tables: str):
+    """Decorator for service methods that write to the given tables"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            outer = getattr(DataVersion._recording, "tables", None)
+            recording = {table: set() for table in tables if table in DataVersion.CHANGE_TRACKED}
+            DataVersion._recording.tables = recording
+            try:
+                return func(*args, **kwargs)
+            finally:
+                DataVersion._recording.tables = outer
+                if outer is not None:
+                    # A write nested in another one: the outer bump covers its keys too
+                    for table, keys in recording.items():
+                        outer.setdefault(table, set()).update(keys)
+                # Also bump on failure, parts of the write may have been committed
+                DataVersion.bump(*tables, changes=recording)
+        return wrapper
+    return decorator
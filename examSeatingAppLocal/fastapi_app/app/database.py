@@ -1,96 +1,151 @@
 import sqlite3
 import os
+import threading
+import time
 from contextlib import contextmanager
+from typing import Dict, List, Optional
+from fastapi import HTTPException
 from .config import settings
 
 def get_connection():
-    """Get database connection with foreign key support enabled"""
+    """Get database connection with foreign key support enabled and tuned pragmas"""
     conn = sqlite3.connect(settings.DATABASE_PATH, check_same_thread=False)
     conn.execute("PRAGMA foreign_keys = ON")
+    # WAL lets readers continue while an import writes; NORMAL sync is safe in WAL mode
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {int(settings.DB_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA mmap_size = {int(settings.DB_MMAP_SIZE)}")
     return conn
 
+class ConnectionPool:
+    """
+    Bounded pool of reusable SQLite connections.
+
+    Connections are opened lazily up to ``size`` and handed out to one thread
+    at a time; the most recently returned connection is reused first so its
+    page cache stays warm. A thread that finds the pool exhausted waits up to
+    ``timeout`` seconds for a connection to be returned.
+    """
+
+    def __init__(self, path: str, size: int, timeout: float):
+        self.path = path
+        self.size = max(size, 1)
+        self.timeout = timeout
+        self._idle: List[sqlite3.Connection] = []
+        self._available = threading.Condition()
+        self._open = 0
+        self._stats = {"acquired": 0, "created": 0, "discarded": 0, "waits": 0, "wait_ms": 0.0, "peak_in_use": 0}
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._available:
+            waited = None
+            while not self._idle and self._open >= self.size:
+                if waited is None:
+                    waited = time.perf_counter()
+                    self._stats["waits"] += 1
+                remaining = self.timeout - (time.perf_counter() - waited)
+                if remaining <= 0 or not self._available.wait(remaining):
+                    if not self._idle and self._open >= self.size:
+                        raise HTTPException(status_code=503, detail="Database is busy, please retry")
+            if waited is not None:
+                self._stats["wait_ms"] += (time.perf_counter() - waited) * 1000
+
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                # Reserve the slot before connecting outside the lock
+                self._open += 1
+                conn = None
+            self._stats["acquired"] += 1
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._open - len(self._idle))
+
+        if conn is None:
+            try:
+                conn = get_connection()
+            except Exception:
+                with self._available:
+                    self._open -= 1
+                    self._available.notify()
+                raise
+            with self._available:
+                self._stats["created"] += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection, discard: bool = False) -> None:
+        with self._available:
+            # A closed pool (database path changed) does not take connections back
+            discard = discard or self.size == 0
+            if discard:
+                self._open -= 1
+                self._stats["discarded"] += 1
+            else:
+                self._idle.append(conn)
+            self._available.notify()
+        if discard:
+            conn.close()
+
+    def close(self) -> None:
+        """Close the idle connections; connections in use are closed when returned"""
+        with self._available:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self.size = 0
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> Dict[str, float]:
+        with self._available:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                **{key: round(value, 3) if isinstance(value, float) else value for key, value in self._stats.items()},
+            }
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Return the pool for the configured database, replacing it if the path changed"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != settings.DATABASE_PATH:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(settings.DATABASE_PATH, settings.DB_POOL_SIZE, settings.DB_POOL_TIMEOUT)
+        return _pool
+
 @contextmanager
 def get_db_cursor():
-    """Context manager for database operations"""
-    conn = get_connection()
+    """Context manager for database operations on a pooled connection"""
+    pool = get_pool()
+    conn = pool.acquire()
     cursor = conn.cursor()
+    broken = False
     try:
         yield cursor
         conn.commit()
     except Exception:
-        conn.rollback()
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            broken = True
         raise
     finally:
-        conn.close()
+        try:
+            cursor.close()
+        except sqlite3.Error:
+            broken = True
+        pool.release(conn, discard=broken)
 
 def init_database():
-    """Initialize database tables"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Create tables if not exists
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS classes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        className TEXT NOT NULL,
-        shift TEXT
-    )
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS students (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        rollNumber TEXT NOT NULL,
-        studentName TEXT,
-        language TEXT,
-        dateOfBirth TEXT,
-        classId INTEGER NOT NULL,
-        FOREIGN KEY (classId) REFERENCES classes (id) ON DELETE CASCADE,
-        UNIQUE(rollNumber, classId)
-    )
-    """)
+    """Bring the database schema up to date"""
+    from .migrations import migrate
 
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS examRooms (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        roomNumber TEXT NOT NULL,
-        roomCapacity INTEGER NOT NULL,
-        roomFloor TEXT NOT NULL,
-        roomBuilding TEXT NOT NULL
-    )
-    """)
-    
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL UNIQUE,
-        password TEXT NOT NULL,
-        name TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    
-    # Create default admin user
-    cursor.execute(
-        "INSERT OR IGNORE INTO users (username, password, name) VALUES (?, ?, ?)",
-        ("admin", "Admin@123", "Administrator")
-    )
-    
-    # Add new columns to existing tables if they don't exist
-    try:
-        cursor.execute("ALTER TABLE classes ADD COLUMN shift TEXT")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    try:
-        cursor.execute("ALTER TABLE students ADD COLUMN language TEXT")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-        
+    conn = get_connection()
     try:
-        cursor.execute("ALTER TABLE students ADD COLUMN dateOfBirth TEXT")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    conn.commit()
-    conn.close()
+        migrate(conn)
+    finally:
+        conn.close()
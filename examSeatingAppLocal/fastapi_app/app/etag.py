@@ -0,0 +1,53 @@
+import hashlib
+import json
+import uuid
+from typing import Optional
+from fastapi import Request, Response
+from .data_version import DataVersion
+
+# Clients revalidate every time, and only the requesting user's browser may keep the response
+CACHE_CONTROL = "private, no-cache"
+
+# DataVersion counters restart at 0 with the process; tags from an earlier process must not match
+_EPOCH = uuid.uuid4().hex
+
+
+def compute_etag(tables, *variant) -> str:
+    """Weak ETag for a response built from the given tables; variant holds the request parameters"""
+    key = json.dumps([_EPOCH, DataVersion.get(*tables), variant], separators=(",", ":"), default=str)
+    return f'W/"{hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison: W/ prefixes are ignored
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(request: Request, response: Response, tables, *variant) -> Optional[Response]:
+    """
+    Conditional GET on table versions: returns a 304 response when the
+    client's If-None-Match still matches, otherwise sets ETag and
+    Cache-Control on the response and returns None. Computed from the
+    in-process counters only, without reading any data.
+
+    Compute it before reading the data: a write in between changes the
+    version, so the client gets a fresh response on its next request.
+    """
+    etag = compute_etag(tables, *variant)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
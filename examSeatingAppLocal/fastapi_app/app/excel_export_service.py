@@ -226,6 +226,10 @@ class ExcelExportService:
                 for col in range(1, 6):
                     ws.cell(row=row, column=col).border = border
             
+            # Seat grid, when the schedule assigned seats
+            if any(student.get('seat') for student in students):
+                ExcelExportService._render_seat_grid(ws, room, start_row=6 + len(students) + 3, border=border)
+            
             # Auto-adjust column widths
             for col in range(1, 6):
                 ws.column_dimensions[get_column_letter(col)].auto_size = True
@@ -235,3 +239,54 @@ class ExcelExportService:
         wb.save(output)
         output.seek(0)
         return output
+    
+    @staticmethod
+    def _render_seat_grid(ws, room: Dict, start_row: int, border: Border) -> None:
+        """Render the room's seat grid (front row first) with roll numbers in each seat"""
+        students = [student for student in room.get('students', []) if student.get('seat')]
+        layout = room.get('layout') or {}
+        seats_per_bench = layout.get('seatsPerBench') or max(s['seat']['seat'] for s in students)
+        benches_per_row = layout.get('benchesPerRow') or max(s['seat']['bench'] for s in students)
+        rows = layout.get('rows') or max(s['seat']['row'] for s in students)
+        
+        header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+        bench_fills = [
+            PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid"),
+            PatternFill(start_color="EDE7F6", end_color="EDE7F6", fill_type="solid"),
+        ]
+        
+        title_cell = ws.cell(row=start_row, column=1, value="Seat Grid (Row 1 is the front)")
+        title_cell.font = Font(bold=True, size=12)
+        
+        seats = {
+            (s['seat']['row'], s['seat']['bench'], s['seat']['seat']): s.get('rollNumber', '')
+            for s in students
+        }
+        
+        # One column per seat with a blank aisle column between benches
+        def seat_column(bench: int, seat: int) -> int:
+            return 2 + (bench - 1) * (seats_per_bench + 1) + (seat - 1)
+        
+        header_row = start_row + 1
+        for bench in range(1, benches_per_row + 1):
+            cell = ws.cell(row=header_row, column=seat_column(bench, 1), value=f"Bench {bench}")
+            cell.font = Font(bold=True, size=10)
+            cell.fill = header_fill
+            cell.alignment = Alignment(horizontal='center')
+            if seats_per_bench > 1:
+                ws.merge_cells(
+                    start_row=header_row, start_column=seat_column(bench, 1),
+                    end_row=header_row, end_column=seat_column(bench, seats_per_bench)
+                )
+        
+        for row in range(1, rows + 1):
+            grid_row = header_row + row
+            label = ws.cell(row=grid_row, column=1, value=f"Row {row}")
+            label.font = Font(bold=True, size=10)
+            for bench in range(1, benches_per_row + 1):
+                for seat in range(1, seats_per_bench + 1):
+                    cell = ws.cell(row=grid_row, column=seat_column(bench, seat), value=seats.get((row, bench, seat), ''))
+                    cell.font = Font(size=10)
+                    cell.border = border
+                    cell.fill = bench_fills[(bench - 1) % 2]
+                    cell.alignment = Alignment(horizontal='center')
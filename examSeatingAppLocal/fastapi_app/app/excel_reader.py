@@ -0,0 +1,260 @@
+"""
+Single-pass workbook reader for ExcelParser.
+
+The workbook is opened once, in openpyxl's read-only (streaming) mode, and
+each sheet is read row by row: the header row is detected on the way and
+only the non-blank rows below it are kept, as tuples of their first
+DATA_COLUMNS cells. No DataFrame is built.
+
+Values come out as pandas.read_excel would have produced them, so parsing
+results do not change: empty cells, error cells and pandas' default NA
+strings are missing (None); integral floats are ints; and a column holding
+only numbers (or numeric text) with gaps is rendered as floats, as pandas
+does when it infers a float64 column. Column types are tracked while
+reading and applied once the sheet ends.
+"""
+import re
+from typing import Iterator, List, Optional, Tuple
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from openpyxl.reader.excel import ExcelReader
+from .uploads import UploadSource, open_source
+
+# Cells ExcelParser reads from each data row: serial, register, name, department, shift, language
+DATA_COLUMNS = 6
+
+# Rows searched for the academic year line
+HEAD_ROWS = 11
+
+# pandas' default na_values
+NA_STRINGS = frozenset((
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+)) | frozenset(ERROR_CODES)
+
+# Text pandas converts to a number when the whole column is numeric
+_INTEGER_TEXT = re.compile(r"[ \t\n\r\f\v]*[+-]?[0-9]+[ \t\n\r\f\v]*\Z")
+_FLOAT_TEXT = re.compile(
+    r"[ \t\n\r\f\v]*[+-]?(?:(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?|inf|infinity)[ \t\n\r\f\v]*\Z",
+    re.IGNORECASE,
+)
+
+_INT64_MIN = -(2 ** 63)
+_UINT64_END = 2 ** 64
+
+# Value classes seen in a column, or-ed together
+_TEXT = 1
+_INT = 2
+_FLOAT = 4
+_BOOL = 8
+
+
+def is_missing(value) -> bool:
+    return value is None or (type(value) is str and value in NA_STRINGS)
+
+
+def _value_class(value) -> int:
+    kind = type(value)
+    if kind is int:
+        return _INT if _INT64_MIN <= value < _UINT64_END else _FLOAT
+    if kind is float:
+        return _FLOAT
+    if kind is bool:
+        return _BOOL
+    if kind is str:
+        if _INTEGER_TEXT.match(value):
+            return _INT if _INT64_MIN <= int(value) < _UINT64_END else _TEXT
+        if _FLOAT_TEXT.match(value):
+            return _FLOAT
+    return _TEXT
+
+
+class ColumnTypes:
+    """What pandas would infer for each column of a block of rows: kept as-is, int or float"""
+
+    def __init__(self):
+        self.classes: List[int] = []
+        self.counts: List[int] = []
+        self.rows = 0
+
+    def add(self, values: Tuple) -> None:
+        missing = len(values) - len(self.classes)
+        if missing > 0:
+            self.classes.extend([0] * missing)
+            self.counts.extend([0] * missing)
+        classes = self.classes
+        counts = self.counts
+        for column, value in enumerate(values):
+            if not is_missing(value):
+                classes[column] |= _value_class(value)
+                counts[column] += 1
+
+    def kind(self, column: int) -> str:
+        """The column's dtype as pandas infers it: "object", "bool", "int" or "float" (also when empty)"""
+        classes = self.classes[column] if column < len(self.classes) else 0
+        if not classes:
+            return "float"
+        if classes & _TEXT:
+            return "object"
+        has_gaps = self.counts[column] < self.rows
+        if classes == _BOOL:
+            # A bool column with gaps becomes float64 (1.0 / 0.0)
+            return "float" if has_gaps else "bool"
+        if has_gaps or classes & _FLOAT:
+            return "float"
+        return "int"
+
+    def converters(self, width: int, upcast_rows: bool = False) -> List:
+        """
+        Per column, the function giving pandas' value for a cell (None: kept as is).
+        upcast_rows: values are taken from row Series (df.iloc[i]), which are
+        float64 when every column is numeric and one of them float.
+        """
+        kinds = [self.kind(column) for column in range(width)]
+        if upcast_rows and "float" in kinds and all(kind in ("int", "float") for kind in kinds):
+            kinds = ["float"] * width
+        return [{"int": int, "float": float}.get(kind) for kind in kinds]
+
+
+class SheetData:
+    """One sheet after a single pass: the rows ExcelParser needs, with pandas' values"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.head: List[Tuple] = []
+        self.header_row: Optional[int] = None
+        # Non-blank rows below the header, DATA_COLUMNS cells each, None where missing
+        self.rows: List[Tuple] = []
+        # Width of the widest row of the sheet (pandas pads every row to it)
+        self.width = 0
+        self.sheet_types = ColumnTypes()
+        self.data_types = ColumnTypes()
+
+    def head_values(self) -> List[List]:
+        """The first HEAD_ROWS rows as pandas read them without a header, missing cells left out"""
+        converters = self.sheet_types.converters(self.width)
+        head = []
+        for row in self.head:
+            values = []
+            for column, value in enumerate(row):
+                if not is_missing(value):
+                    converter = converters[column]
+                    values.append(converter(value) if converter else value)
+            head.append(values)
+        return head
+
+    def _finish(self) -> None:
+        converters = (self.data_types.converters(self.width, upcast_rows=True) + [None] * DATA_COLUMNS)[:DATA_COLUMNS]
+        if any(converters):
+            self.rows = [
+                tuple(
+                    converter(value) if converter is not None and value is not None else value
+                    for converter, value in zip(converters, row)
+                )
+                for row in self.rows
+            ]
+
+
+def _is_header(row: Tuple) -> bool:
+    for value in row:
+        if type(value) is str and not is_missing(value):
+            upper = value.upper()
+            if "S.NO" in upper or "REGISTER" in upper:
+                return True
+    return False
+
+
+def list_sheet_names(file_content: UploadSource) -> List[str]:
+    """
+    The names WorkbookReader.sheet_names gives, read from the workbook part
+    alone: milliseconds even for large files, whose shared strings (read
+    when a workbook is opened) can take seconds.
+    """
+    with open_source(file_content) as file:
+        reader = ExcelReader(file, read_only=True, keep_links=False, data_only=True)
+        try:
+            reader.read_manifest()
+            reader.read_workbook()
+            return [sheet.name for sheet, rel in reader.parser.find_sheets() if rel.target in reader.valid_files]
+        finally:
+            reader.archive.close()
+
+
+class WorkbookReader:
+    """
+    An uploaded workbook (its bytes or spooled file, see uploads) opened once
+    in read-only mode; close() (or with) releases it
+    """
+
+    def __init__(self, file_content: UploadSource):
+        # Read-only workbooks read sheets from the file as they are iterated
+        self.file = open_source(file_content)
+        try:
+            # The same options pandas uses for .xlsx files
+            self.workbook = load_workbook(self.file, read_only=True, data_only=True, keep_links=False)
+        except BaseException:
+            self.file.close()
+            raise
+
+    def __enter__(self) -> "WorkbookReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.workbook.close()
+        self.file.close()
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return self.workbook.sheetnames
+
+    def rows(self, sheet_name: str) -> Iterator[Tuple]:
+        """Cell values row by row, trailing empty cells dropped; empty rows are yielded as ()"""
+        sheet = self.workbook[sheet_name]
+        sheet.reset_dimensions()
+        for values in sheet.iter_rows(values_only=True):
+            end = len(values)
+            while end and (values[end - 1] is None or values[end - 1] == ""):
+                end -= 1
+            # Whole numbers stored as floats are read as ints, like pandas does
+            yield tuple(
+                int(value) if type(value) is float and value.is_integer() else value for value in values[:end]
+            )
+
+    def read_sheet(self, sheet_name: str) -> SheetData:
+        """Read a sheet in one pass, see SheetData"""
+        sheet = SheetData(sheet_name)
+        sheet_types = sheet.sheet_types
+        data_types = sheet.data_types
+        padding = (None,) * DATA_COLUMNS
+        # Rows after the last non-empty one are dropped, as pandas does
+        sheet_rows = data_rows = 0
+
+        for row_number, values in enumerate(self.rows(sheet_name)):
+            if row_number < HEAD_ROWS:
+                sheet.head.append(values)
+            if not values:
+                continue
+
+            sheet_rows = row_number + 1
+            sheet.width = max(sheet.width, len(values))
+            sheet_types.add(values)
+
+            if sheet.header_row is None:
+                if _is_header(values):
+                    sheet.header_row = row_number
+                continue
+
+            data_rows = row_number - sheet.header_row
+            data_types.add(values)
+            # Rows with every cell missing are dropped (dropna(how='all'))
+            if not all(is_missing(value) for value in values):
+                cells = tuple(None if is_missing(value) else value for value in values[:DATA_COLUMNS])
+                sheet.rows.append((cells + padding)[:DATA_COLUMNS])
+
+        sheet_types.rows = sheet_rows
+        data_types.rows = data_rows
+        sheet._finish()
+        return sheet
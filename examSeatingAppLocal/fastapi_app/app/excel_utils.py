@@ -1,14 +1,18 @@
+import numpy as np
 import pandas as pd
 from typing import List, Dict, Optional, Tuple
 from fastapi import HTTPException
-import io
 from datetime import datetime
+from pandas.tseries.api import guess_datetime_format
+from .excel_reader import DATA_COLUMNS, SheetData, WorkbookReader
+from .executors import report_progress
+from .uploads import UploadSource
 
 class ExcelParser:
     """Utility class for parsing Excel files with student data"""
     
     @staticmethod
-    def parse_student_excel(file_content: bytes, filename: str = "Unknown") -> Dict:
+    def parse_student_excel(file_content: UploadSource, filename: str = "Unknown", progress_key: Optional[str] = None) -> Dict:
         """
         Parse Excel file with student data from all sheets:
         - Each sheet represents different years/classes
@@ -35,53 +39,19 @@ class ExcelParser:
                 }
             ]
         }
+        
+        A "sheet" progress event is reported under progress_key as each sheet
+        is parsed (see _report_sheet).
         """
         try:
-            # Read all sheet names
-            excel_file = pd.ExcelFile(io.BytesIO(file_content))
-            sheet_names = excel_file.sheet_names
-            
-            all_classes = []
-            academic_year = None
+            # Open the workbook once and read each sheet in a single streaming pass
+            with WorkbookReader(file_content) as workbook:
+                sheet_names = workbook.sheet_names
+                sheet_results = [
+                    ExcelParser._parse_sheet(workbook, sheet_name, filename, progress_key) for sheet_name in sheet_names
+                ]
             
-            # Process each sheet
-            for sheet_name in sheet_names:
-                try:
-                    # Read sheet data
-                    df_raw = pd.read_excel(io.BytesIO(file_content), sheet_name=sheet_name, header=None)
-                    
-                    # Extract academic year from first sheet if not already found
-                    if academic_year is None:
-                        academic_year = ExcelParser._extract_academic_year(df_raw)
-                    
-                    # Find header row
-                    header_row = ExcelParser._find_header_row(df_raw)
-                    if header_row is None:
-                        continue  # Skip sheets without proper headers
-                    
-                    # Read data with proper header
-                    df = pd.read_excel(io.BytesIO(file_content), sheet_name=sheet_name, header=header_row)
-                    
-                    # Extract students from this sheet
-                    students = ExcelParser._extract_students(df)
-                    
-                    if students:
-                        # Group students by class and shift for this sheet
-                        sheet_classes = ExcelParser._group_students_by_class(students, filename, sheet_name)
-                        all_classes.extend(sheet_classes)
-                        
-                except Exception as sheet_error:
-                    # Continue processing other sheets if one fails
-                    print(f"Warning: Error processing sheet '{sheet_name}': {str(sheet_error)}")
-                    continue
-            
-            if not all_classes:
-                raise HTTPException(status_code=400, detail="No student data found in any sheet of the Excel file")
-            
-            return {
-                'academic_year': academic_year,
-                'classes': all_classes
-            }
+            return ExcelParser._merge_sheets(sheet_names, sheet_results)
             
         except Exception as e:
             if isinstance(e, HTTPException):
@@ -89,90 +59,257 @@ class ExcelParser:
             raise HTTPException(status_code=400, detail=f"Error parsing Excel file: {str(e)}")
     
     @staticmethod
-    def _extract_academic_year(df_raw: pd.DataFrame) -> Optional[str]:
+    def parse_sheet_share(
+        file_content: UploadSource, filename: str, share: int, shares: int, progress_key: Optional[str] = None
+    ) -> Tuple[List[str], List[Dict]]:
+        """
+        Parse one share of the sheets, so that several processes can parse a
+        workbook together: sheets share, share + shares, share + 2 * shares...
+        (dealt round-robin, consecutive large sheets go to different shares).
+        Returns every sheet name and the share's sheet results; merge_shares
+        turns all the shares into parse_student_excel's result.
+        """
+        try:
+            with WorkbookReader(file_content) as workbook:
+                sheet_names = workbook.sheet_names
+                sheet_results = [
+                    ExcelParser._parse_sheet(workbook, sheet_name, filename, progress_key)
+                    for sheet_name in sheet_names[share::shares]
+                ]
+            return sheet_names, sheet_results
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error parsing Excel file: {str(e)}")
+    
+    @staticmethod
+    def merge_shares(shares: List[Tuple[List[str], List[Dict]]]) -> Dict:
+        """parse_student_excel's result from the parse_sheet_share results of every share, in share order"""
+        sheet_names = shares[0][0]
+        sheet_results = [None] * len(sheet_names)
+        for share, (_, share_results) in enumerate(shares):
+            sheet_results[share::len(shares)] = share_results
+        return ExcelParser._merge_sheets(sheet_names, sheet_results)
+    
+    @staticmethod
+    def _parse_sheet(workbook: WorkbookReader, sheet_name: str, filename: str, progress_key: Optional[str] = None) -> Dict:
+        """The sheet's academic year line and class groups, and the error that stopped it, if any"""
+        result = {'academic_year': None, 'classes': [], 'error': None}
+        try:
+            sheet = workbook.read_sheet(sheet_name)
+            result['academic_year'] = ExcelParser._extract_academic_year(sheet)
+            
+            # Header row is found while reading; sheets without proper headers are skipped
+            if sheet.header_row is not None:
+                # Extract students from this sheet
+                students = ExcelParser._extract_students(sheet)
+                
+                if students:
+                    # Group students by class and shift for this sheet
+                    result['classes'] = ExcelParser._group_students_by_class(students, filename, sheet_name)
+        except Exception as sheet_error:
+            result['error'] = str(sheet_error)
+        
+        if progress_key is not None:
+            ExcelParser._report_sheet(progress_key, workbook.sheet_names, sheet_name, result)
+        return result
+    
+    @staticmethod
+    def _report_sheet(progress_key: str, sheet_names: List[str], sheet_name: str, result: Dict) -> None:
+        """
+        Report a parsed sheet. Events from parallel shares arrive in any order;
+        position (the sheet's index) identifies the sheet.
+        """
+        report_progress(progress_key, {
+            'type': 'sheet',
+            'position': sheet_names.index(sheet_name),
+            'sheets': len(sheet_names),
+            'sheet': sheet_name,
+            'classes': len(result['classes']),
+            'students': sum(len(class_data['students']) for class_data in result['classes']),
+            'error': result['error'],
+        })
+    
+    @staticmethod
+    def _merge_sheets(sheet_names: List[str], sheet_results: List[Dict]) -> Dict:
+        """Combine the _parse_sheet results of a workbook's sheets, in sheet order"""
+        all_classes = []
+        academic_year = None
+        
+        for sheet_name, sheet_result in zip(sheet_names, sheet_results):
+            # Academic year from the first sheet that has one
+            if academic_year is None:
+                academic_year = sheet_result['academic_year']
+            
+            if sheet_result['error'] is not None:
+                # Continue processing other sheets if one fails
+                print(f"Warning: Error processing sheet '{sheet_name}': {sheet_result['error']}")
+                continue
+            
+            all_classes.extend(sheet_result['classes'])
+        
+        if not all_classes:
+            raise HTTPException(status_code=400, detail="No student data found in any sheet of the Excel file")
+        
+        return {
+            'academic_year': academic_year,
+            'classes': all_classes
+        }
+    
+    @staticmethod
+    def _extract_academic_year(sheet: SheetData) -> Optional[str]:
         """Extract academic year from the first few rows"""
-        for i, row in df_raw.iterrows():
-            if i > 10:  # Only check first 10 rows
-                break
-            row_str = ' '.join([str(x) for x in row if pd.notna(x)])
+        for row in sheet.head_values():
+            row_str = ' '.join([str(x) for x in row])
             if 'YEAR' in row_str and ('20' in row_str):
                 return row_str.strip()
         return None
     
     @staticmethod
-    def _find_header_row(df_raw: pd.DataFrame) -> Optional[int]:
-        """Find the row containing column headers"""
-        for i, row in df_raw.iterrows():
-            row_values = [str(x).upper() for x in row if pd.notna(x)]
-            if any('S.NO' in val or 'REGISTER' in val for val in row_values):
-                return i
-        return None
+    def _extract_students(sheet: SheetData) -> List[Dict]:
+        """
+        Extract student data from the rows below the sheet's header, one column
+        at a time: student rows are the rows with a numeric serial number, and
+        the row below a student row holds the date of birth (in the name
+        column) when it has no serial number. Rows whose serial or register
+        number cannot be read as a number are left out.
+        """
+        # Determine column structure based on available columns
+        has_language_column = sheet.width > 5
+        if sheet.width < 5 or not sheet.rows:
+            return []  # No department and shift columns
+        
+        # Completely empty rows are already left out, missing cells are None
+        frame = pd.DataFrame(sheet.rows, columns=range(DATA_COLUMNS), dtype=object)
+        serials = frame[0]
+        is_student = serials.notna()
+        # Set as an array: a Series would be aligned to the whole index first, upcasting the mask
+        is_student[is_student] = (
+            serials[is_student].astype(str).str.replace('.0', '', regex=False).str.isdigit().to_numpy(dtype=bool)
+        )
+        
+        # Pair each row with the row below it, which holds the date of birth when it has no serial number
+        below = frame.shift(-1)
+        has_date_of_birth = below[2].notna() & below[0].isna()
+        
+        serial_numbers = ExcelParser._whole_numbers(serials[is_student])
+        register_numbers = ExcelParser._whole_numbers(frame[1][is_student])
+        valid = serial_numbers.notna() & (register_numbers.notna() | frame[1][is_student].isna())
+        kept = valid.index[valid]
+        if not len(kept):
+            return []
+        students = frame.loc[kept]
+        
+        registers = np.full(len(kept), '', dtype=object)
+        has_register = students[1].notna().to_numpy()
+        registers[has_register] = [str(number) for number in ExcelParser._as_ints(register_numbers[kept][has_register])]
+        
+        dates_of_birth = np.full(len(kept), None, dtype=object)
+        dated = has_date_of_birth[kept].to_numpy()
+        if dated.any():
+            dates_of_birth[dated] = ExcelParser._format_dates_of_birth(below[2][kept][dated].tolist())
+        
+        languages = ExcelParser._text_column(students[5]) if has_language_column else [''] * len(kept)
+        
+        return [
+            {
+                'serial_no': serial_no,
+                'register_number': register_number,
+                'name': name,
+                'department': department,
+                'shift': shift,
+                'date_of_birth': date_of_birth,
+                'language': language
+            }
+            for serial_no, register_number, name, department, shift, date_of_birth, language in zip(
+                ExcelParser._as_ints(serial_numbers[kept]),
+                registers,
+                ExcelParser._text_column(students[2]),
+                ExcelParser._text_column(students[3]),
+                ExcelParser._text_column(students[4]),
+                dates_of_birth,
+                languages
+            )
+        ]
     
     @staticmethod
-    def _extract_students(df: pd.DataFrame) -> List[Dict]:
-        """Extract student data from the DataFrame"""
-        students = []
-        df_clean = df.dropna(how='all')  # Remove completely empty rows
-        
-        # Check how many columns we have
-        num_columns = len(df_clean.columns)
+    def _whole_numbers(column: pd.Series) -> pd.Series:
+        """int(float(value)) for each cell as a float, NaN where the cell is missing or that fails"""
+        numbers = pd.Series(np.nan, index=column.index)
+        is_number = column.map(type).isin((int, float, bool))
+        numbers[is_number] = column[is_number].astype(float)
+        # Text (and other values) is converted the way float() reads it
+        others = column[~is_number & column.notna()]
+        if len(others):
+            numbers[others.index] = [ExcelParser._to_float(value) for value in others]
+        return np.trunc(numbers.where(np.isfinite(numbers)))
+    
+    @staticmethod
+    def _to_float(value) -> float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return np.nan
+    
+    @staticmethod
+    def _as_ints(numbers: pd.Series) -> List[int]:
+        values = numbers.to_numpy()
+        if len(values) and np.abs(values).max() < 2 ** 63:
+            return values.astype(np.int64).tolist()
+        return [int(value) for value in values]
+    
+    @staticmethod
+    def _text_column(column: pd.Series) -> pd.Series:
+        """Cells as stripped text, '' where missing"""
+        return column.astype(str).str.strip().where(column.notna(), '')
+    
+    @staticmethod
+    def _format_dates_of_birth(values: List) -> List[str]:
+        """
+        Dates of birth as 'YYYY-MM-DD', or as they were written when they are
+        not dates. Each distinct value is converted once; text is parsed in one
+        pd.to_datetime call per date format, guessed the way pd.to_datetime
+        guesses it for a single value, and text that does not parse is retried
+        on its own.
+        """
+        formatted = {}
+        keys_by_text: Dict[str, List] = {}
+        for value in values:
+            key = (type(value), value)
+            if key in formatted:
+                continue
+            if isinstance(value, datetime) and pd.Timestamp.min <= value <= pd.Timestamp.max:
+                formatted[key] = value.strftime('%Y-%m-%d')
+            else:
+                formatted[key] = None
+                keys_by_text.setdefault(str(value), []).append(key)
         
-        # Determine column structure based on available columns
-        has_language_column = num_columns > 5
+        texts_by_format: Dict[Optional[str], List[str]] = {}
+        for text in keys_by_text:
+            texts_by_format.setdefault(guess_datetime_format(text), []).append(text)
         
-        i = 0
-        while i < len(df_clean):
-            try:
-                row = df_clean.iloc[i]
-                
-                # Check if this is a student data row (has serial number)
-                if pd.notna(row.iloc[0]) and str(row.iloc[0]).replace('.0', '').isdigit():
-                    student = {
-                        'serial_no': int(float(row.iloc[0])),
-                        'register_number': str(int(float(row.iloc[1]))) if pd.notna(row.iloc[1]) else '',
-                        'name': str(row.iloc[2]).strip() if pd.notna(row.iloc[2]) else '',
-                        'department': str(row.iloc[3]).strip() if pd.notna(row.iloc[3]) else '',
-                        'shift': str(row.iloc[4]).strip() if pd.notna(row.iloc[4]) else '',
-                        'date_of_birth': None
-                    }
-                    
-                    # Handle language column - it might not exist
-                    if has_language_column:
-                        # Language column exists at index 5
-                        try:
-                            student['language'] = str(row.iloc[5]).strip() if pd.notna(row.iloc[5]) else ''
-                        except IndexError:
-                            student['language'] = ''
-                    else:
-                        # Language column doesn't exist
-                        student['language'] = ''
-                    
-                    # Check next row for date of birth
-                    if i + 1 < len(df_clean):
-                        next_row = df_clean.iloc[i + 1]
-                        if pd.notna(next_row.iloc[2]) and pd.isna(next_row.iloc[0]):
-                            # This is likely the date of birth row
-                            dob = next_row.iloc[2]
-                            if isinstance(dob, pd.Timestamp):
-                                student['date_of_birth'] = dob.strftime('%Y-%m-%d')
-                            else:
-                                try:
-                                    # Try to parse as date string
-                                    parsed_date = pd.to_datetime(str(dob))
-                                    student['date_of_birth'] = parsed_date.strftime('%Y-%m-%d')
-                                except:
-                                    student['date_of_birth'] = str(dob)
-                            i += 1  # Skip the date row
-                    
-                    students.append(student)
-                    
-            except Exception as e:
-                # Continue processing other rows if one fails
-                pass
-            
-            i += 1
+        for date_format, texts in texts_by_format.items():
+            dates = [None] * len(texts)
+            if date_format is not None:
+                try:
+                    parsed = pd.to_datetime(pd.Series(texts), format=date_format, errors='coerce')
+                    if parsed.dtype.kind == 'M':
+                        dates = parsed.dt.strftime('%Y-%m-%d').where(parsed.notna(), None).tolist()
+                except Exception:
+                    pass  # e.g. mixed time zones; each text is parsed on its own below
+            for text, date in zip(texts, dates):
+                if date is None:
+                    date = ExcelParser._parse_date_text(text)
+                for key in keys_by_text[text]:
+                    formatted[key] = date
         
-        return students
+        return [formatted[(type(value), value)] for value in values]
+    
+    @staticmethod
+    def _parse_date_text(text: str) -> str:
+        try:
+            # Try to parse as date string
+            return pd.to_datetime(text).strftime('%Y-%m-%d')
+        except:
+            return text
     
     @staticmethod
     def _group_students_by_class(students: List[Dict], filename: str = "Unknown", sheet_name: str = "Sheet1") -> List[Dict]:
@@ -0,0 +1,217 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from fastapi import HTTPException
+from .config import settings
+
+
+def _timed_call(func: Callable, args: Tuple) -> Tuple[Any, Optional[Tuple[int, Any]], float, float]:
+    """Run func in a worker; returns (result, http_error, started, finished)
+
+    Runs in worker threads and processes, so start and finish are wall-clock
+    times comparable with the submitting process. HTTPException does not
+    survive pickling, so it is passed back as (status_code, detail).
+    """
+    started = time.time()
+    try:
+        result, error = func(*args), None
+    except HTTPException as e:
+        result, error = None, (e.status_code, e.detail)
+    return result, error, started, time.time()
+
+
+class InstrumentedExecutor:
+    """
+    Runs blocking calls from async routes on a pool, keeping the event loop
+    free, with a bound on queued calls and queue-wait / run-time statistics.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Executor], workers: int, max_queue: int):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self._factory = factory
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "rejected": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "run_ms_total": 0.0,
+            "run_ms_max": 0.0,
+        }
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory()
+            return self._executor
+
+    async def run(self, func: Callable, *args) -> Any:
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self._stats["rejected"] += 1
+                raise HTTPException(status_code=503, detail="Server is busy, please retry")
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+
+        submitted = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            result, error, started, finished = await loop.run_in_executor(
+                self._get_executor(), _timed_call, func, args
+            )
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        wait_ms = max(started - submitted, 0.0) * 1000
+        run_ms = (finished - started) * 1000
+        with self._lock:
+            self._stats["completed"] += 1
+            self._stats["wait_ms_total"] += wait_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+            self._stats["run_ms_total"] += run_ms
+            self._stats["run_ms_max"] = max(self._stats["run_ms_max"], run_ms)
+
+        if error is not None:
+            raise HTTPException(status_code=error[0], detail=error[1])
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._stats["completed"]
+            return {
+                "workers": self.workers,
+                "in_flight": self._in_flight,
+                # Calls waiting for a worker
+                "queue_depth": max(self._in_flight - self.workers, 0),
+                "max_queue": self.max_queue,
+                "submitted": self._stats["submitted"],
+                "completed": completed,
+                "rejected": self._stats["rejected"],
+                "avg_wait_ms": round(self._stats["wait_ms_total"] / completed, 3) if completed else 0.0,
+                "max_wait_ms": round(self._stats["wait_ms_max"], 3),
+                "avg_run_ms": round(self._stats["run_ms_total"] / completed, 3) if completed else 0.0,
+                "max_run_ms": round(self._stats["run_ms_max"], 3),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Progress listeners by key (progress_listener); events from parsing processes
+# arrive on a queue drained by a relay thread
+_progress_listeners: Dict[str, Callable[[Dict], None]] = {}
+_progress_lock = threading.Lock()
+# Set in parsing processes only: the queue their progress events go to
+_worker_progress_queue = None
+
+
+def _init_parse_worker(progress_queue) -> None:
+    global _worker_progress_queue
+    _worker_progress_queue = progress_queue
+
+
+def _deliver_progress(key: str, event: Dict) -> None:
+    with _progress_lock:
+        listener = _progress_listeners.get(key)
+    if listener is not None:
+        try:
+            listener(event)
+        except Exception as e:
+            print(f"Warning: Progress listener for '{key}' failed: {e}")
+
+
+def _relay_progress(progress_queue) -> None:
+    while True:
+        key, event = progress_queue.get()
+        _deliver_progress(key, event)
+
+
+def report_progress(key: Optional[str], event: Dict) -> None:
+    """
+    Send a progress event to the listener registered under key, from this
+    process or from a parsing process. Events nobody listens to are dropped,
+    and so is everything when key is None.
+    """
+    if key is None:
+        return
+    if _worker_progress_queue is not None:
+        _worker_progress_queue.put((key, event))
+    else:
+        _deliver_progress(key, event)
+
+
+@contextmanager
+def progress_listener(key: str, listener: Callable[[Dict], None]) -> Iterator[None]:
+    """Call listener with the events reported under key while the block runs (from other threads too)"""
+    with _progress_lock:
+        _progress_listeners[key] = listener
+    try:
+        yield
+    finally:
+        with _progress_lock:
+            _progress_listeners.pop(key, None)
+
+
+def _parse_pool() -> ProcessPoolExecutor:
+    context = multiprocessing.get_context("spawn")
+    progress_queue = context.SimpleQueue()
+    threading.Thread(target=_relay_progress, args=(progress_queue,), name="parse-progress", daemon=True).start()
+    return ProcessPoolExecutor(
+        max_workers=settings.PARSE_EXECUTOR_WORKERS,
+        mp_context=context,
+        initializer=_init_parse_worker,
+        initargs=(progress_queue,),
+    )
+
+
+# SQLite work (imports, writes): threads, sized like the connection pool
+db_executor = InstrumentedExecutor(
+    "database",
+    lambda: ThreadPoolExecutor(max_workers=settings.DB_EXECUTOR_WORKERS, thread_name_prefix="db"),
+    settings.DB_EXECUTOR_WORKERS,
+    settings.EXECUTOR_MAX_QUEUE,
+)
+
+# pandas workbook parsing is CPU bound and holds the GIL: separate processes.
+# Spawned workers do not inherit the server's threads or open connections.
+parse_executor = InstrumentedExecutor(
+    "parsing",
+    _parse_pool,
+    settings.PARSE_EXECUTOR_WORKERS,
+    settings.EXECUTOR_MAX_QUEUE,
+)
+
+
+# Batch scheduling plans sessions in parallel, CPU bound as well: processes
+schedule_executor = InstrumentedExecutor(
+    "scheduling",
+    lambda: ProcessPoolExecutor(
+        max_workers=settings.SCHEDULE_BATCH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+    ),
+    settings.SCHEDULE_BATCH_WORKERS,
+    settings.EXECUTOR_MAX_QUEUE,
+)
+
+EXECUTORS = (db_executor, parse_executor, schedule_executor)
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {executor.name: executor.stats() for executor in EXECUTORS}
+
+
+def shutdown_executors() -> None:
+    for executor in EXECUTORS:
+        executor.shutdown()
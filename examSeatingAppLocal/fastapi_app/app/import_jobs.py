@@ -0,0 +1,344 @@
+"""
+Background Excel imports.
+
+An upload to /bulk-import/excel or /excel/selective becomes an ImportJob and
+is answered at once with the job's id. The job parses the workbook in the
+parsing processes and writes it from a database thread, long after the
+upload request has returned. Its progress is kept on the job: sheets parsed,
+then classes written with the students they now hold and the duplicate
+rows skipped. Clients poll GET /bulk-import/jobs/{id} or
+follow GET /bulk-import/jobs/{id}/events (server-sent events). Finished jobs
+keep their result or error for IMPORT_JOB_TTL seconds.
+"""
+import asyncio
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from .config import settings
+from .excel_reader import list_sheet_names
+from .excel_utils import ExcelParser
+from .executors import db_executor, parse_executor, progress_listener
+from .services import ClassService
+from .uploads import SpooledUpload, UploadSource
+
+# Seconds between keep-alive comments on an idle event stream
+EVENT_KEEPALIVE = 15.0
+
+FINISHED = ("completed", "failed")
+
+
+async def parse_upload(file_content: UploadSource, filename: str, progress_key: Optional[str] = None) -> Dict:
+    """
+    Parse an uploaded workbook in the parsing processes. Workbooks with at
+    least EXCEL_PARALLEL_MIN_SHEETS sheets are split: each process parses a
+    share of the sheets and the shares are merged in sheet order, which gives
+    the same result (and sheet warnings) as parsing in one process. Sheet
+    progress is reported under progress_key.
+    """
+    shares = parse_executor.workers
+    if settings.EXCEL_PARALLEL_MIN_SHEETS > 0 and shares > 1:
+        try:
+            sheet_count = len(list_sheet_names(file_content))
+        except Exception:
+            sheet_count = 0  # Not a readable workbook, parse_student_excel reports why
+
+        if sheet_count >= max(settings.EXCEL_PARALLEL_MIN_SHEETS, 2):
+            shares = min(shares, sheet_count)
+            results = await asyncio.gather(*(
+                parse_executor.run(ExcelParser.parse_sheet_share, file_content, filename, share, shares, progress_key)
+                for share in range(shares)
+            ))
+            return ExcelParser.merge_shares(results)
+
+    return await parse_executor.run(ExcelParser.parse_student_excel, file_content, filename, progress_key)
+
+
+class ImportJob:
+    """
+    One background import. Progress arrives from the relay and database
+    threads (on_progress); every change is also recorded as an event, whose
+    number (from 1) is the SSE event id.
+    """
+
+    def __init__(self, kind: str, filename: str, loop: asyncio.AbstractEventLoop):
+        self.id = secrets.token_hex(8)
+        self.kind = kind
+        self.filename = filename
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.sheets_total: Optional[int] = None
+        # Parsed sheets by position: shares report them in any order
+        self.sheets: Dict[int, Dict] = {}
+        self.classes_total: Optional[int] = None
+        self.rows_total: Optional[int] = None
+        # Rows written: as students (inserted, updated or unchanged) or skipped as duplicates
+        self.students_written = 0
+        self.rows_skipped = 0
+        self.classes: List[Dict] = []
+        self.result: Optional[Dict] = None
+        self.error: Optional[Dict] = None
+        self.events: List[Tuple[str, Dict]] = []
+        self._lock = threading.Lock()
+        self._loop = loop
+        # Event streams waiting for the next event; only touched on the loop
+        self._waiters: List[asyncio.Future] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def _publish(self, event_type: str, data: Dict) -> None:
+        """Record an event (the caller holds _lock) and wake the event streams"""
+        self.events.append((event_type, data))
+        try:
+            self._loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            pass  # Loop closed: nobody is streaming
+
+    def _wake(self) -> None:
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def set_status(self, status: str) -> None:
+        with self._lock:
+            self.status = status
+            if status == "parsing":
+                self.started_at = time.time()
+            self._publish("status", {"status": status})
+
+    def on_progress(self, event: Dict) -> None:
+        """Progress listener for ExcelParser and ClassService._apply_import events"""
+        event = dict(event)
+        event_type = event.pop("type")
+        with self._lock:
+            if event_type == "sheet":
+                self.sheets_total = event.pop("sheets")
+                if event["position"] in self.sheets:
+                    return
+                self.sheets[event["position"]] = event
+            elif event_type == "classes":
+                self.classes_total = event["classes"]
+                self.rows_total = event["rows"]
+            elif event_type == "class":
+                self.classes.append(event)
+                self.students_written += event["studentsWritten"]
+                self.rows_skipped += event["skipped"]
+            else:
+                return
+            self._publish(event_type, event)
+
+    def complete(self, result: Dict) -> None:
+        with self._lock:
+            self.status = "completed"
+            self.finished_at = time.time()
+            self.result = result
+            self._publish("completed", result)
+
+    def fail(self, status_code: int, detail) -> None:
+        with self._lock:
+            self.status = "failed"
+            self.finished_at = time.time()
+            self.error = {"statusCode": status_code, "detail": detail}
+            self._publish("failed", self.error)
+
+    def summary(self) -> Dict:
+        """Status and progress counts, without the per-sheet and per-class lists or the result"""
+        with self._lock:
+            return self._summary()
+
+    def _summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "status": self.status,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "progress": {
+                "sheetsTotal": self.sheets_total,
+                "sheetsParsed": len(self.sheets),
+                "classesTotal": self.classes_total,
+                "classesWritten": len(self.classes),
+                "rowsTotal": self.rows_total,
+                "studentsWritten": self.students_written,
+                "rowsSkipped": self.rows_skipped,
+            },
+            "error": self.error,
+        }
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            job = self._summary()
+            job["sheets"] = [self.sheets[position] for position in sorted(self.sheets)]
+            job["classes"] = list(self.classes)
+            job["result"] = self.result
+            return job
+
+    async def event_stream(self, after: int = 0) -> AsyncIterator[str]:
+        """
+        The job's events from number after + 1 on, as server-sent events,
+        ending with the completed or failed event.
+        """
+        position = after
+        while True:
+            with self._lock:
+                events = self.events[position:]
+                finished = self.finished
+            for event_type, data in events:
+                position += 1
+                yield f"id: {position}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+            if finished:
+                return
+            if not events:
+                # Nothing new since the check: the next _publish wakes us (it runs _wake on this loop)
+                waiter = self._loop.create_future()
+                self._waiters.append(waiter)
+                try:
+                    await asyncio.wait_for(waiter, EVENT_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+
+
+class ImportJobs:
+    """
+    The import jobs of this process, by id. At most IMPORT_JOB_WORKERS jobs
+    run at a time, the others wait in the "queued" status; beyond
+    IMPORT_JOB_MAX_PENDING unfinished jobs new imports are refused with 503.
+    Finished jobs are dropped IMPORT_JOB_TTL seconds after they end.
+    """
+
+    _lock = threading.Lock()
+    _jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+    # Running tasks, referenced so they are not garbage collected
+    _tasks: Set[asyncio.Task] = set()
+    _slots: Optional[asyncio.Semaphore] = None
+    _slots_loop: Optional[asyncio.AbstractEventLoop] = None
+    _submitted = 0
+    _completed = 0
+    _failed = 0
+    _rejected = 0
+
+    @classmethod
+    def _prune(cls) -> None:
+        """Drop expired jobs; the caller holds _lock"""
+        expired_before = time.time() - settings.IMPORT_JOB_TTL
+        for job_id in [
+            job_id for job_id, job in cls._jobs.items()
+            if job.finished_at is not None and job.finished_at <= expired_before
+        ]:
+            del cls._jobs[job_id]
+
+    @classmethod
+    def submit(cls, kind: str, upload: SpooledUpload, selected_classes: Optional[List[dict]] = None) -> ImportJob:
+        """
+        Start importing an upload ("excel", or "selective" with its selected
+        classes) in the background. The job owns the upload and closes it.
+        """
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            cls._prune()
+            pending = sum(1 for job in cls._jobs.values() if not job.finished)
+            if pending >= settings.IMPORT_JOB_MAX_PENDING:
+                cls._rejected += 1
+                upload.close()
+                raise HTTPException(status_code=503, detail="Too many imports in progress, please retry")
+            job = ImportJob(kind, upload.filename, loop)
+            cls._jobs[job.id] = job
+            cls._submitted += 1
+            # Semaphores belong to one event loop
+            if cls._slots is None or cls._slots_loop is not loop:
+                cls._slots = asyncio.Semaphore(max(settings.IMPORT_JOB_WORKERS, 1))
+                cls._slots_loop = loop
+            slots = cls._slots
+
+        task = loop.create_task(cls._run(job, slots, upload, selected_classes))
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+        return job
+
+    @classmethod
+    async def _run(
+        cls, job: ImportJob, slots: asyncio.Semaphore, upload: SpooledUpload, selected_classes: Optional[List[dict]]
+    ) -> None:
+        file_content = upload.source
+        async with slots:
+            # Listening for the whole job: sheet events relayed from the parsing processes can trail the result
+            with upload, progress_listener(job.id, job.on_progress):
+                try:
+                    job.set_status("parsing")
+                    parsed_data = await parse_upload(file_content, job.filename, job.id)
+                    job.set_status("writing")
+                    if job.kind == "selective":
+                        result = await db_executor.run(
+                            ClassService.selective_import_from_excel,
+                            file_content, selected_classes, job.filename, parsed_data, job.on_progress,
+                        )
+                    else:
+                        result = await db_executor.run(
+                            ClassService.bulk_import_from_excel, file_content, job.filename, parsed_data, job.on_progress
+                        )
+                    job.complete(jsonable_encoder(result))
+                except HTTPException as e:
+                    job.fail(e.status_code, e.detail)
+                except Exception as e:
+                    job.fail(500, f"Error processing file: {str(e)}")
+
+        with cls._lock:
+            if job.status == "completed":
+                cls._completed += 1
+            else:
+                cls._failed += 1
+
+    @classmethod
+    def get(cls, job_id: str) -> ImportJob:
+        with cls._lock:
+            cls._prune()
+            job = cls._jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Import job not found")
+        return job
+
+    @classmethod
+    def list(cls) -> List[ImportJob]:
+        """Jobs kept, oldest first"""
+        with cls._lock:
+            cls._prune()
+            return list(cls._jobs.values())
+
+    @classmethod
+    def stats(cls) -> Dict[str, any]:
+        with cls._lock:
+            cls._prune()
+            statuses = [job.status for job in cls._jobs.values()]
+            return {
+                "workers": settings.IMPORT_JOB_WORKERS,
+                "queued": statuses.count("queued"),
+                "running": statuses.count("parsing") + statuses.count("writing"),
+                "kept": len(statuses),
+                "max_pending": settings.IMPORT_JOB_MAX_PENDING,
+                "ttl": settings.IMPORT_JOB_TTL,
+                "submitted": cls._submitted,
+                "completed": cls._completed,
+                "failed": cls._failed,
+                "rejected": cls._rejected,
+            }
+
+    @classmethod
+    def clear(cls) -> None:
+        """Forget every job; running ones finish unobserved"""
+        with cls._lock:
+            cls._jobs.clear()
+            cls._submitted = 0
+            cls._completed = 0
+            cls._failed = 0
+            cls._rejected = 0
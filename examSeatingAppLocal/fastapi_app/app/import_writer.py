@@ -0,0 +1,137 @@
+from typing import List, Dict, Optional, Tuple
+
+# (rollNumber, studentName, language, dateOfBirth)
+StudentRow = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+
+class StudentImportWriter:
+    """
+    Replaces the students of whole classes with imported rows, writing only
+    the difference.
+
+    Rows are staged into connection-local temp tables and compared with the
+    students table in SQL: new roll numbers are inserted, changed rows are
+    updated in place (keeping their student ids) with
+    INSERT ... ON CONFLICT(rollNumber, classId) DO UPDATE, and students no
+    longer in the import are deleted. Re-importing unchanged data writes
+    nothing to the students table.
+
+    Within one class the first row of a roll number wins; later duplicates
+    and rows without a roll number are skipped, as the insert-and-skip import
+    did.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self._classes: Dict[int, Dict[str, StudentRow]] = {}
+        self._skipped: Dict[int, List[str]] = {}
+
+    def stage(self, class_id: int, rows: List[StudentRow]) -> None:
+        """Set the complete student list of a class, replacing rows staged for it before"""
+        students = self._classes[class_id] = {}
+        skipped = self._skipped[class_id] = []
+        for row in rows:
+            # Rows without a roll number cannot be stored, like duplicates they are skipped
+            if row[0] is None or row[0] in students:
+                skipped.append(row[0])
+            else:
+                students[row[0]] = row
+
+    def skipped(self, class_id: int) -> List[str]:
+        """Roll numbers of the rows ignored for the class"""
+        return self._skipped.get(class_id, [])
+
+    def apply(self) -> Dict[int, Dict[str, int]]:
+        """Write the staged classes; returns {class_id: {inserted, updated, deleted, unchanged, skipped}}"""
+        counts = {
+            class_id: {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": len(students), "skipped": len(self._skipped[class_id])}
+            for class_id, students in self._classes.items()
+        }
+        if not counts:
+            return counts
+
+        self._stage_rows()
+
+        # Students of the imported classes that are not in the import
+        self.cursor.execute("""
+            SELECT s.id, s.classId FROM students s
+            JOIN import_classes c ON c.classId = s.classId
+            WHERE NOT EXISTS (
+                SELECT 1 FROM import_students i
+                WHERE i.classId = s.classId AND i.rollNumber = s.rollNumber
+            )
+        """)
+        removed = self.cursor.fetchall()
+
+        # New or changed rows
+        self.cursor.execute("""
+            SELECT i.rollNumber, i.studentName, i.language, i.dateOfBirth, i.classId, s.id IS NULL
+            FROM import_students i
+            LEFT JOIN students s ON s.classId = i.classId AND s.rollNumber = i.rollNumber
+            WHERE s.id IS NULL
+               OR s.studentName IS NOT i.studentName
+               OR s.language IS NOT i.language
+               OR s.dateOfBirth IS NOT i.dateOfBirth
+        """)
+        changed = self.cursor.fetchall()
+
+        if removed:
+            self.cursor.executemany("DELETE FROM students WHERE id = ?", [(student_id,) for student_id, _ in removed])
+        if changed:
+            self.cursor.executemany(
+                """
+                INSERT INTO students (rollNumber, studentName, language, dateOfBirth, classId)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(rollNumber, classId) DO UPDATE SET
+                    studentName = excluded.studentName,
+                    language = excluded.language,
+                    dateOfBirth = excluded.dateOfBirth
+            """,
+                [row[:5] for row in changed],
+            )
+
+        for _, class_id in removed:
+            counts[class_id]["deleted"] += 1
+        for row in changed:
+            class_counts = counts[row[4]]
+            class_counts["inserted" if row[5] else "updated"] += 1
+            class_counts["unchanged"] -= 1
+
+        self.cursor.execute("DELETE FROM import_students")
+        self.cursor.execute("DELETE FROM import_classes")
+        self._classes.clear()
+        self._skipped.clear()
+        return counts
+
+    def _stage_rows(self) -> None:
+        self.cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS import_classes (
+                classId INTEGER PRIMARY KEY
+            )
+        """)
+        self.cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS import_students (
+                classId INTEGER NOT NULL,
+                rollNumber TEXT NOT NULL,
+                studentName TEXT,
+                language TEXT,
+                dateOfBirth TEXT,
+                PRIMARY KEY (classId, rollNumber)
+            )
+        """)
+
+        # Temp tables live as long as the connection, clear any previous import
+        self.cursor.execute("DELETE FROM import_classes")
+        self.cursor.execute("DELETE FROM import_students")
+
+        self.cursor.executemany(
+            "INSERT INTO import_classes (classId) VALUES (?)",
+            [(class_id,) for class_id in self._classes],
+        )
+        self.cursor.executemany(
+            """
+            INSERT INTO import_students (classId, rollNumber, studentName, language, dateOfBirth)
+            VALUES (?, ?, ?, ?, ?)
+        """,
+            [(class_id, *row) for class_id, students in self._classes.items() for row in students.values()],
+        )
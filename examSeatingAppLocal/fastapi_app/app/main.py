@@ -1,7 +1,13 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import init_database
-from .routes import classes, students, exam_rooms, schedule, csv_routes, bulk_import, auth
+from .auth_tokens import SessionTokens, require_user
+from .database import get_pool
+from .executors import executor_stats, shutdown_executors
+from .import_jobs import ImportJobs
+from .read_model import ReadModel
+from .repository import get_repository, close_repository
+from .uploads import UploadLimitMiddleware
+from .routes import classes, students, exam_rooms, schedule, csv_routes, bulk_import, auth, saved_schedules
 from .config import settings
 
 def create_app() -> FastAPI:
@@ -12,6 +18,16 @@ def create_app() -> FastAPI:
         version=settings.API_VERSION
     )
 
+    # Refuse oversized uploads while they arrive, by the file limit of their route;
+    # added first so CORS headers reach the 413 too
+    app.add_middleware(UploadLimitMiddleware, route_limits={
+        "/bulk-import/excel": "EXCEL_UPLOAD_MAX_BYTES",
+        "/bulk-import/excel/selective": "EXCEL_UPLOAD_MAX_BYTES",
+        "/bulk-import/validate": "EXCEL_UPLOAD_MAX_BYTES",
+        "/upload-csv": "CSV_UPLOAD_MAX_BYTES",
+        "/upload-exam-rooms-csv": "CSV_UPLOAD_MAX_BYTES",
+    })
+
     # Enable CORS
     app.add_middleware(
         CORSMiddleware,
@@ -21,17 +37,20 @@ def create_app() -> FastAPI:
         allow_headers=settings.CORS_ALLOW_HEADERS,
     )
 
-    # Initialize database
-    init_database()
+    # Initialize storage (SQLite: bring the schema up to date, memory: load the snapshot)
+    get_repository()
 
-    # Include routers
+    # Include routers; everything but login/logout needs a session token unless AUTH_REQUIRED is off
+    # (user management always does, see routes/auth.py)
+    authenticated = [Depends(require_user)]
     app.include_router(auth.router)
-    app.include_router(classes.router)
-    app.include_router(students.router)
-    app.include_router(exam_rooms.router)
-    app.include_router(schedule.router)
-    app.include_router(csv_routes.router)
-    app.include_router(bulk_import.router)
+    app.include_router(classes.router, dependencies=authenticated)
+    app.include_router(students.router, dependencies=authenticated)
+    app.include_router(exam_rooms.router, dependencies=authenticated)
+    app.include_router(schedule.router, dependencies=authenticated)
+    app.include_router(saved_schedules.router, dependencies=authenticated)
+    app.include_router(csv_routes.router, dependencies=authenticated)
+    app.include_router(bulk_import.router, dependencies=authenticated)
 
     @app.get("/")
     def root():
@@ -39,7 +58,18 @@ def create_app() -> FastAPI:
 
     @app.get("/health")
     def health_check():
-        return {"status": "healthy"}
+        return {
+            "status": "healthy",
+            "storage": get_repository().stats(),
+            "database_pool": get_pool().stats(),
+            "executors": executor_stats(),
+            "read_model": ReadModel.stats(),
+            "auth": SessionTokens.stats(),
+            "import_jobs": ImportJobs.stats(),
+        }
+
+    app.add_event_handler("shutdown", shutdown_executors)
+    app.add_event_handler("shutdown", close_repository)
 
     return app
 
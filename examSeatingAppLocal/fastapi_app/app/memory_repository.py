@@ -0,0 +1,628 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from .config import settings
+from .read_model import ClassTable, MemoryScheduleLoader, ReadSnapshot, RoomTable, StudentTable
+from .repository import (
+    DuplicateKeyError,
+    Repository,
+    RoomValues,
+    ScheduleRoomRow,
+    ScheduleRoomValues,
+    ScheduleSeatRow,
+    ScheduleSeatValues,
+    StorageTransaction,
+    StudentRow,
+    UserRow,
+)
+
+TABLES = ("classes", "students", "examRooms", "users", "revokedTokens", "schedules", "scheduleRooms", "scheduleSeats")
+
+# Column order of each table as stored here and in snapshot files (after the id)
+COLUMNS = {
+    "classes": ("className", "shift"),
+    "students": ("rollNumber", "studentName", "language", "dateOfBirth", "classId"),
+    "examRooms": ("roomNumber", "roomCapacity", "roomFloor", "roomBuilding", "roomRows", "benchesPerRow", "seatsPerBench"),
+    "users": ("username", "password", "name", "created_at"),
+    "revokedTokens": ("tokenId", "expiresAt"),
+    "schedules": ("date", "request", "classInfo", "createdAt", "updatedAt"),
+    "scheduleRooms": (
+        "scheduleId", "position", "roomId", "roomNumber", "capacity", "seatRows", "benchesPerRow", "seatsPerBench", "seated",
+    ),
+    "scheduleSeats": (
+        "scheduleId", "scheduleRoomId", "classId", "className", "rollNumber", "studentName", "language",
+        "seatRow", "seatBench", "seatNumber",
+    ),
+}
+
+
+def _text(value):
+    """Store numbers given for TEXT columns as text, like SQLite's column affinity does"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return value
+
+
+def _unindex(index: Dict, key, row_id: int) -> None:
+    """Remove a row id from an index of id sets, dropping the key when its set empties"""
+    row_ids = index[key]
+    row_ids.discard(row_id)
+    if not row_ids:
+        del index[key]
+
+
+def _timestamp() -> str:
+    # Same format as SQLite's CURRENT_TIMESTAMP
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+
+class MemoryTransaction(StorageTransaction):
+    """
+    Changes go straight into the repository's tables, each recorded with the
+    row it replaced; rolling back restores those rows in reverse order.
+    """
+
+    def __init__(self, repository: "MemoryRepository"):
+        self.repository = repository
+        self._undo: List[Tuple[str, int, Optional[Tuple]]] = []
+        self._next_ids = dict(repository.next_ids)
+
+    def _put(self, table: str, row_id: int, row: Optional[Tuple]) -> None:
+        self._undo.append((table, row_id, self.repository.put(table, row_id, row)))
+
+    def _insert(self, table: str, row: Tuple) -> int:
+        row_id = self.repository.next_ids[table]
+        self.repository.next_ids[table] = row_id + 1
+        self._put(table, row_id, row)
+        return row_id
+
+    def rollback(self) -> None:
+        for table, row_id, row in reversed(self._undo):
+            self.repository.put(table, row_id, row)
+        self.repository.next_ids.update(self._next_ids)
+        self._undo.clear()
+
+    def class_exists(self, class_id: int) -> bool:
+        return class_id in self.repository.tables["classes"]
+
+    def find_class_id(self, class_name: str, shift: Optional[str] = None) -> Optional[int]:
+        class_name, shift = _text(class_name), _text(shift)
+        for class_id, (name, class_shift) in self.repository.tables["classes"].items():
+            if name == class_name and (shift is None or class_shift == shift):
+                return class_id
+        return None
+
+    def create_class(self, class_name: str, shift: Optional[str]) -> int:
+        return self._insert("classes", (_text(class_name), _text(shift)))
+
+    def update_class(self, class_id: int, class_name: str, shift: Optional[str]) -> None:
+        if class_id in self.repository.tables["classes"]:
+            self._put("classes", class_id, (_text(class_name), _text(shift)))
+
+    def delete_class(self, class_id: int) -> None:
+        for student_id in list(self.repository.class_students.get(class_id, {}).values()):
+            self._put("students", student_id, None)
+        if class_id in self.repository.tables["classes"]:
+            self._put("classes", class_id, None)
+
+    def student_exists(self, student_id: int) -> bool:
+        return student_id in self.repository.tables["students"]
+
+    def count_students(self, class_id: int) -> int:
+        return len(self.repository.class_students.get(class_id, {}))
+
+    def create_student(self, class_id: int, row: StudentRow) -> int:
+        row = tuple(_text(value) for value in row)
+        if row[0] in self.repository.class_students.get(class_id, {}):
+            raise DuplicateKeyError("UNIQUE constraint failed: students.rollNumber, students.classId")
+        return self._insert("students", (*row, class_id))
+
+    def delete_student(self, student_id: int) -> None:
+        if student_id in self.repository.tables["students"]:
+            self._put("students", student_id, None)
+
+    def replace_students(
+        self, rows_by_class: Dict[int, List[StudentRow]]
+    ) -> Tuple[Dict[int, Dict[str, int]], Dict[int, List[str]]]:
+        # Same rules and counts as StudentImportWriter
+        students = self.repository.tables["students"]
+        counts: Dict[int, Dict[str, int]] = {}
+        skipped: Dict[int, List[str]] = {}
+        for class_id, rows in rows_by_class.items():
+            staged: Dict[str, Tuple] = {}
+            skipped[class_id] = []
+            for row in rows:
+                row = tuple(_text(value) for value in row)
+                if row[0] is None or row[0] in staged:
+                    skipped[class_id].append(row[0])
+                else:
+                    staged[row[0]] = row
+
+            class_counts = counts[class_id] = {
+                "inserted": 0, "updated": 0, "deleted": 0, "unchanged": len(staged), "skipped": len(skipped[class_id]),
+            }
+            existing = dict(self.repository.class_students.get(class_id, {}))
+            for roll_number, student_id in existing.items():
+                if roll_number not in staged:
+                    self._put("students", student_id, None)
+                    class_counts["deleted"] += 1
+            for roll_number, row in staged.items():
+                student_id = existing.get(roll_number)
+                if student_id is None:
+                    self._insert("students", (*row, class_id))
+                    class_counts["inserted"] += 1
+                elif students[student_id][1:4] != row[1:4]:
+                    self._put("students", student_id, (*row, class_id))
+                    class_counts["updated"] += 1
+                else:
+                    continue
+                class_counts["unchanged"] -= 1
+        return counts, skipped
+
+    def room_exists(self, room_id: int) -> bool:
+        return room_id in self.repository.tables["examRooms"]
+
+    def find_room_id(self, room_number: str) -> Optional[int]:
+        room_number = _text(room_number)
+        for room_id, row in self.repository.tables["examRooms"].items():
+            if row[0] == room_number:
+                return room_id
+        return None
+
+    @staticmethod
+    def _room_row(values: RoomValues) -> Tuple:
+        number, capacity, floor, building, rows, benches, seats = values
+        return (_text(number), capacity, _text(floor), _text(building), rows, benches, seats)
+
+    def create_room(self, values: RoomValues) -> int:
+        return self._insert("examRooms", self._room_row(values))
+
+    def update_room(self, room_id: int, values: RoomValues) -> None:
+        if room_id in self.repository.tables["examRooms"]:
+            self._put("examRooms", room_id, self._room_row(values))
+
+    def delete_room(self, room_id: int) -> None:
+        if room_id in self.repository.tables["examRooms"]:
+            self._put("examRooms", room_id, None)
+
+    def get_username(self, user_id: int) -> Optional[str]:
+        row = self.repository.tables["users"].get(user_id)
+        return row[0] if row else None
+
+    def create_user(self, username: str, password: str, name: str) -> int:
+        username = _text(username)
+        if username in self.repository.usernames:
+            raise DuplicateKeyError("UNIQUE constraint failed: users.username")
+        return self._insert("users", (username, _text(password), _text(name), _timestamp()))
+
+    def delete_user(self, user_id: int) -> None:
+        if user_id in self.repository.tables["users"]:
+            self._put("users", user_id, None)
+
+    def revoke_token(self, token_id: str, expires_at: int) -> None:
+        now = int(time.time())
+        for row_id, (_, row_expires_at) in list(self.repository.tables["revokedTokens"].items()):
+            if row_expires_at <= now:
+                self._put("revokedTokens", row_id, None)
+        if token_id not in self.repository.revoked_token_ids:
+            self._insert("revokedTokens", (token_id, expires_at))
+
+    def get_class(self, class_id: int) -> Optional[Tuple[str, Optional[str]]]:
+        return self.repository.tables["classes"].get(class_id)
+
+    def get_student(self, class_id: int, roll_number: str) -> Optional[StudentRow]:
+        student_id = self.repository.class_students.get(class_id, {}).get(_text(roll_number))
+        return self.repository.tables["students"][student_id][:4] if student_id is not None else None
+
+    def get_room(self, room_id: int) -> Optional[RoomValues]:
+        return self.repository.tables["examRooms"].get(room_id)
+
+    def get_schedule(self, schedule_id: int) -> Optional[Tuple[str, str]]:
+        row = self.repository.tables["schedules"].get(schedule_id)
+        return row[1:3] if row else None
+
+    def create_schedule(self, date: str, request: str, class_info: str) -> int:
+        created_at = _timestamp()
+        return self._insert("schedules", (_text(date), request, class_info, created_at, created_at))
+
+    def update_schedule(self, schedule_id: int, request: str, class_info: str) -> None:
+        row = self.repository.tables["schedules"].get(schedule_id)
+        if row is not None:
+            self._put("schedules", schedule_id, (row[0], request, class_info, row[3], _timestamp()))
+
+    def delete_schedule(self, schedule_id: int) -> None:
+        for schedule_room_id in list(self.repository.schedule_room_ids.get(schedule_id, ())):
+            self.delete_schedule_room(schedule_room_id)
+        if schedule_id in self.repository.tables["schedules"]:
+            self._put("schedules", schedule_id, None)
+
+    def schedule_rooms(self, schedule_id: int, room_id: Optional[int] = None) -> List[ScheduleRoomRow]:
+        rooms = [self.schedule_room(row_id) for row_id in self.repository.schedule_room_ids.get(schedule_id, ())]
+        return sorted((room for room in rooms if room_id is None or room[2] == room_id), key=lambda room: room[1])
+
+    def schedule_room(self, schedule_room_id: int) -> Optional[ScheduleRoomRow]:
+        row = self.repository.tables["scheduleRooms"].get(schedule_room_id)
+        return (schedule_room_id, *row[1:]) if row else None
+
+    def first_open_room(self, schedule_id: int, exclude: List[int]) -> Optional[ScheduleRoomRow]:
+        rooms = self.repository.tables["scheduleRooms"]
+        open_rooms = self.repository.open_room_ids.get(schedule_id, set()).difference(exclude)
+        if not open_rooms:
+            return None
+        return self.schedule_room(min(open_rooms, key=lambda row_id: rooms[row_id][1]))
+
+    def last_room_position(self, schedule_id: int) -> Optional[int]:
+        rooms = self.repository.tables["scheduleRooms"]
+        return max((rooms[row_id][1] for row_id in self.repository.schedule_room_ids.get(schedule_id, ())), default=None)
+
+    def create_schedule_room(self, schedule_id: int, values: ScheduleRoomValues) -> int:
+        position, room_id, room_number, *rest = values
+        return self._insert("scheduleRooms", (schedule_id, position, room_id, _text(room_number), *rest))
+
+    def update_schedule_room(self, schedule_room_id: int, seat_rows: int, seated: int) -> None:
+        row = self.repository.tables["scheduleRooms"].get(schedule_room_id)
+        if row is not None:
+            self._put("scheduleRooms", schedule_room_id, (*row[:5], seat_rows, *row[6:8], seated))
+
+    def delete_schedule_room(self, schedule_room_id: int) -> None:
+        self.delete_schedule_seats(list(self.repository.room_seat_ids.get(schedule_room_id, ())))
+        if schedule_room_id in self.repository.tables["scheduleRooms"]:
+            self._put("scheduleRooms", schedule_room_id, None)
+
+    def add_schedule_seats(self, schedule_id: int, seats: List[ScheduleSeatValues]) -> None:
+        for seat in seats:
+            if (schedule_id, seat[1], seat[3]) in self.repository.schedule_seat_ids:
+                raise DuplicateKeyError(
+                    "UNIQUE constraint failed: scheduleSeats.scheduleId, scheduleSeats.classId, scheduleSeats.rollNumber"
+                )
+            self._insert("scheduleSeats", (schedule_id, *seat))
+
+    def _seat_row(self, seat_id: int) -> ScheduleSeatRow:
+        return (seat_id, *self.repository.tables["scheduleSeats"][seat_id][1:])
+
+    def schedule_seat(self, schedule_id: int, class_id: int, roll_number: str) -> Optional[ScheduleSeatRow]:
+        seat_id = self.repository.schedule_seat_ids.get((schedule_id, class_id, _text(roll_number)))
+        return self._seat_row(seat_id) if seat_id is not None else None
+
+    def room_seats(self, schedule_room_id: int) -> List[ScheduleSeatRow]:
+        seats = [self._seat_row(seat_id) for seat_id in self.repository.room_seat_ids.get(schedule_room_id, ())]
+        return sorted(seats, key=lambda seat: (seat[4], seat[0]))
+
+    def delete_schedule_seats(self, seat_ids: List[int]) -> None:
+        for seat_id in seat_ids:
+            if seat_id in self.repository.tables["scheduleSeats"]:
+                self._put("scheduleSeats", seat_id, None)
+
+    def class_seats_by_room(self, schedule_id: int, class_id: int) -> Dict[int, int]:
+        seats = self.repository.tables["scheduleSeats"]
+        counts: Dict[int, int] = {}
+        for seat_id in self.repository.class_seat_ids.get((schedule_id, class_id), ()):
+            schedule_room_id = seats[seat_id][1]
+            counts[schedule_room_id] = counts.get(schedule_room_id, 0) + 1
+        return counts
+
+    def seated_roll_numbers(self, schedule_id: int, class_id: int) -> List[str]:
+        seats = self.repository.tables["scheduleSeats"]
+        return [seats[seat_id][4] for seat_id in self.repository.class_seat_ids.get((schedule_id, class_id), ())]
+
+
+class MemoryRepository(Repository):
+    """
+    All data in Python dicts, one per table ({id: row tuple}), plus the
+    indexes the services need: students by class and roll number, users by
+    username, revoked tokens by token id, saved schedule rooms by schedule and
+    their seats by room, class and student. Transactions are serialised by one lock. Reads are served from
+    read model snapshots (as the SQLite backend's ReadModel does), rebuilt
+    table by table after changes.
+
+    With a snapshot path, the data is loaded from that file at start-up and
+    written back to it atomically every MEMORY_SNAPSHOT_INTERVAL seconds
+    when changed, and on shutdown. Snapshots are SQLite databases with the
+    regular schema, so a snapshot can be opened by the SQLite backend and an
+    existing database file can seed the memory backend.
+    """
+
+    name = "memory"
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path
+        self._lock = threading.RLock()
+        self.tables: Dict[str, Dict[int, Tuple]] = {table: {} for table in TABLES}
+        self.next_ids: Dict[str, int] = {table: 1 for table in TABLES}
+        self.class_students: Dict[int, Dict[str, int]] = {}
+        self.usernames: Dict[str, int] = {}
+        self.revoked_token_ids: Dict[str, int] = {}
+        # scheduleId -> scheduleRoom ids, and those with seated < capacity; scheduleRoomId -> seat ids;
+        # (scheduleId, classId) -> seat ids; (scheduleId, classId, rollNumber) -> seat id
+        self.schedule_room_ids: Dict[int, Set[int]] = {}
+        self.open_room_ids: Dict[int, Set[int]] = {}
+        self.room_seat_ids: Dict[int, Set[int]] = {}
+        self.class_seat_ids: Dict[Tuple[int, int], Set[int]] = {}
+        self.schedule_seat_ids: Dict[Tuple[int, int, str], int] = {}
+        # Bumped on every change: snapshot freshness and dirty tracking
+        self.versions: Dict[str, int] = {table: 0 for table in TABLES}
+        # Classes whose students changed since the read snapshot was built
+        self._changed_classes: Set[int] = set()
+        self._read_snapshot: Optional[ReadSnapshot] = None
+        self._saved_versions: Optional[Tuple[int, ...]] = None
+        self._snapshot_stats = {"saves": 0, "last_save_ms": 0.0, "last_saved_at": None}
+
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.load_snapshot(snapshot_path)
+        else:
+            with self.transaction() as tx:
+                tx.create_user("admin", "Admin@123", "Administrator")
+
+        self._stop = threading.Event()
+        self._saver: Optional[threading.Thread] = None
+        if snapshot_path and settings.MEMORY_SNAPSHOT_INTERVAL > 0:
+            self._saver = threading.Thread(target=self._save_periodically, name="memory-snapshot", daemon=True)
+            self._saver.start()
+
+    def put(self, table: str, row_id: int, row: Optional[Tuple]) -> Optional[Tuple]:
+        """Set (or with None, delete) a row, keeping the indexes current; returns the previous row"""
+        rows = self.tables[table]
+        previous = rows.pop(row_id, None)
+        if table == "students" and previous is not None:
+            class_rolls = self.class_students[previous[4]]
+            del class_rolls[previous[0]]
+            if not class_rolls:
+                del self.class_students[previous[4]]
+            self._changed_classes.add(previous[4])
+        elif table == "users" and previous is not None:
+            del self.usernames[previous[0]]
+        elif table == "revokedTokens" and previous is not None:
+            del self.revoked_token_ids[previous[0]]
+        elif table == "scheduleRooms" and previous is not None:
+            _unindex(self.schedule_room_ids, previous[0], row_id)
+            if previous[8] < previous[4]:
+                _unindex(self.open_room_ids, previous[0], row_id)
+        elif table == "scheduleSeats" and previous is not None:
+            _unindex(self.room_seat_ids, previous[1], row_id)
+            _unindex(self.class_seat_ids, (previous[0], previous[2]), row_id)
+            del self.schedule_seat_ids[(previous[0], previous[2], previous[4])]
+
+        if row is not None:
+            rows[row_id] = row
+            if table == "students":
+                self.class_students.setdefault(row[4], {})[row[0]] = row_id
+                self._changed_classes.add(row[4])
+            elif table == "users":
+                self.usernames[row[0]] = row_id
+            elif table == "revokedTokens":
+                self.revoked_token_ids[row[0]] = row_id
+            elif table == "scheduleRooms":
+                self.schedule_room_ids.setdefault(row[0], set()).add(row_id)
+                if row[8] < row[4]:
+                    self.open_room_ids.setdefault(row[0], set()).add(row_id)
+            elif table == "scheduleSeats":
+                self.room_seat_ids.setdefault(row[1], set()).add(row_id)
+                self.class_seat_ids.setdefault((row[0], row[2]), set()).add(row_id)
+                self.schedule_seat_ids[(row[0], row[2], row[4])] = row_id
+        self.versions[table] += 1
+        return previous
+
+    @contextmanager
+    def transaction(self) -> Iterator[MemoryTransaction]:
+        with self._lock:
+            tx = MemoryTransaction(self)
+            try:
+                yield tx
+            except BaseException:
+                tx.rollback()
+                raise
+
+    def _snapshot(self) -> ReadSnapshot:
+        """
+        Current read snapshot, rebuilding only the tables changed since the
+        last one; students are patched for the classes changed since then
+        """
+        with self._lock:
+            versions = tuple(self.versions[table] for table in ("classes", "students", "examRooms"))
+            snapshot = self._read_snapshot
+            if snapshot is not None and snapshot.versions == versions:
+                return snapshot
+
+            def changed(position: int) -> bool:
+                return snapshot is None or snapshot.versions[position] != versions[position]
+
+            classes = ClassTable(sorted(
+                (class_id, *row) for class_id, row in self.tables["classes"].items()
+            )) if changed(0) else snapshot.classes
+            if snapshot is None:
+                students = StudentTable(sorted(
+                    ((student_id, *row) for student_id, row in self.tables["students"].items()),
+                    key=lambda row: (row[5], row[0]),
+                ))
+            elif changed(1):
+                students_table = self.tables["students"]
+                students = snapshot.students.patched(self._changed_classes, [
+                    (student_id, *students_table[student_id])
+                    for class_id in sorted(self._changed_classes)
+                    for student_id in sorted(self.class_students.get(class_id, {}).values())
+                ])
+            else:
+                students = snapshot.students
+            self._changed_classes = set()
+            rooms = RoomTable(sorted(
+                (room_id, *row) for room_id, row in self.tables["examRooms"].items()
+            )) if changed(2) else snapshot.rooms
+
+            self._read_snapshot = ReadSnapshot(versions, classes, students, rooms)
+            return self._read_snapshot
+
+    def list_classes(
+        self, limit: Optional[int], after: Optional[int], include_students: bool, fields: List[str]
+    ) -> Dict[str, any]:
+        return self._snapshot().list_classes(limit, after, include_students, fields)
+
+    def students_of_class(self, class_id: int) -> List[Dict]:
+        return self._snapshot().students_of_class(class_id)
+
+    def list_exam_rooms(self) -> List[Tuple]:
+        return self._snapshot().exam_rooms()
+
+    def search_students(self, query: str, limit: int, offset: int, class_id: Optional[int]) -> Dict[str, any]:
+        return self._snapshot().search_students(query, limit, offset, class_id)
+
+    @contextmanager
+    def schedule_loader(self) -> Iterator[MemoryScheduleLoader]:
+        yield MemoryScheduleLoader(self._snapshot())
+
+    def authenticate_user(self, username: str, password: str) -> Optional[UserRow]:
+        with self._lock:
+            user_id = self.usernames.get(username)
+            if user_id is None:
+                return None
+            username, stored_password, name, created_at = self.tables["users"][user_id]
+            return (user_id, username, name, created_at) if stored_password == password else None
+
+    def list_users(self) -> List[UserRow]:
+        with self._lock:
+            users = [
+                (user_id, username, name, created_at)
+                for user_id, (username, _, name, created_at) in self.tables["users"].items()
+                if username != "admin"
+            ]
+        return sorted(users, key=lambda user: (user[3], user[0]), reverse=True)
+
+    def token_revoked(self, token_id: str, user_id: int) -> bool:
+        with self._lock:
+            return token_id in self.revoked_token_ids or user_id not in self.tables["users"]
+
+    def list_schedules(self) -> List[Tuple]:
+        with self._lock:
+            rooms = self.tables["scheduleRooms"]
+            schedules = []
+            for schedule_id, (date, _, _, created_at, updated_at) in self.tables["schedules"].items():
+                room_ids = self.schedule_room_ids.get(schedule_id, ())
+                seated = sum(rooms[room_id][8] for room_id in room_ids)
+                schedules.append((schedule_id, date, created_at, updated_at, len(room_ids), seated))
+        return sorted(schedules, reverse=True)
+
+    def load_schedule(
+        self, schedule_id: int
+    ) -> Optional[Tuple[Tuple[str, str, str, str], List[ScheduleRoomRow], List[ScheduleSeatRow]]]:
+        with self._lock:
+            schedule = self.tables["schedules"].get(schedule_id)
+            if schedule is None:
+                return None
+            date, _, class_info, created_at, updated_at = schedule
+            tx = MemoryTransaction(self)
+            rooms = tx.schedule_rooms(schedule_id)
+            seats = [seat for room in rooms for seat in tx.room_seats(room[0])]
+        return (date, class_info, created_at, updated_at), rooms, sorted(seats, key=lambda seat: (seat[4], seat[0]))
+
+    def load_snapshot(self, path: str) -> None:
+        """Replace all data with the contents of a snapshot (or any database file of this app)"""
+        from .migrations import migrate
+
+        conn = sqlite3.connect(path)
+        try:
+            # Older snapshots and database files are brought up to the current schema first
+            migrate(conn)
+            cursor = conn.cursor()
+            data = {}
+            for table in TABLES:
+                cursor.execute(f"SELECT id, {', '.join(COLUMNS[table])} FROM {table} ORDER BY id")
+                data[table] = cursor.fetchall()
+            cursor.execute("SELECT name, seq FROM sqlite_sequence")
+            sequences = dict(cursor.fetchall())
+        finally:
+            conn.close()
+
+        with self._lock:
+            for table in TABLES:
+                self.tables[table] = {}
+            self.class_students.clear()
+            self.usernames.clear()
+            self.revoked_token_ids.clear()
+            for index in (
+                self.schedule_room_ids, self.open_room_ids, self.room_seat_ids, self.class_seat_ids, self.schedule_seat_ids,
+            ):
+                index.clear()
+            # Tables are replaced wholesale, not through put(): rebuild, don't patch
+            self._read_snapshot = None
+            for table in TABLES:
+                for row in data[table]:
+                    self.put(table, row[0], tuple(row[1:]))
+                # AUTOINCREMENT never reuses ids, even those of deleted rows
+                last_id = max(sequences.get(table, 0), data[table][-1][0] if data[table] else 0)
+                self.next_ids[table] = last_id + 1
+            self._saved_versions = tuple(self.versions[table] for table in TABLES)
+
+    def save_snapshot(self, path: Optional[str] = None) -> None:
+        """Write all data to a snapshot file, replacing it atomically"""
+        from .migrations import migrate
+
+        path = path or self.snapshot_path
+        started = time.perf_counter()
+        with self._lock:
+            versions = tuple(self.versions[table] for table in TABLES)
+            data = {table: [(row_id, *row) for row_id, row in self.tables[table].items()] for table in TABLES}
+            next_ids = dict(self.next_ids)
+
+        temporary = f"{path}.tmp"
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        conn = sqlite3.connect(temporary)
+        try:
+            migrate(conn)
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            # migrate() seeds the admin user, the snapshot's users replace it
+            cursor.execute("DELETE FROM users")
+            for table in TABLES:
+                columns = ("id",) + COLUMNS[table]
+                cursor.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                    sorted(data[table]),
+                )
+                cursor.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+                cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, next_ids[table] - 1))
+            conn.commit()
+        finally:
+            conn.close()
+
+        # A journal left by a SQLite backend run would be replayed onto the new file
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        os.replace(temporary, path)
+
+        with self._lock:
+            self._saved_versions = versions
+            self._snapshot_stats["saves"] += 1
+            self._snapshot_stats["last_save_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            self._snapshot_stats["last_saved_at"] = _timestamp()
+
+    def _dirty(self) -> bool:
+        with self._lock:
+            return self._saved_versions != tuple(self.versions[table] for table in TABLES)
+
+    def _save_periodically(self) -> None:
+        while not self._stop.wait(settings.MEMORY_SNAPSHOT_INTERVAL):
+            if self._dirty():
+                try:
+                    self.save_snapshot()
+                except (OSError, sqlite3.Error) as e:
+                    print(f"Memory snapshot failed: {e}")
+
+    def stats(self) -> Dict[str, any]:
+        with self._lock:
+            return {
+                "backend": self.name,
+                **{table: len(rows) for table, rows in self.tables.items()},
+                "snapshot_path": self.snapshot_path,
+                "snapshot": dict(self._snapshot_stats),
+            }
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._saver is not None:
+            self._saver.join()
+        if self.snapshot_path and self._dirty():
+            self.save_snapshot()
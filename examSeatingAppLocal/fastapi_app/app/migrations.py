@@ -0,0 +1,371 @@
+"""
+Versioned schema migrations.
+
+Every migration runs once, in order, in its own transaction, and is recorded
+in the schemaMigrations table. Migrations written for databases created before
+migrations existed (tables and columns may already be there) use
+CREATE ... IF NOT EXISTS and _add_column, so they are safe on any earlier
+schema. New schema changes are appended to MIGRATIONS and never edited once
+released.
+
+    python -m app.migrations          # apply pending migrations
+    python -m app.migrations --check  # also verify the hot queries use indexes
+"""
+import sqlite3
+import sys
+from typing import Callable, Dict, List, Tuple
+
+
+def _columns(cursor, table: str) -> List[str]:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def _add_column(cursor, table: str, column: str, definition: str) -> None:
+    if column not in _columns(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _base_schema(cursor) -> None:
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS classes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        className TEXT NOT NULL,
+        shift TEXT
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        rollNumber TEXT NOT NULL,
+        studentName TEXT,
+        language TEXT,
+        dateOfBirth TEXT,
+        classId INTEGER NOT NULL,
+        FOREIGN KEY (classId) REFERENCES classes (id) ON DELETE CASCADE,
+        UNIQUE(rollNumber, classId)
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS examRooms (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        roomNumber TEXT NOT NULL,
+        roomCapacity INTEGER NOT NULL,
+        roomFloor TEXT NOT NULL,
+        roomBuilding TEXT NOT NULL
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        password TEXT NOT NULL,
+        name TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    # Columns added after the first release
+    _add_column(cursor, "classes", "shift", "TEXT")
+    _add_column(cursor, "students", "language", "TEXT")
+    _add_column(cursor, "students", "dateOfBirth", "TEXT")
+
+    # Create default admin user
+    cursor.execute(
+        "INSERT OR IGNORE INTO users (username, password, name) VALUES (?, ?, ?)",
+        ("admin", "Admin@123", "Administrator")
+    )
+
+
+def _room_seat_grid(cursor) -> None:
+    # Optional seat grid: rows x benches per row x seats per bench
+    for column in ("roomRows", "benchesPerRow", "seatsPerBench"):
+        _add_column(cursor, "examRooms", column, "INTEGER")
+
+
+def _saved_schedules(cursor) -> None:
+    # Persisted schedules: one row per schedule, its rooms in request order and one row per seated student
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schedules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        request TEXT NOT NULL,
+        classInfo TEXT NOT NULL,
+        createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS scheduleRooms (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scheduleId INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        roomId INTEGER,
+        roomNumber TEXT NOT NULL,
+        capacity INTEGER NOT NULL,
+        seatRows INTEGER NOT NULL,
+        benchesPerRow INTEGER NOT NULL,
+        seatsPerBench INTEGER NOT NULL,
+        seated INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (scheduleId) REFERENCES schedules (id) ON DELETE CASCADE
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS scheduleSeats (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scheduleId INTEGER NOT NULL,
+        scheduleRoomId INTEGER NOT NULL,
+        classId INTEGER NOT NULL,
+        className TEXT,
+        rollNumber TEXT NOT NULL,
+        studentName TEXT,
+        language TEXT,
+        seatRow INTEGER NOT NULL,
+        seatBench INTEGER NOT NULL,
+        seatNumber INTEGER NOT NULL,
+        FOREIGN KEY (scheduleId) REFERENCES schedules (id) ON DELETE CASCADE,
+        FOREIGN KEY (scheduleRoomId) REFERENCES scheduleRooms (id) ON DELETE CASCADE,
+        UNIQUE(scheduleId, classId, rollNumber)
+    )
+    """)
+
+    # Re-seating looks up one room's seats and one class's seats at a time
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scheduleRooms_schedule ON scheduleRooms (scheduleId, position)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scheduleSeats_room ON scheduleSeats (scheduleRoomId)")
+
+
+def _lookup_indexes(cursor) -> None:
+    # Students of a class (listing, deletes, schedule loading) in roll-number order
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_class_roll ON students (classId, rollNumber)")
+    # Language filters within a class
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_class_language ON students (classId, language)")
+    # Class lookup by name and shift during imports
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_classes_name_shift ON classes (className, shift)")
+    # Rooms by building and floor
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_examRooms_building_floor ON examRooms (roomBuilding, roomFloor)")
+
+
+def _fts5_available(cursor) -> bool:
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts5Probe USING fts5(value)")
+    except sqlite3.OperationalError:
+        return False
+    cursor.execute("DROP TABLE temp.fts5Probe")
+    return True
+
+
+def _student_search(cursor) -> None:
+    # Full-text index over roll number, student name and class name; rowid is the student id.
+    # Without FTS5 in this SQLite build search falls back to LIKE (see SqliteRepository).
+    if not _fts5_available(cursor):
+        return
+
+    cursor.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS studentSearch USING fts5(
+        rollNumber, studentName, className, classId UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '1 2 3'
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS students_search_insert AFTER INSERT ON students BEGIN
+        INSERT INTO studentSearch (rowid, rollNumber, studentName, className, classId)
+        SELECT NEW.id, NEW.rollNumber, NEW.studentName, className, NEW.classId FROM classes WHERE id = NEW.classId;
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS students_search_delete AFTER DELETE ON students BEGIN
+        DELETE FROM studentSearch WHERE rowid = OLD.id;
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS students_search_update
+    AFTER UPDATE OF rollNumber, studentName, classId ON students BEGIN
+        DELETE FROM studentSearch WHERE rowid = OLD.id;
+        INSERT INTO studentSearch (rowid, rollNumber, studentName, className, classId)
+        SELECT NEW.id, NEW.rollNumber, NEW.studentName, className, NEW.classId FROM classes WHERE id = NEW.classId;
+    END
+    """)
+    # Renaming a class re-indexes its students, found through idx_students_class_roll
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS classes_search_rename AFTER UPDATE OF className ON classes BEGIN
+        UPDATE studentSearch SET className = NEW.className
+        WHERE rowid IN (SELECT id FROM students WHERE classId = NEW.id);
+    END
+    """)
+
+    cursor.execute("DELETE FROM studentSearch")
+    cursor.execute("""
+    INSERT INTO studentSearch (rowid, rollNumber, studentName, className, classId)
+    SELECT s.id, s.rollNumber, s.studentName, c.className, s.classId
+    FROM students s JOIN classes c ON c.id = s.classId
+    """)
+
+
+def _revoked_tokens(cursor) -> None:
+    # Session tokens revoked before they expire (logout), seen by every worker and after restarts
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS revokedTokens (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tokenId TEXT NOT NULL UNIQUE,
+        expiresAt INTEGER NOT NULL
+    )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_revokedTokens_expires ON revokedTokens (expiresAt)")
+
+
+def _schedule_open_rooms(cursor) -> None:
+    # Seating a student looks for the first room by position with a free place
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_scheduleRooms_open ON scheduleRooms (scheduleId, position) WHERE seated < capacity"
+    )
+
+
+# (version, name, apply) in order; append only
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "base_schema", _base_schema),
+    (2, "room_seat_grid", _room_seat_grid),
+    (3, "saved_schedules", _saved_schedules),
+    (4, "lookup_indexes", _lookup_indexes),
+    (5, "student_search", _student_search),
+    (6, "revoked_tokens", _revoked_tokens),
+    (7, "schedule_open_rooms", _schedule_open_rooms),
+]
+
+
+def get_schema_version(cursor) -> int:
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'schemaMigrations'")
+    if cursor.fetchone() is None:
+        return 0
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schemaMigrations")
+    return cursor.fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> List[str]:
+    """Apply pending migrations and return the names of the ones applied"""
+    cursor = conn.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schemaMigrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        appliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.commit()
+
+    current = get_schema_version(cursor)
+    applied = []
+    for version, name, apply in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            # Explicit transaction, so DDL is rolled back together with the rest on failure
+            cursor.execute("BEGIN")
+            apply(cursor)
+            cursor.execute("INSERT INTO schemaMigrations (version, name) VALUES (?, ?)", (version, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(name)
+    return applied
+
+
+# Hot queries and the indexes that should serve them:
+# (name, sql, params, table as named in the plan, accepted indexes)
+HOT_QUERIES = [
+    (
+        "students_by_class",
+        "SELECT id, rollNumber, studentName, classId, language, dateOfBirth FROM students WHERE classId = ? ORDER BY id",
+        (1,),
+        "students",
+        ("idx_students_class_roll", "idx_students_class_language"),
+    ),
+    (
+        "delete_students_of_class",
+        "DELETE FROM students WHERE classId = ?",
+        (1,),
+        "students",
+        ("idx_students_class_roll", "idx_students_class_language"),
+    ),
+    (
+        "students_by_class_language",
+        "SELECT rollNumber FROM students WHERE classId = ? AND language = ?",
+        (1, "TAMIL"),
+        "students",
+        ("idx_students_class_language",),
+    ),
+    (
+        "class_students_join",
+        "SELECT c.id, s.id FROM classes c LEFT JOIN students s ON s.classId = c.id WHERE c.id > ? ORDER BY c.id, s.id",
+        (0,),
+        "s",
+        ("idx_students_class_roll", "idx_students_class_language"),
+    ),
+    (
+        "class_by_name_shift",
+        "SELECT id FROM classes WHERE className = ? AND shift = ?",
+        ("A", "I"),
+        "classes",
+        ("idx_classes_name_shift",),
+    ),
+    (
+        "rooms_by_building_floor",
+        "SELECT id FROM examRooms WHERE roomBuilding = ? AND roomFloor = ?",
+        ("Main", "1"),
+        "examRooms",
+        ("idx_examRooms_building_floor",),
+    ),
+    (
+        "open_schedule_room",
+        "SELECT id FROM scheduleRooms WHERE scheduleId = ? AND seated < capacity ORDER BY position LIMIT 1",
+        (1,),
+        "scheduleRooms",
+        ("idx_scheduleRooms_open",),
+    ),
+]
+
+
+def check_query_plans(cursor) -> List[Dict]:
+    """EXPLAIN QUERY PLAN the hot queries and report whether they use their indexes"""
+    report = []
+    for name, sql, params, table, indexes in HOT_QUERIES:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        plan = [row[3] for row in cursor.fetchall()]
+        steps = [step for step in plan if f" {table} " in f" {step} "]
+        uses_index = bool(steps) and all(
+            any(f"INDEX {index}" in step for index in indexes) for step in steps
+        )
+        report.append({"query": name, "uses_index": uses_index, "plan": plan})
+    return report
+
+
+def main(argv: List[str]) -> int:
+    from .database import get_connection
+
+    conn = get_connection()
+    try:
+        applied = migrate(conn)
+        print(f"Schema version {get_schema_version(conn.cursor())}"
+              + (f", applied: {', '.join(applied)}" if applied else ", up to date"))
+
+        if "--check" in argv:
+            report = check_query_plans(conn.cursor())
+            for entry in report:
+                status = "ok  " if entry["uses_index"] else "SCAN"
+                print(f"{status} {entry['query']}: {' | '.join(entry['plan'])}")
+            if not all(entry["uses_index"] for entry in report):
+                return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 from datetime import datetime
 
 class StudentModel(BaseModel):
@@ -44,11 +44,21 @@ class BulkImportResponse(BaseModel):
     studentsCreated: int
     details: List[Dict]
 
+class ImportJobAccepted(BaseModel):
+    jobId: str
+    status: str
+    statusUrl: str
+    eventsUrl: str
+
 class ExamRoomModel(BaseModel):
     roomNumber: str
     roomCapacity: int
     roomFloor: str
     roomBuilding: str
+    # Optional seat grid: rows x benches per row x seats per bench
+    roomRows: Optional[int] = None
+    benchesPerRow: Optional[int] = None
+    seatsPerBench: Optional[int] = None
 
 class ExamRoomResponseModel(ExamRoomModel):
     id: int
@@ -59,6 +69,8 @@ class ScheduleRequest(BaseModel):
     exam_rooms: List[int]
     split: bool
     language_selections: Optional[Dict[int, List[str]]] = None  # New field: {class_id: [languages]}
+    mode: str = "standard"  # Placement planner: "standard", "vectorized" or "optimized"
+    time_budget_ms: Optional[int] = None  # "optimized" mode search budget, defaults to the configured one
 
 class ScheduleResponse(BaseModel):
     date: str
@@ -66,6 +78,52 @@ class ScheduleResponse(BaseModel):
     class_summary: Optional[Dict[str, Dict[str, int]]] = None  # Room -> Class -> Count
     class_info: Optional[Dict[int, Dict[str, str]]] = None  # Class ID -> Class details
     language_summary: Optional[Dict[str, Dict[str, int]]] = None  # New: Room -> Language -> Count
+    room_layouts: Optional[Dict[str, Dict[str, int]]] = None  # Room -> rows, benchesPerRow, seatsPerBench, conflicts
+    load_stats: Optional[Dict[str, Union[int, float]]] = None  # Data loading: query_count, load_time_ms
+    cache: Optional[Dict[str, Union[str, int]]] = None  # status (hit/miss), hits, misses, size, max_size
+    optimization: Optional[Dict[str, Union[str, bool, int, float]]] = None  # "optimized" mode: status, fallback, rooms/buildings used, timings
+
+class BatchScheduleRequest(BaseModel):
+    sessions: List[ScheduleRequest]
+
+class BatchSessionResult(BaseModel):
+    index: int  # Position in the request's sessions list
+    date: str
+    status_code: int
+    schedule: Optional[ScheduleResponse] = None
+    error: Optional[str] = None
+    plan_time_ms: float
+
+class BatchScheduleResponse(BaseModel):
+    sessions: List[BatchSessionResult]
+    load_stats: Dict[str, Union[int, float]]  # Shared data load for all sessions
+    total_time_ms: float
+
+class SavedScheduleResponse(ScheduleResponse):
+    id: int
+    createdAt: str
+    updatedAt: str
+
+class ScheduleStudentRef(BaseModel):
+    classId: int
+    rollNumber: str
+
+class ScheduleStudentPatch(BaseModel):
+    add: List[ScheduleStudentRef] = []  # Students to seat (must exist in the class)
+    remove: List[ScheduleStudentRef] = []  # Students to unseat
+
+class ScheduleRoomPatch(BaseModel):
+    add: List[int] = []  # Exam room ids to make available
+    remove: List[int] = []  # Exam room ids to empty and drop, their students are re-seated
+
+class ScheduleLanguagePatch(BaseModel):
+    language_selections: Dict[int, List[str]]  # {class_id: [languages]}, empty list includes all
+
+class SchedulePatchResponse(BaseModel):
+    scheduleId: int
+    seated: List[Dict]  # Students given a (new) seat, with roomNumber and seat
+    unseated: List[Dict]  # Students removed from the schedule
+    patch_time_ms: float
 
 class UserModel(BaseModel):
     username: str
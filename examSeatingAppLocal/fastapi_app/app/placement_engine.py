@@ -0,0 +1,102 @@
+from typing import List, Dict, Iterable
+from fastapi import HTTPException
+
+
+class PlacementEngine:
+    """
+    First-fit seat placement backed by an index of rooms with free capacity.
+
+    Produces exactly the arrangement of the original linear scan: each student
+    goes to the first room (in request order) that has a free seat and fewer
+    than ``max_per_class`` students of the student's class, otherwise to the
+    first room with any free seat.
+
+    Rooms only ever fill up and class counts only ever grow, so both lookups
+    are monotonic:
+    - "next room with a free seat at or after index i" is answered by a
+      next-free-room forest with path compression
+    - every class keeps a cursor to the first room where it is still under
+      the per-room cap; the cursor only moves forward
+    """
+
+    def __init__(self, rooms: List[Dict], max_per_class: int):
+        self.rooms = rooms
+        self.max_per_class = max_per_class
+        self._remaining = [room["capacity"] - len(room["students"]) for room in rooms]
+
+        # _next_free[i] points at a room index >= i that may still have seats;
+        # index len(rooms) is the "no room left" sentinel.
+        room_count = len(rooms)
+        self._next_free = list(range(room_count + 1))
+        for index, remaining in enumerate(self._remaining):
+            if remaining <= 0:
+                self._next_free[index] = index + 1
+
+        self._class_cursor: Dict[int, int] = {}
+
+    def _find_free(self, index: int) -> int:
+        """Return the first room index >= index that still has a free seat"""
+        root = index
+        while self._next_free[root] != root:
+            root = self._next_free[root]
+
+        # Path compression
+        while self._next_free[index] != root:
+            self._next_free[index], index = root, self._next_free[index]
+
+        return root
+
+    def _find_room_under_class_limit(self, class_id: int) -> int:
+        """Return the first free room where the class is below the per-room cap"""
+        room_count = len(self.rooms)
+        if self.max_per_class <= 0:
+            return room_count
+
+        index = self._find_free(self._class_cursor.get(class_id, 0))
+        while (
+            index < room_count
+            and self.rooms[index]["class_counts"].get(class_id, 0) >= self.max_per_class
+        ):
+            index = self._find_free(index + 1)
+
+        self._class_cursor[class_id] = index
+        return index
+
+    def _seat(self, index: int, student_data: Dict) -> None:
+        room = self.rooms[index]
+        class_id = student_data["classId"]
+
+        room["students"].append(student_data)
+        room["class_counts"][class_id] = room["class_counts"].get(class_id, 0) + 1
+
+        # Update class info for the room
+        class_display_name = student_data["className"]
+        if class_display_name not in room["class_info"]:
+            room["class_info"][class_display_name] = 0
+        room["class_info"][class_display_name] += 1
+
+        self._remaining[index] -= 1
+        if self._remaining[index] <= 0:
+            self._next_free[index] = index + 1
+
+    def place(self, student_data: Dict) -> int:
+        """Place one student and return the index of the room it went to"""
+        room_count = len(self.rooms)
+
+        index = self._find_room_under_class_limit(student_data["classId"])
+        if index >= room_count:
+            # No room has space under the class limit, use any room with capacity
+            index = self._find_free(0)
+
+        if index >= room_count:
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to place all students despite sufficient capacity",
+            )
+
+        self._seat(index, student_data)
+        return index
+
+    def place_all(self, students: Iterable[Dict]) -> None:
+        for student_data in students:
+            self.place(student_data)
@@ -0,0 +1,426 @@
+import heapq
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from .config import settings
+from .data_version import DataVersion
+from .database import get_db_cursor
+from .models import ScheduleRequest
+from .schedule_loader import ScheduleDataLoader
+from .student_search import StudentSearchIndex
+
+# Tables held in memory, in the order their versions are kept
+READ_MODEL_TABLES = ("classes", "students", "examRooms")
+# Class ids per query when reloading changed classes (SQLite parameter limit)
+LOAD_CHUNK_SIZE = 500
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class ClassTable:
+    """Classes in id order"""
+
+    def __init__(self, rows: List[Tuple]):
+        self.ids = array("q", (row[0] for row in rows))
+        self.names = [row[1] for row in rows]
+        self.shifts = [_intern(row[2]) for row in rows]
+        self.positions = {class_id: position for position, class_id in enumerate(self.ids)}
+
+
+class StudentTable:
+    """
+    Students as parallel columns ordered by (classId, id); a class's students
+    are the slice ranges[classId], roll_order[classId] lists the same rows
+    ordered by roll number, as offsets from the start of the slice (so it
+    stays valid when the slice moves).
+    """
+
+    # Parallel columns, in the order patched() copies them
+    COLUMNS = ("ids", "roll_numbers", "names", "languages", "dates_of_birth", "class_ids")
+
+    def __init__(self, rows: List[Tuple]):
+        self.ids = array("q", (row[0] for row in rows))
+        self.roll_numbers = [row[1] for row in rows]
+        self.names = [row[2] for row in rows]
+        # Few distinct languages and birth dates: share one string object per value
+        self.languages = [_intern(row[3]) for row in rows]
+        self.dates_of_birth = [_intern(row[4]) for row in rows]
+        self.class_ids = array("q", (row[5] for row in rows))
+
+        self.ranges: Dict[int, Tuple[int, int]] = {}
+        start = 0
+        for position in range(1, len(rows) + 1):
+            if position == len(rows) or self.class_ids[position] != self.class_ids[start]:
+                self.ranges[self.class_ids[start]] = (start, position)
+                start = position
+
+        self.roll_order: Dict[int, array] = {}
+        for class_id, (start, end) in self.ranges.items():
+            roll_numbers = self.roll_numbers[start:end]
+            self.roll_order[class_id] = array("l", sorted(range(end - start), key=roll_numbers.__getitem__))
+
+    def patched(self, class_ids: Set[int], rows: List[Tuple]) -> "StudentTable":
+        """
+        A copy with the students of class_ids replaced by rows (the current
+        students of those classes, ordered by classId, id). The other classes
+        are copied as whole runs of column slices and keep their roll order,
+        so the cost is that of the changed classes plus a copy of the columns.
+        """
+        fresh = StudentTable(rows)
+        table = StudentTable.__new__(StudentTable)
+        for column in self.COLUMNS:
+            setattr(table, column, getattr(self, column)[:0])
+        table.ranges = {}
+        table.roll_order = {}
+
+        def copy(source: StudentTable, start: int, end: int) -> None:
+            for column in self.COLUMNS:
+                getattr(table, column).extend(getattr(source, column)[start:end])
+
+        kept = (class_id for class_id in self.ranges if class_id not in class_ids)
+        # Runs of consecutive rows from one table are copied at once
+        run: Optional[Tuple[StudentTable, int, int]] = None
+        position = 0
+        for class_id in heapq.merge(kept, fresh.ranges):
+            source = fresh if class_id in fresh.ranges else self
+            start, end = source.ranges[class_id]
+            if run is not None and run[0] is source and run[2] == start:
+                run = (source, run[1], end)
+            else:
+                if run is not None:
+                    copy(*run)
+                run = (source, start, end)
+            table.ranges[class_id] = (position, position + end - start)
+            table.roll_order[class_id] = source.roll_order[class_id]
+            position += end - start
+        if run is not None:
+            copy(*run)
+        return table
+
+    def column(self, field: str) -> List:
+        return {
+            "id": self.ids,
+            "rollNumber": self.roll_numbers,
+            "studentName": self.names,
+            "language": self.languages,
+            "dateOfBirth": self.dates_of_birth,
+            "classId": self.class_ids,
+        }[field]
+
+
+class RoomTable:
+    """Exam rooms in id order, as (id, roomNumber, roomCapacity, roomFloor, roomBuilding, roomRows, benchesPerRow, seatsPerBench)"""
+
+    def __init__(self, rows: List[Tuple]):
+        self.rows = [
+            (room_id, number, capacity, _intern(floor), _intern(building), room_rows, benches, seats)
+            for room_id, number, capacity, floor, building, room_rows, benches, seats in rows
+        ]
+        self.by_id = {row[0]: row for row in self.rows}
+
+
+class ReadSnapshot:
+    """An immutable, consistent copy of the classes, students and exam rooms tables"""
+
+    def __init__(self, versions: Tuple[int, ...], classes: ClassTable, students: StudentTable, rooms: RoomTable):
+        self.versions = versions
+        self.classes = classes
+        self.students = students
+        self.rooms = rooms
+        self._search_index: Optional[StudentSearchIndex] = None
+
+    def list_classes(
+        self, limit: Optional[int], after: Optional[int], include_students: bool, fields: List[str]
+    ) -> Dict[str, any]:
+        """Same result as ClassService.get_all_classes"""
+        classes_table = self.classes
+        start = bisect_right(classes_table.ids, after) if after is not None else 0
+        end = len(classes_table.ids) if limit is None else min(start + limit, len(classes_table.ids))
+        columns = [self.students.column(field) for field in fields]
+
+        classes = []
+        for position in range(start, end):
+            class_id = classes_table.ids[position]
+            class_data = {"id": class_id, "className": classes_table.names[position], "shift": classes_table.shifts[position]}
+            if include_students:
+                first, last = self.students.ranges.get(class_id, (0, 0))
+                class_data["students"] = [
+                    dict(zip(fields, [column[row] for column in columns])) for row in range(first, last)
+                ]
+            classes.append(class_data)
+
+        next_after = classes[-1]["id"] if classes and end < len(classes_table.ids) else None
+        return {"classes": classes, "next_after": next_after}
+
+    def students_of_class(self, class_id: int) -> List[Dict]:
+        students = self.students
+        first, last = students.ranges.get(class_id, (0, 0))
+        return [
+            {
+                "id": students.ids[row],
+                "rollNumber": students.roll_numbers[row],
+                "studentName": students.names[row],
+                "classId": class_id,
+                "language": students.languages[row],
+                "dateOfBirth": students.dates_of_birth[row],
+            }
+            for row in range(first, last)
+        ]
+
+    def exam_rooms(self) -> List[Tuple]:
+        return self.rooms.rows
+
+    def search_students(self, query: str, limit: int, offset: int, class_id: Optional[int]) -> Dict[str, any]:
+        """Same result as StudentService.search_students"""
+        # Built on the first search; concurrent first searches may each build one
+        if self._search_index is None:
+            self._search_index = StudentSearchIndex(self)
+        rows = self._search_index.search(query)
+        if class_id is not None:
+            rows = [row for row in rows if self.students.class_ids[row] == class_id]
+
+        students = self.students
+        classes = self.classes
+        page = []
+        for row in rows[offset:offset + limit]:
+            student_class_id = students.class_ids[row]
+            position = classes.positions[student_class_id]
+            page.append(
+                {
+                    "id": students.ids[row],
+                    "rollNumber": students.roll_numbers[row],
+                    "studentName": students.names[row],
+                    "language": students.languages[row],
+                    "dateOfBirth": students.dates_of_birth[row],
+                    "classId": student_class_id,
+                    "className": classes.names[position],
+                    "shift": classes.shifts[position],
+                }
+            )
+        next_offset = offset + limit if len(rows) > offset + limit else None
+        return {"students": page, "next_offset": next_offset}
+
+
+class MemoryScheduleLoader(ScheduleDataLoader):
+    """ScheduleDataLoader answering from a read model snapshot instead of SQL"""
+
+    def __init__(self, snapshot: ReadSnapshot, query_count: int = 0):
+        super().__init__(cursor=None)
+        self.snapshot = snapshot
+        # Queries spent refreshing the snapshot for this load
+        self.query_count = query_count
+
+    def load(self, data: ScheduleRequest) -> Dict:
+        started = time.perf_counter()
+        classes = self.snapshot.classes
+        students = self.snapshot.students
+
+        class_info = {}
+        for class_id in data.classes:
+            position = classes.positions.get(class_id)
+            if position is not None and class_id not in class_info:
+                class_name, shift = classes.names[position], classes.shifts[position]
+                class_info[class_id] = {
+                    "name": class_name,
+                    "shift": shift,
+                    "display_name": f"{class_name} - {shift}" if shift else class_name,
+                }
+
+        # Like the SQL join, a class listed twice contributes its students twice
+        student_list = []
+        for class_id in data.classes:
+            if class_id not in class_info:
+                continue
+            selected_languages = self.get_selected_languages(data, class_id)
+            display_name = class_info[class_id]["display_name"]
+            start = students.ranges.get(class_id, (0, 0))[0]
+            for offset in students.roll_order.get(class_id, ()):
+                row = start + offset
+                language = students.languages[row]
+                if self.matches_languages(language, selected_languages):
+                    student_list.append(
+                        {
+                            "rollNumber": students.roll_numbers[row],
+                            "studentName": students.names[row],
+                            "language": language,
+                            "classId": class_id,
+                            "className": display_name,
+                        }
+                    )
+
+        rooms = []
+        for room_id in data.exam_rooms:
+            row = self.snapshot.rooms.by_id.get(room_id)
+            if row is None:
+                continue
+            _, room_number, capacity, _, building, room_rows, benches_per_row, seats_per_bench = row
+            rooms.append(
+                {
+                    "id": room_id,
+                    "roomNumber": room_number,
+                    "capacity": capacity,
+                    "building": building,
+                    "layout": {
+                        "rows": room_rows,
+                        "benchesPerRow": benches_per_row,
+                        "seatsPerBench": seats_per_bench,
+                    } if room_rows and benches_per_row and seats_per_bench else None,
+                    "students": [],
+                    "class_counts": {},
+                    "class_info": {},
+                }
+            )
+
+        return {
+            "class_info": class_info,
+            "students": student_list,
+            "rooms": rooms,
+            "load_stats": {
+                "query_count": self.query_count,
+                "load_time_ms": round((time.perf_counter() - started) * 1000, 3),
+            },
+        }
+
+
+class ReadModel:
+    """
+    In-process copy of the classes, students and exam rooms tables serving
+    listings and schedule loading without touching the database.
+
+    The snapshot records the DataVersion of each table it was built from.
+    Before a read, tables whose version moved (any service write) are
+    refreshed, the others are reused, and a new snapshot replaces the old one;
+    readers holding the old snapshot keep a consistent view. Students are
+    refreshed by reloading only the classes DataVersion recorded as changed
+    and patching them into a copy of the table; classes and rooms are small
+    and reloaded whole, as is students when the changes are not known. Only writes made
+    through this process's services are seen, so the read model is opt-in
+    (READ_MODEL_ENABLED), for deployments where no other process writes to
+    the database.
+    """
+
+    _lock = threading.Lock()
+    _snapshot: Optional[ReadSnapshot] = None
+    _refreshes: Dict[str, int] = {table: 0 for table in READ_MODEL_TABLES}
+    _patches: Dict[str, int] = {table: 0 for table in READ_MODEL_TABLES}
+    _refresh_ms: Dict[str, float] = {table: 0.0 for table in READ_MODEL_TABLES}
+
+    @staticmethod
+    def enabled() -> bool:
+        # The memory backend serves the same snapshots from its own tables
+        return settings.READ_MODEL_ENABLED and settings.STORAGE_BACKEND == "sqlite"
+
+    @classmethod
+    def snapshot(cls) -> ReadSnapshot:
+        return cls._current()[0]
+
+    @classmethod
+    def _current(cls) -> Tuple[ReadSnapshot, int]:
+        """Return an up-to-date snapshot and the number of queries run to refresh it"""
+        versions = DataVersion.get(*READ_MODEL_TABLES)
+        snapshot = cls._snapshot
+        if snapshot is not None and snapshot.versions == versions:
+            return snapshot, 0
+
+        with cls._lock:
+            # Another thread may have refreshed while we waited; versions are read
+            # before loading, so data written meanwhile only triggers another refresh
+            versions = DataVersion.get(*READ_MODEL_TABLES)
+            snapshot = cls._snapshot
+            if snapshot is not None and snapshot.versions == versions:
+                return snapshot, 0
+
+            stale = [
+                table for position, table in enumerate(READ_MODEL_TABLES)
+                if snapshot is None or snapshot.versions[position] != versions[position]
+            ]
+            tables = {
+                "classes": snapshot.classes if snapshot else None,
+                "students": snapshot.students if snapshot else None,
+                "examRooms": snapshot.rooms if snapshot else None,
+            }
+            with get_db_cursor() as cursor:
+                for table in stale:
+                    started = time.perf_counter()
+                    changed = (
+                        DataVersion.changes("students", snapshot.versions[1], versions[1])
+                        if table == "students" and snapshot is not None else None
+                    )
+                    if changed is not None:
+                        tables[table] = snapshot.students.patched(changed, cls._load_classes(cursor, changed))
+                        cls._patches[table] += 1
+                    else:
+                        tables[table] = cls._load_table(cursor, table)
+                    cls._refreshes[table] += 1
+                    cls._refresh_ms[table] = round((time.perf_counter() - started) * 1000, 3)
+
+            cls._snapshot = ReadSnapshot(versions, tables["classes"], tables["students"], tables["examRooms"])
+            return cls._snapshot, len(stale)
+
+    @staticmethod
+    def _load_table(cursor, table: str):
+        if table == "classes":
+            cursor.execute("SELECT id, className, shift FROM classes ORDER BY id")
+            return ClassTable(cursor.fetchall())
+        if table == "students":
+            cursor.execute("""
+                SELECT id, rollNumber, studentName, language, dateOfBirth, classId
+                FROM students ORDER BY classId, id
+            """)
+            return StudentTable(cursor.fetchall())
+        cursor.execute("""
+            SELECT id, roomNumber, roomCapacity, roomFloor, roomBuilding,
+                   roomRows, benchesPerRow, seatsPerBench
+            FROM examRooms ORDER BY id
+        """)
+        return RoomTable(cursor.fetchall())
+
+    @staticmethod
+    def _load_classes(cursor, class_ids: Set[int]) -> List[Tuple]:
+        """The students of the given classes, as rows for StudentTable"""
+        ordered = sorted(class_ids)
+        rows: List[Tuple] = []
+        for start in range(0, len(ordered), LOAD_CHUNK_SIZE):
+            chunk = ordered[start:start + LOAD_CHUNK_SIZE]
+            cursor.execute(f"""
+                SELECT id, rollNumber, studentName, language, dateOfBirth, classId
+                FROM students WHERE classId IN ({",".join("?" * len(chunk))}) ORDER BY classId, id
+            """, chunk)
+            rows.extend(cursor.fetchall())
+        return rows
+
+    @classmethod
+    @contextmanager
+    def schedule_loader(cls) -> Iterator[ScheduleDataLoader]:
+        """A schedule data loader: from memory when the read model is enabled, otherwise from SQL"""
+        if cls.enabled():
+            snapshot, query_count = cls._current()
+            yield MemoryScheduleLoader(snapshot, query_count)
+        else:
+            with get_db_cursor() as cursor:
+                yield ScheduleDataLoader(cursor)
+
+    @classmethod
+    def stats(cls) -> Dict[str, any]:
+        snapshot = cls._snapshot
+        return {
+            "enabled": cls.enabled(),
+            "loaded": snapshot is not None,
+            "classes": len(snapshot.classes.ids) if snapshot else 0,
+            "students": len(snapshot.students.ids) if snapshot else 0,
+            "examRooms": len(snapshot.rooms.rows) if snapshot else 0,
+            "refreshes": dict(cls._refreshes),
+            "patches": dict(cls._patches),
+            "last_refresh_ms": dict(cls._refresh_ms),
+        }
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._snapshot = None
@@ -0,0 +1,291 @@
+"""
+Storage backends.
+
+Services talk to a Repository instead of SQL: reads are repository methods,
+writes happen on the StorageTransaction yielded by transaction(), which is
+committed when the block ends and rolled back if it raises. Two backends:
+
+- "sqlite" (SqliteRepository): the SQLite file at DATABASE_PATH.
+- "memory" (MemoryRepository): plain Python tables in this process,
+  optionally loaded from and saved to a snapshot file (MEMORY_SNAPSHOT_PATH).
+
+The backend is chosen with STORAGE_BACKEND and created on first use.
+"""
+import threading
+from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager
+from typing import Dict, List, Optional, Tuple
+from .config import settings
+
+STORAGE_BACKENDS = ("sqlite", "memory")
+
+# (rollNumber, studentName, language, dateOfBirth)
+StudentRow = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+# (roomNumber, roomCapacity, roomFloor, roomBuilding, roomRows, benchesPerRow, seatsPerBench)
+RoomValues = Tuple[str, int, str, str, Optional[int], Optional[int], Optional[int]]
+
+# (id, username, name, created_at)
+UserRow = Tuple[int, str, str, str]
+
+# Saved schedules
+# (position, roomId, roomNumber, capacity, seatRows, benchesPerRow, seatsPerBench, seated)
+ScheduleRoomValues = Tuple[int, Optional[int], str, int, int, int, int, int]
+# (id, *ScheduleRoomValues)
+ScheduleRoomRow = Tuple[int, int, Optional[int], str, int, int, int, int, int]
+# (scheduleRoomId, classId, className, rollNumber, studentName, language, seatRow, seatBench, seatNumber)
+ScheduleSeatValues = Tuple[int, int, Optional[str], str, Optional[str], Optional[str], int, int, int]
+# (id, *ScheduleSeatValues)
+ScheduleSeatRow = Tuple[int, int, int, Optional[str], str, Optional[str], Optional[str], int, int, int]
+
+
+class DuplicateKeyError(Exception):
+    """A write would break a uniqueness rule (roll number in a class, username)"""
+
+
+class StorageTransaction(ABC):
+    """Writes, and the reads they depend on, inside one transaction"""
+
+    # Classes
+    @abstractmethod
+    def class_exists(self, class_id: int) -> bool: ...
+
+    @abstractmethod
+    def find_class_id(self, class_name: str, shift: Optional[str] = None) -> Optional[int]:
+        """Id of a class by name and shift, or by name alone when shift is None"""
+
+    @abstractmethod
+    def create_class(self, class_name: str, shift: Optional[str]) -> int: ...
+
+    @abstractmethod
+    def update_class(self, class_id: int, class_name: str, shift: Optional[str]) -> None: ...
+
+    @abstractmethod
+    def delete_class(self, class_id: int) -> None:
+        """Delete a class and its students"""
+
+    # Students
+    @abstractmethod
+    def student_exists(self, student_id: int) -> bool: ...
+
+    @abstractmethod
+    def count_students(self, class_id: int) -> int: ...
+
+    @abstractmethod
+    def create_student(self, class_id: int, row: StudentRow) -> int:
+        """Raises DuplicateKeyError if the class already has the roll number"""
+
+    @abstractmethod
+    def delete_student(self, student_id: int) -> None: ...
+
+    @abstractmethod
+    def replace_students(
+        self, rows_by_class: Dict[int, List[StudentRow]]
+    ) -> Tuple[Dict[int, Dict[str, int]], Dict[int, List[str]]]:
+        """
+        Make each class's students exactly the given rows, writing only the
+        difference (see StudentImportWriter). Returns per-class counts
+        {inserted, updated, deleted, unchanged, skipped} and the roll numbers
+        of the skipped rows (duplicates and missing roll numbers).
+        """
+
+    # Exam rooms
+    @abstractmethod
+    def room_exists(self, room_id: int) -> bool: ...
+
+    @abstractmethod
+    def find_room_id(self, room_number: str) -> Optional[int]: ...
+
+    @abstractmethod
+    def create_room(self, values: RoomValues) -> int: ...
+
+    @abstractmethod
+    def update_room(self, room_id: int, values: RoomValues) -> None: ...
+
+    @abstractmethod
+    def delete_room(self, room_id: int) -> None: ...
+
+    # Users
+    @abstractmethod
+    def get_username(self, user_id: int) -> Optional[str]: ...
+
+    @abstractmethod
+    def create_user(self, username: str, password: str, name: str) -> int:
+        """Raises DuplicateKeyError if the username is taken"""
+
+    @abstractmethod
+    def delete_user(self, user_id: int) -> None: ...
+
+    @abstractmethod
+    def revoke_token(self, token_id: str, expires_at: int) -> None:
+        """Record a revoked session token until it expires; forgets the expired ones"""
+
+    # Lookups for saved schedule edits
+    @abstractmethod
+    def get_class(self, class_id: int) -> Optional[Tuple[str, Optional[str]]]:
+        """(className, shift)"""
+
+    @abstractmethod
+    def get_student(self, class_id: int, roll_number: str) -> Optional[StudentRow]: ...
+
+    @abstractmethod
+    def get_room(self, room_id: int) -> Optional[RoomValues]: ...
+
+    # Saved schedules
+    @abstractmethod
+    def get_schedule(self, schedule_id: int) -> Optional[Tuple[str, str]]:
+        """(request, classInfo) as stored JSON"""
+
+    @abstractmethod
+    def create_schedule(self, date: str, request: str, class_info: str) -> int: ...
+
+    @abstractmethod
+    def update_schedule(self, schedule_id: int, request: str, class_info: str) -> None:
+        """Store the edited request and class info, and set updatedAt"""
+
+    @abstractmethod
+    def delete_schedule(self, schedule_id: int) -> None:
+        """Delete a schedule with its rooms and seats"""
+
+    @abstractmethod
+    def schedule_rooms(self, schedule_id: int, room_id: Optional[int] = None) -> List[ScheduleRoomRow]:
+        """The schedule's rooms by position, or only those of one exam room"""
+
+    @abstractmethod
+    def schedule_room(self, schedule_room_id: int) -> Optional[ScheduleRoomRow]: ...
+
+    @abstractmethod
+    def first_open_room(self, schedule_id: int, exclude: List[int]) -> Optional[ScheduleRoomRow]:
+        """The room with the lowest position that has a free place (seated < capacity), skipping exclude"""
+
+    @abstractmethod
+    def last_room_position(self, schedule_id: int) -> Optional[int]: ...
+
+    @abstractmethod
+    def create_schedule_room(self, schedule_id: int, values: ScheduleRoomValues) -> int: ...
+
+    @abstractmethod
+    def update_schedule_room(self, schedule_room_id: int, seat_rows: int, seated: int) -> None: ...
+
+    @abstractmethod
+    def delete_schedule_room(self, schedule_room_id: int) -> None:
+        """Delete a schedule room with its seats"""
+
+    @abstractmethod
+    def add_schedule_seats(self, schedule_id: int, seats: List[ScheduleSeatValues]) -> None:
+        """Raises DuplicateKeyError if a student is already seated in the schedule"""
+
+    @abstractmethod
+    def schedule_seat(self, schedule_id: int, class_id: int, roll_number: str) -> Optional[ScheduleSeatRow]: ...
+
+    @abstractmethod
+    def room_seats(self, schedule_room_id: int) -> List[ScheduleSeatRow]:
+        """Seats of a schedule room by roll number"""
+
+    @abstractmethod
+    def delete_schedule_seats(self, seat_ids: List[int]) -> None: ...
+
+    @abstractmethod
+    def class_seats_by_room(self, schedule_id: int, class_id: int) -> Dict[int, int]:
+        """scheduleRoomId -> number of the class's students seated in that room"""
+
+    @abstractmethod
+    def seated_roll_numbers(self, schedule_id: int, class_id: int) -> List[str]: ...
+
+
+class Repository(ABC):
+    name: str
+
+    @abstractmethod
+    def transaction(self) -> AbstractContextManager:
+        """Context manager yielding a StorageTransaction"""
+
+    @abstractmethod
+    def list_classes(
+        self, limit: Optional[int], after: Optional[int], include_students: bool, fields: List[str]
+    ) -> Dict[str, any]:
+        """{"classes": [...], "next_after": ...}, see ClassService.get_all_classes"""
+
+    @abstractmethod
+    def students_of_class(self, class_id: int) -> List[Dict]:
+        """Student dicts with id, rollNumber, studentName, classId, language, dateOfBirth"""
+
+    @abstractmethod
+    def list_exam_rooms(self) -> List[Tuple]:
+        """(id, roomNumber, roomCapacity, roomFloor, roomBuilding, roomRows, benchesPerRow, seatsPerBench) by id"""
+
+    @abstractmethod
+    def search_students(self, query: str, limit: int, offset: int, class_id: Optional[int]) -> Dict[str, any]:
+        """{"students": [...], "next_offset": ...}, see StudentService.search_students"""
+
+    @abstractmethod
+    def schedule_loader(self) -> AbstractContextManager:
+        """Context manager yielding a ScheduleDataLoader"""
+
+    @abstractmethod
+    def authenticate_user(self, username: str, password: str) -> Optional[UserRow]: ...
+
+    @abstractmethod
+    def list_users(self) -> List[UserRow]:
+        """All users except admin, newest first"""
+
+    @abstractmethod
+    def token_revoked(self, token_id: str, user_id: int) -> bool:
+        """Whether a session token was revoked or its user deleted"""
+
+    @abstractmethod
+    def list_schedules(self) -> List[Tuple]:
+        """(id, date, createdAt, updatedAt, roomCount, studentCount) of saved schedules, newest first"""
+
+    @abstractmethod
+    def load_schedule(
+        self, schedule_id: int
+    ) -> Optional[Tuple[Tuple[str, str, str, str], List[ScheduleRoomRow], List[ScheduleSeatRow]]]:
+        """
+        A saved schedule as ((date, classInfo, createdAt, updatedAt), rooms by
+        position, seats by roll number), or None if there is no such schedule
+        """
+
+    def stats(self) -> Dict[str, any]:
+        return {"backend": self.name}
+
+    def close(self) -> None:
+        """Release resources (memory: write the final snapshot)"""
+
+
+_repository: Optional[Repository] = None
+_repository_key: Optional[Tuple] = None
+_repository_lock = threading.Lock()
+
+
+def get_repository() -> Repository:
+    """The configured backend, created on first use and recreated if the settings change"""
+    global _repository, _repository_key
+    key = (settings.STORAGE_BACKEND, settings.DATABASE_PATH, settings.MEMORY_SNAPSHOT_PATH)
+    with _repository_lock:
+        if _repository is None or _repository_key != key:
+            if settings.STORAGE_BACKEND not in STORAGE_BACKENDS:
+                raise ValueError(
+                    f"Unknown STORAGE_BACKEND '{settings.STORAGE_BACKEND}', must be one of: {', '.join(STORAGE_BACKENDS)}"
+                )
+            if _repository is not None:
+                _repository.close()
+            if settings.STORAGE_BACKEND == "memory":
+                from .memory_repository import MemoryRepository
+
+                _repository = MemoryRepository(settings.MEMORY_SNAPSHOT_PATH)
+            else:
+                from .sqlite_repository import SqliteRepository
+
+                _repository = SqliteRepository()
+            _repository_key = key
+        return _repository
+
+
+def close_repository() -> None:
+    global _repository, _repository_key
+    with _repository_lock:
+        if _repository is not None:
+            _repository.close()
+        _repository = None
+        _repository_key = None
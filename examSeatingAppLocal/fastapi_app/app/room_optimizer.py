@@ -0,0 +1,241 @@
+import heapq
+import time
+from bisect import bisect_right
+from collections import deque
+from itertools import accumulate, combinations
+from typing import List, Dict, Optional, Tuple
+from .placement_engine import PlacementEngine
+
+
+class RoomOptimizer:
+    """
+    Room-minimising planner for the "optimized" schedule mode.
+
+    Placement is the transportation problem classes -> rooms where every
+    class/room edge carries at most ``max_per_class`` students and every room
+    at most its capacity. By max-flow/min-cut, a set of rooms can seat
+    everyone iff for every k the k largest classes fit into
+    sum(min(capacity, k * max_per_class)) over the rooms, which is checked in
+    O(classes * log rooms) without building the flow network.
+
+    The objective is lexicographic:
+    1. fewest rooms: the best set of k rooms is always the k largest, so the
+       minimum k is found by binary search
+    2. fewest buildings: building subsets are enumerated by size, each using
+       its k largest rooms, until one is feasible or the time budget runs out
+
+    Students are then assigned to the chosen rooms (largest classes first into
+    the emptiest rooms, repaired with augmenting paths if needed) and seated
+    in roll-number order. If no room set honouring the per-class cap exists,
+    or the budget runs out before one is found, the greedy first-fit result
+    is used instead.
+    """
+
+    def __init__(self, rooms: List[Dict], max_per_class: int, time_budget_ms: int):
+        self.rooms = rooms
+        self.capacities = [max(room["capacity"], 0) for room in rooms]
+        self.buildings = [room.get("building") or "" for room in rooms]
+        self.max_per_class = max_per_class
+        self.time_budget_ms = time_budget_ms
+        self._deadline = time.perf_counter() + time_budget_ms / 1000
+
+    def _out_of_time(self) -> bool:
+        return time.perf_counter() > self._deadline
+
+    def _is_feasible(self, demand_prefix: List[int], room_indices: List[int]) -> bool:
+        """Flow feasibility of the room set for classes with the given sorted demand prefix sums"""
+        capacities = sorted(self.capacities[index] for index in room_indices)
+        capacity_prefix = [0, *accumulate(capacities)]
+        total_capacity = capacity_prefix[-1]
+        if demand_prefix[-1] > total_capacity:
+            return False
+
+        for k in range(1, len(demand_prefix)):
+            limit = k * self.max_per_class
+            if limit >= capacities[-1]:
+                # Every room is saturated from here on, covered by the total check above
+                return True
+            split = bisect_right(capacities, limit)
+            if demand_prefix[k] > capacity_prefix[split] + limit * (len(capacities) - split):
+                return False
+        return True
+
+    def _choose_rooms(self, class_sizes: List[int]) -> Tuple[Optional[List[int]], str]:
+        """Return (room indices, status) for the lexicographically best room set found"""
+        demand_prefix = [0, *accumulate(sorted(class_sizes, reverse=True))]
+
+        # Largest rooms first, request order among equal capacities
+        by_capacity = sorted(range(len(self.rooms)), key=lambda index: -self.capacities[index])
+        if not self._is_feasible(demand_prefix, by_capacity):
+            return None, "infeasible"
+
+        low, high = 1, len(by_capacity)
+        while low < high:
+            if self._out_of_time():
+                return None, "time_limit"
+            middle = (low + high) // 2
+            if self._is_feasible(demand_prefix, by_capacity[:middle]):
+                high = middle
+            else:
+                low = middle + 1
+        room_count = low
+
+        best = by_capacity[:room_count]
+        best_buildings = len({self.buildings[index] for index in best})
+
+        rooms_by_building: Dict[str, List[int]] = {}
+        for index in by_capacity:
+            rooms_by_building.setdefault(self.buildings[index], []).append(index)
+        # Buildings whose largest rooms hold the most come first, so good sets are found early
+        building_order = sorted(
+            rooms_by_building,
+            key=lambda building: -sum(self.capacities[index] for index in rooms_by_building[building][:room_count]),
+        )
+
+        for size in range(1, best_buildings):
+            found = None
+            found_capacity = -1
+            for subset in combinations(building_order, size):
+                if self._out_of_time():
+                    return best, "time_limit"
+                candidate = sorted(
+                    (index for building in subset for index in rooms_by_building[building]),
+                    key=lambda index: -self.capacities[index],
+                )[:room_count]
+                if len(candidate) < room_count:
+                    continue
+                candidate_capacity = sum(self.capacities[index] for index in candidate)
+                # Prefer the most spare seats among sets of the same size
+                if candidate_capacity > found_capacity and self._is_feasible(demand_prefix, candidate):
+                    found, found_capacity = candidate, candidate_capacity
+            if found is not None:
+                return found, "optimal"
+
+        return best, "optimal"
+
+    def _allot(self, class_sizes: Dict[int, int], room_indices: List[int]) -> Optional[Dict[int, Dict[int, int]]]:
+        """Return {room index: {class id: seats}} seating every class in the given rooms"""
+        remaining = {index: self.capacities[index] for index in room_indices}
+        allotment: Dict[int, Dict[int, int]] = {index: {} for index in room_indices}
+        # Max-heap on free seats, request order among ties
+        heap = [(-remaining[index], index) for index in room_indices]
+        heapq.heapify(heap)
+
+        unplaced = []
+        for class_id, size in sorted(class_sizes.items(), key=lambda item: -item[1]):
+            taken = []
+            while size > 0 and heap:
+                free, index = heapq.heappop(heap)
+                seats = min(size, self.max_per_class, -free)
+                allotment[index][class_id] = seats
+                remaining[index] -= seats
+                size -= seats
+                taken.append(index)
+            for index in taken:
+                if remaining[index] > 0:
+                    heapq.heappush(heap, (-remaining[index], index))
+            unplaced.extend([class_id] * size)
+
+        for class_id in unplaced:
+            if self._out_of_time() or not self._augment(class_id, allotment, remaining):
+                return None
+        return allotment
+
+    def _augment(self, class_id: int, allotment: Dict[int, Dict[int, int]], remaining: Dict[int, int]) -> bool:
+        """Seat one more student of the class by shifting students along an augmenting path"""
+        parent: Dict[int, Tuple[Optional[int], int]] = {}
+        queue = deque()
+        for index in allotment:
+            if allotment[index].get(class_id, 0) < self.max_per_class:
+                parent[index] = (None, class_id)
+                queue.append(index)
+
+        while queue:
+            index = queue.popleft()
+            if remaining[index] > 0:
+                # Walk back: each room takes one student of the class that moves in
+                remaining[index] -= 1
+                while index is not None:
+                    previous, moved_class = parent[index]
+                    allotment[index][moved_class] = allotment[index].get(moved_class, 0) + 1
+                    if previous is not None:
+                        allotment[previous][moved_class] -= 1
+                    index = previous
+                return True
+
+            for moved_class, seats in allotment[index].items():
+                if seats <= 0:
+                    continue
+                for target in allotment:
+                    if target not in parent and allotment[target].get(moved_class, 0) < self.max_per_class:
+                        parent[target] = (index, moved_class)
+                        queue.append(target)
+        return False
+
+    def _seat(self, all_students: List[Dict], allotment: Dict[int, Dict[int, int]]) -> None:
+        """Fill the rooms following the allotment, each class in roll-number order across its rooms"""
+        by_class: Dict[int, List[Dict]] = {}
+        for student_data in all_students:
+            by_class.setdefault(student_data["classId"], []).append(student_data)
+
+        cursors = {class_id: 0 for class_id in by_class}
+        for index, room in enumerate(self.rooms):
+            seats_by_class = allotment.get(index)
+            if not seats_by_class:
+                continue
+            students = []
+            for class_id, seats in seats_by_class.items():
+                if seats <= 0:
+                    continue
+                start = cursors[class_id]
+                students.extend(by_class[class_id][start:start + seats])
+                cursors[class_id] = start + seats
+                room["class_counts"][class_id] = seats
+
+                # Update class info for the room
+                class_display_name = by_class[class_id][0]["className"]
+                if class_display_name not in room["class_info"]:
+                    room["class_info"][class_display_name] = 0
+                room["class_info"][class_display_name] += seats
+
+            students.sort(key=lambda x: x["rollNumber"])
+            room["students"] = students
+
+    def place(self, all_students: List[Dict]) -> Dict:
+        """Place students (in any order) into empty rooms and return the optimization stats"""
+        started = time.perf_counter()
+        all_students.sort(key=lambda x: x["rollNumber"])
+
+        class_sizes: Dict[int, int] = {}
+        for student_data in all_students:
+            class_sizes[student_data["classId"]] = class_sizes.get(student_data["classId"], 0) + 1
+
+        if self.max_per_class <= 0:
+            # No per-class cap, same as the standard planner
+            self.max_per_class = max(class_sizes.values(), default=0)
+
+        allotment = None
+        if all_students and self.rooms:
+            room_indices, status = self._choose_rooms(list(class_sizes.values()))
+            if room_indices is not None:
+                allotment = self._allot(class_sizes, room_indices)
+                if allotment is None:
+                    status = "time_limit"
+        else:
+            status = "optimal"
+
+        fallback = bool(all_students) and allotment is None
+        if fallback:
+            PlacementEngine(self.rooms, self.max_per_class).place_all(all_students)
+        elif allotment is not None:
+            self._seat(all_students, allotment)
+
+        used = [room for room in self.rooms if room["students"]]
+        return {
+            "status": status,
+            "fallback": fallback,
+            "rooms_used": len(used),
+            "buildings_used": len({room.get("building") or "" for room in used}),
+            "time_budget_ms": self.time_budget_ms,
+            "solve_time_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
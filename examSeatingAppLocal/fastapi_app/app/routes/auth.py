@@ -1,8 +1,8 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, List
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, List, Optional
 from ..models import UserModel, UserResponseModel, LoginRequest, LoginResponse
 from ..auth_service import AuthService
-import secrets
+from ..auth_tokens import SessionTokens, TokenClaims, require_session, require_user
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -17,24 +17,31 @@ def login(login_data: LoginRequest):
             detail="Invalid username or password"
         )
     
-    # Generate simple token (in production, use JWT)
-    token = secrets.token_urlsafe(32)
+    # Signed token carrying the user, verified without a database lookup
+    token = SessionTokens.issue(user)
     
     return LoginResponse(token=token, user=user)
 
-@router.get("/users", response_model=Dict)
+@router.post("/logout")
+def logout(claims: Optional[TokenClaims] = Depends(require_user)):
+    """Revoke the request's token"""
+    if claims is not None:
+        SessionTokens.revoke(claims)
+    return {"message": "Logged out successfully"}
+
+@router.get("/users", response_model=Dict, dependencies=[Depends(require_session)])
 def get_users():
     """Get all users except admin"""
     users = AuthService.get_all_users()
     return {"users": users}
 
-@router.post("/users")
+@router.post("/users", dependencies=[Depends(require_session)])
 def create_user(user_data: UserModel):
     """Create a new user"""
     AuthService.create_user(user_data)
     return {"message": "User created successfully"}
 
-@router.delete("/users/{user_id}")
+@router.delete("/users/{user_id}", dependencies=[Depends(require_session)])
 def delete_user(user_id: int):
     """Delete a user"""
     AuthService.delete_user(user_id)
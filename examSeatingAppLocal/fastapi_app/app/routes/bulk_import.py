@@ -1,15 +1,35 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from fastapi.responses import JSONResponse
-from typing import Dict
-from ..models import BulkImportResponse
-from ..services import ClassService
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Dict, List
+from ..config import settings
+from ..models import ImportJobAccepted
+from ..import_jobs import ImportJob, ImportJobs, parse_upload
+from ..uploads import SpooledUpload, spool_upload
 
 router = APIRouter(prefix="/bulk-import", tags=["bulk-import"])
 
-@router.post("/excel", response_model=BulkImportResponse)
+async def _spool_excel(file: UploadFile) -> SpooledUpload:
+    """The uploaded workbook, spooled; 413 past EXCEL_UPLOAD_MAX_BYTES, 400 if empty"""
+    upload = await spool_upload(file, settings.EXCEL_UPLOAD_MAX_BYTES)
+    if upload.size == 0:
+        upload.close()
+        raise HTTPException(status_code=400, detail="Empty file uploaded")
+    return upload
+
+def _accepted(job: ImportJob) -> ImportJobAccepted:
+    return ImportJobAccepted(
+        jobId=job.id,
+        status=job.status,
+        statusUrl=f"{router.prefix}/jobs/{job.id}",
+        eventsUrl=f"{router.prefix}/jobs/{job.id}/events",
+    )
+
+@router.post("/excel", response_model=ImportJobAccepted, status_code=202)
 async def bulk_import_excel(file: UploadFile = File(...)):
     """
-    Bulk import classes and students from Excel file
+    Bulk import classes and students from Excel file, in the background: the
+    answer is the import job, whose progress and result (BulkImportResponse)
+    are read from /bulk-import/jobs/{job_id}
     
     Expected Excel format:
     - Academic year information in early rows
@@ -27,16 +47,11 @@ async def bulk_import_excel(file: UploadFile = File(...)):
         )
     
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        if len(file_content) == 0:
-            raise HTTPException(status_code=400, detail="Empty file uploaded")
-        
-        # Process the Excel file
-        result = ClassService.bulk_import_from_excel(file_content, file.filename)
+        # Spool the upload; the job removes its temp file once done
+        upload = await _spool_excel(file)
         
-        return result
+        # Parsed in a worker process and written in a database thread after this request returns
+        return _accepted(ImportJobs.submit("excel", upload))
         
     except HTTPException:
         raise
@@ -91,16 +106,11 @@ async def validate_excel(file: UploadFile = File(...)):
         )
     
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        if len(file_content) == 0:
-            raise HTTPException(status_code=400, detail="Empty file uploaded")
-        
         # Parse Excel file (without importing)
-        from ..excel_utils import ExcelParser, ExcelValidator
+        from ..excel_utils import ExcelValidator
         
-        parsed_data = ExcelParser.parse_student_excel(file_content, file.filename)
+        with await _spool_excel(file) as upload:
+            parsed_data = await parse_upload(upload.source, upload.filename)
         validation_errors = ExcelValidator.validate_parsed_data(parsed_data)
         
         # Prepare summary
@@ -138,13 +148,13 @@ async def validate_excel(file: UploadFile = File(...)):
             }
         )
 
-@router.post("/excel/selective", response_model=BulkImportResponse)
+@router.post("/excel/selective", response_model=ImportJobAccepted, status_code=202)
 async def selective_import_excel(
     file: UploadFile = File(...),
     selected_classes: str = Form(...)
 ):
     """
-    Import only selected classes from Excel file
+    Import only selected classes from Excel file, in the background like /excel
     
     Args:
         file: Excel file to import
@@ -164,16 +174,11 @@ async def selective_import_excel(
         # Parse selected class identifiers
         selected_class_identifiers = json.loads(selected_classes)
         
-        # Read file content
-        file_content = await file.read()
-        
-        if len(file_content) == 0:
-            raise HTTPException(status_code=400, detail="Empty file uploaded")
+        # Spool the upload; the job removes its temp file once done
+        upload = await _spool_excel(file)
         
         # Process the Excel file with selective import
-        result = ClassService.selective_import_from_excel(file_content, selected_class_identifiers, file.filename)
-        
-        return result
+        return _accepted(ImportJobs.submit("selective", upload, selected_class_identifiers))
         
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid selected_classes format")
@@ -181,3 +186,34 @@ async def selective_import_excel(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+
+@router.get("/jobs")
+async def list_import_jobs() -> List[Dict]:
+    """Import jobs kept (running, queued, or finished within IMPORT_JOB_TTL), oldest first, without their details"""
+    return [job.summary() for job in ImportJobs.list()]
+
+@router.get("/jobs/{job_id}")
+async def get_import_job(job_id: str) -> Dict:
+    """
+    Status and progress of an import job: sheets parsed, classes and rows
+    written, and once finished its result (the BulkImportResponse) or error
+    ({statusCode, detail}, what the import request used to answer with)
+    """
+    return ImportJobs.get(job_id).to_dict()
+
+@router.get("/jobs/{job_id}/events")
+async def import_job_events(job_id: str, request: Request):
+    """
+    Progress of an import job as server-sent events: status, sheet, classes,
+    class, then completed or failed, which ends the stream. Event ids number
+    the events from 1; a reconnecting client sending Last-Event-ID resumes
+    after that event.
+    """
+    job = ImportJobs.get(job_id)
+    last_event_id = request.headers.get("last-event-id", "")
+    after = int(last_event_id) if last_event_id.isdigit() else 0
+    return StreamingResponse(
+        job.event_stream(after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,15 +1,33 @@
-from fastapi import APIRouter
-from typing import Dict
+from fastapi import APIRouter, Request, Response
+from typing import Dict, Optional
+from ..etag import not_modified
 from ..models import ClassModel, ClassResponseModel
 from ..services import ClassService
 
 router = APIRouter(prefix="/class", tags=["classes"])
 
 @router.get("", response_model=Dict)
-def get_classes():
-    """Get all classes with their students"""
-    classes = ClassService.get_all_classes()
-    return {"classes": classes}
+def get_classes(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = None,
+    after: Optional[int] = None,
+    include_students: bool = True,
+    student_fields: Optional[str] = None,
+):
+    """Get classes with their students
+
+    limit/after page through classes by id (pass the returned next_after as
+    after), include_students=false returns classes only and student_fields
+    (comma-separated, e.g. "id,studentName") trims each student.
+    Answers 304 when If-None-Match carries the current ETag.
+    """
+    unchanged = not_modified(request, response, ("classes", "students"), limit, after, include_students, student_fields)
+    if unchanged is not None:
+        return unchanged
+
+    fields = [field.strip() for field in student_fields.split(",") if field.strip()] if student_fields else None
+    return ClassService.get_all_classes(limit, after, include_students, fields)
 
 @router.post("")
 def add_class(class_data: ClassModel):
@@ -27,6 +27,7 @@ def download_csv_template():
 async def upload_exam_rooms_csv(file: UploadFile = File(...)):
     """
     Upload CSV file with columns: roomNumber, roomCapacity, roomFloor, roomBuilding
+    Optional seat grid columns: roomRows, benchesPerRow, seatsPerBench
     Creates exam rooms from the CSV data
     """
     return await CSVProcessor.process_exam_rooms_csv(file)
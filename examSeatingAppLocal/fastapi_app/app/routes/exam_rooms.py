@@ -1,13 +1,18 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
 from typing import Dict
+from ..etag import not_modified
 from ..models import ExamRoomModel
 from ..services import ExamRoomService
 
 router = APIRouter(prefix="/examRoom", tags=["exam_rooms"])
 
 @router.get("", response_model=Dict)
-def get_exam_rooms():
-    """Get all exam rooms"""
+def get_exam_rooms(request: Request, response: Response):
+    """Get all exam rooms, 304 when If-None-Match carries the current ETag"""
+    unchanged = not_modified(request, response, ("examRooms",))
+    if unchanged is not None:
+        return unchanged
+
     exam_rooms = ExamRoomService.get_all_exam_rooms()
     return {"examRooms": exam_rooms}
 
@@ -0,0 +1,50 @@
+from fastapi import APIRouter
+from typing import Dict
+from ..models import (
+    ScheduleRequest,
+    SavedScheduleResponse,
+    ScheduleStudentPatch,
+    ScheduleRoomPatch,
+    ScheduleLanguagePatch,
+    SchedulePatchResponse,
+)
+from ..schedule_store import SavedScheduleService
+
+router = APIRouter(prefix="/savedSchedule", tags=["saved_schedules"])
+
+@router.post("", response_model=SavedScheduleResponse)
+def create_saved_schedule(data: ScheduleRequest):
+    """Generate a seating arrangement and store it for later edits"""
+    return SavedScheduleService.create_schedule(data)
+
+@router.get("", response_model=Dict)
+def get_saved_schedules():
+    """List saved schedules"""
+    schedules = SavedScheduleService.get_all_schedules()
+    return {"schedules": schedules}
+
+@router.get("/{schedule_id}", response_model=SavedScheduleResponse)
+def get_saved_schedule(schedule_id: int):
+    """Get a saved schedule with its current seating"""
+    return SavedScheduleService.get_schedule(schedule_id)
+
+@router.delete("/{schedule_id}")
+def delete_saved_schedule(schedule_id: int):
+    """Delete a saved schedule"""
+    SavedScheduleService.delete_schedule(schedule_id)
+    return {"message": "Schedule deleted successfully"}
+
+@router.patch("/{schedule_id}/students", response_model=SchedulePatchResponse)
+def patch_saved_schedule_students(schedule_id: int, patch: ScheduleStudentPatch):
+    """Seat or unseat individual students without moving anyone else"""
+    return SavedScheduleService.patch_students(schedule_id, patch)
+
+@router.patch("/{schedule_id}/rooms", response_model=SchedulePatchResponse)
+def patch_saved_schedule_rooms(schedule_id: int, patch: ScheduleRoomPatch):
+    """Add or drop rooms; only students of dropped rooms are moved"""
+    return SavedScheduleService.patch_rooms(schedule_id, patch)
+
+@router.patch("/{schedule_id}/languages", response_model=SchedulePatchResponse)
+def patch_saved_schedule_languages(schedule_id: int, patch: ScheduleLanguagePatch):
+    """Change class language selections; only the affected students are seated or unseated"""
+    return SavedScheduleService.patch_languages(schedule_id, patch)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from fastapi.responses import StreamingResponse
-from ..models import ScheduleRequest, ScheduleResponse
+from ..models import ScheduleRequest, ScheduleResponse, BatchScheduleRequest, BatchScheduleResponse
 from ..services import ScheduleService
 from ..excel_export_service import ExcelExportService
 from datetime import datetime
@@ -12,6 +12,16 @@ def schedule_exam(data: ScheduleRequest):
     """Schedule exam seating arrangement"""
     return ScheduleService.schedule_exam(data)
 
+@router.post("/batch", response_model=BatchScheduleResponse)
+async def schedule_batch(data: BatchScheduleRequest):
+    """Schedule several sessions at once, loading classes and rooms only once"""
+    return await ScheduleService.schedule_batch(data.sessions)
+
+@router.post("/stream")
+def schedule_exam_stream(data: ScheduleRequest):
+    """Schedule exam seating as NDJSON: one line per room as it is finalised, then a summary line"""
+    return StreamingResponse(ScheduleService.stream_schedule(data), media_type="application/x-ndjson")
+
 @router.post("/export/excel/summary")
 def export_summary_excel(data: dict):
     """Export seating arrangement summary as Excel"""
@@ -1,13 +1,40 @@
-from fastapi import APIRouter
-from typing import Dict
+from fastapi import APIRouter, Request, Response
+from typing import Dict, Optional
+from ..etag import not_modified
 from ..models import StudentModel
 from ..services import StudentService
 
 router = APIRouter(prefix="/student", tags=["students"])
 
+@router.get("/search", response_model=Dict)
+def search_students(
+    request: Request,
+    response: Response,
+    q: str,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    class_id: Optional[int] = None,
+):
+    """Search students by roll number, name or class name prefix
+
+    Every word of q must start a word of the student's roll number, name or
+    class name (e.g. "ann 21cs"). limit/offset page through the results (pass
+    the returned next_offset as offset), class_id restricts to one class.
+    Answers 304 when If-None-Match carries the current ETag.
+    """
+    unchanged = not_modified(request, response, ("classes", "students"), q, limit, offset, class_id)
+    if unchanged is not None:
+        return unchanged
+
+    return StudentService.search_students(q, limit, offset, class_id)
+
 @router.get("/{class_id}", response_model=Dict)
-def get_students_by_class(class_id: int):
-    """Get all students in a specific class"""
+def get_students_by_class(class_id: int, request: Request, response: Response):
+    """Get all students in a specific class, 304 when If-None-Match carries the current ETag"""
+    unchanged = not_modified(request, response, ("students",), class_id)
+    if unchanged is not None:
+        return unchanged
+
     students = StudentService.get_students_by_class(class_id)
     return {"students": students}
 
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from typing import List, Dict, Tuple
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from .executors import schedule_executor
+from .models import ScheduleRequest
+from .repository import get_repository
+from .schedule_loader import ScheduleDataLoader
+
+
+def _plan_session(payload: Tuple[int, ScheduleRequest, Dict]) -> Dict:
+    """Plan one session; runs in a worker process"""
+    from .services import ScheduleService
+
+    index, data, loaded = payload
+    started = time.perf_counter()
+    result = {"index": index, "date": data.date, "status_code": 200, "schedule": None, "error": None}
+
+    try:
+        result["schedule"] = ScheduleService.plan_schedule(data, loaded)
+    except HTTPException as e:
+        # Report the failure for this session only
+        result["status_code"] = e.status_code
+        result["error"] = e.detail
+
+    result["plan_time_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def _plan_sessions(payloads: List[Tuple[int, ScheduleRequest, Dict]]) -> List[Dict]:
+    """Plan a share of the sessions, one after the other"""
+    return [_plan_session(payload) for payload in payloads]
+
+
+def _load_shared(sessions: List[ScheduleRequest]) -> Dict:
+    with get_repository().schedule_loader() as loader:
+        return loader.load_shared(sessions)
+
+
+class BatchScheduler:
+    """
+    Schedules several independent sessions (e.g. every date x FN/AN of an exam
+    week) in one call: classes and rooms are loaded once for all sessions and
+    the sessions are planned in parallel on the scheduling executor, each
+    worker process planning a share of them.
+    """
+
+    @staticmethod
+    async def run(sessions: List[ScheduleRequest]) -> Dict:
+        if not sessions:
+            raise HTTPException(status_code=400, detail="At least one session is required")
+
+        started = time.perf_counter()
+
+        shared = await run_in_threadpool(_load_shared, sessions)
+
+        payloads = [
+            (index, data, ScheduleDataLoader.select(data, shared))
+            for index, data in enumerate(sessions)
+        ]
+
+        shares = min(schedule_executor.workers, len(payloads))
+        if shares > 1:
+            # One call per worker rather than per session, so a large batch stays within the executor's queue limit
+            planned = await asyncio.gather(*(
+                schedule_executor.run(_plan_sessions, payloads[share::shares]) for share in range(shares)
+            ))
+            results = sorted((result for share in planned for result in share), key=lambda result: result["index"])
+        else:
+            results = await run_in_threadpool(_plan_sessions, payloads)
+
+        return {
+            "sessions": results,
+            "load_stats": shared["load_stats"],
+            "total_time_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from .config import settings
+from .data_version import DataVersion
+from .models import ScheduleRequest
+
+# Tables a schedule is computed from
+SCHEDULE_TABLES = ("classes", "students", "examRooms")
+
+
+class ScheduleCache:
+    """
+    LRU cache of schedule results keyed by a canonical hash of the request and
+    the data version of the tables schedules read. Any write to those tables
+    changes the version, so stale results are never served.
+    """
+
+    _lock = threading.Lock()
+    _entries: "OrderedDict[Tuple[str, Tuple[int, ...]], Dict]" = OrderedDict()
+    _hits = 0
+    _misses = 0
+
+    @staticmethod
+    def request_key(data: ScheduleRequest) -> str:
+        # Class and room order affect the arrangement, so lists are kept as given
+        canonical = json.dumps(data.model_dump(), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def get(cls, data: ScheduleRequest) -> Tuple[Tuple[str, Tuple[int, ...]], Optional[Dict]]:
+        """Return the cache key for the request and the cached result, if any"""
+        key = (cls.request_key(data), DataVersion.get(*SCHEDULE_TABLES))
+
+        with cls._lock:
+            result = cls._entries.get(key)
+            if result is None:
+                cls._misses += 1
+            else:
+                cls._hits += 1
+                cls._entries.move_to_end(key)
+            return key, result
+
+    @classmethod
+    def put(cls, key: Tuple[str, Tuple[int, ...]], result: Dict) -> None:
+        if settings.SCHEDULE_CACHE_SIZE <= 0:
+            return
+
+        with cls._lock:
+            cls._entries[key] = result
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > settings.SCHEDULE_CACHE_SIZE:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        with cls._lock:
+            return {
+                "hits": cls._hits,
+                "misses": cls._misses,
+                "size": len(cls._entries),
+                "max_size": settings.SCHEDULE_CACHE_SIZE,
+            }
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._entries.clear()
+            cls._hits = 0
+            cls._misses = 0
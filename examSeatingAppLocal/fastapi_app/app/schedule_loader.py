@@ -0,0 +1,259 @@
+import time
+from typing import List, Dict, Optional, Tuple
+from .models import ScheduleRequest
+
+
+class ScheduleDataLoader:
+    """
+    Loads the classes, filtered students and rooms of a schedule request in a
+    fixed number of statements, regardless of how many ids are requested.
+
+    Requested ids are staged into connection-local temp tables (avoiding the
+    SQLite bound-parameter limit of large IN lists) and joined against, and
+    the per-class language selections are applied in SQL.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.query_count = 0
+
+    def _execute(self, sql: str, params: Tuple = ()):
+        self.query_count += 1
+        return self.cursor.execute(sql, params)
+
+    def _executemany(self, sql: str, rows: List[Tuple]):
+        self.query_count += 1
+        return self.cursor.executemany(sql, rows)
+
+    @staticmethod
+    def get_selected_languages(data: ScheduleRequest, class_id: int) -> Optional[List[str]]:
+        """Return the language filter for a class, or None when all students are included"""
+        if not data.language_selections or class_id not in data.language_selections:
+            return None
+        selected_languages = data.language_selections[class_id]
+        # If empty array is provided, treat as no filtering (include all students)
+        if isinstance(selected_languages, list) and len(selected_languages) == 0:
+            return None
+        return selected_languages
+
+    @staticmethod
+    def matches_languages(language: Optional[str], selected_languages: Optional[List[str]]) -> bool:
+        """Python equivalent of the SQL language filter, used when selecting from shared data"""
+        if selected_languages is None:
+            return True
+        if language:
+            return language in selected_languages
+        # Students without language are only included if explicitly selected
+        return None in selected_languages
+
+    def load_shared(self, sessions: List[ScheduleRequest]) -> Dict:
+        """
+        Load the union of the classes (without language filtering) and rooms of
+        several sessions once, for use with select().
+        """
+        union = ScheduleRequest(
+            date="",
+            classes=list(dict.fromkeys(class_id for data in sessions for class_id in data.classes)),
+            exam_rooms=list(dict.fromkeys(room_id for data in sessions for room_id in data.exam_rooms)),
+            split=False,
+        )
+        loaded = self.load(union)
+
+        students_by_class = {}
+        for student_data in loaded["students"]:
+            students_by_class.setdefault(student_data["classId"], []).append(student_data)
+
+        return {
+            "class_info": loaded["class_info"],
+            "students_by_class": students_by_class,
+            "rooms_by_id": {room["id"]: room for room in loaded["rooms"]},
+            "load_stats": loaded["load_stats"],
+        }
+
+    @staticmethod
+    def select(data: ScheduleRequest, shared: Dict) -> Dict:
+        """Build one session's data out of load_shared() output, in the same shape as load()"""
+        class_info = {}
+        students = []
+        for class_id in data.classes:
+            if class_id not in shared["class_info"]:
+                continue
+            class_info.setdefault(class_id, shared["class_info"][class_id])
+
+            selected_languages = ScheduleDataLoader.get_selected_languages(data, class_id)
+            students.extend(
+                # Copies, seat assignment writes into the student dicts
+                dict(student_data)
+                for student_data in shared["students_by_class"].get(class_id, [])
+                if ScheduleDataLoader.matches_languages(student_data["language"], selected_languages)
+            )
+
+        rooms = []
+        for room_id in data.exam_rooms:
+            if room_id in shared["rooms_by_id"]:
+                room = shared["rooms_by_id"][room_id]
+                rooms.append({**room, "students": [], "class_counts": {}, "class_info": {}})
+
+        return {
+            "class_info": class_info,
+            "students": students,
+            "rooms": rooms,
+            "load_stats": None,
+        }
+
+    def load(self, data: ScheduleRequest) -> Dict:
+        """
+        Returns:
+        {
+            'class_info': {class_id: {'name', 'shift', 'display_name'}},
+            'students': [student dicts in request order, not yet sorted],
+            'rooms': [room dicts ready for placement],
+            'load_stats': {'query_count': int, 'load_time_ms': float}
+        }
+        """
+        started = time.perf_counter()
+
+        self._stage_request(data)
+        class_info = self._load_class_info(data.classes)
+        students = self._load_students(class_info)
+        rooms = self._load_rooms()
+
+        return {
+            "class_info": class_info,
+            "students": students,
+            "rooms": rooms,
+            "load_stats": {
+                "query_count": self.query_count,
+                "load_time_ms": round((time.perf_counter() - started) * 1000, 3),
+            },
+        }
+
+    def _stage_request(self, data: ScheduleRequest) -> None:
+        """Write the requested class ids, room ids and language filters into temp tables"""
+        self._execute("""
+            CREATE TEMP TABLE IF NOT EXISTS schedule_classes (
+                position INTEGER PRIMARY KEY,
+                classId INTEGER NOT NULL,
+                languageFiltered INTEGER NOT NULL,
+                includeMissing INTEGER NOT NULL
+            )
+        """)
+        self._execute("""
+            CREATE TEMP TABLE IF NOT EXISTS schedule_languages (
+                classId INTEGER NOT NULL,
+                language TEXT NOT NULL,
+                PRIMARY KEY (classId, language)
+            )
+        """)
+        self._execute("""
+            CREATE TEMP TABLE IF NOT EXISTS schedule_rooms (
+                position INTEGER PRIMARY KEY,
+                roomId INTEGER NOT NULL
+            )
+        """)
+
+        # Temp tables live as long as the connection, clear any previous request
+        self._execute("DELETE FROM schedule_classes")
+        self._execute("DELETE FROM schedule_languages")
+        self._execute("DELETE FROM schedule_rooms")
+
+        class_rows = []
+        language_rows = set()
+        for position, class_id in enumerate(data.classes):
+            selected_languages = self.get_selected_languages(data, class_id)
+            if selected_languages is None:
+                class_rows.append((position, class_id, 0, 0))
+                continue
+
+            class_rows.append((position, class_id, 1, 1 if None in selected_languages else 0))
+            for language in selected_languages:
+                # Students without a language only match through includeMissing
+                if language:
+                    language_rows.add((class_id, language))
+
+        self._executemany(
+            "INSERT INTO schedule_classes (position, classId, languageFiltered, includeMissing) VALUES (?, ?, ?, ?)",
+            class_rows,
+        )
+        self._executemany(
+            "INSERT INTO schedule_languages (classId, language) VALUES (?, ?)",
+            sorted(language_rows),
+        )
+        self._executemany(
+            "INSERT INTO schedule_rooms (position, roomId) VALUES (?, ?)",
+            list(enumerate(data.exam_rooms)),
+        )
+
+    def _load_class_info(self, class_ids: List[int]) -> Dict[int, Dict[str, str]]:
+        self._execute("""
+            SELECT id, className, shift FROM classes
+            WHERE id IN (SELECT classId FROM schedule_classes)
+        """)
+        rows = {row[0]: row for row in self.cursor.fetchall()}
+
+        # Keep the request order for the response
+        class_info = {}
+        for class_id in class_ids:
+            if class_id in rows and class_id not in class_info:
+                _, class_name, shift = rows[class_id]
+                # Create display name with shift for PDF
+                display_name = f"{class_name} - {shift}" if shift else class_name
+                class_info[class_id] = {
+                    "name": class_name,
+                    "shift": shift,
+                    "display_name": display_name,
+                }
+        return class_info
+
+    def _load_students(self, class_info: Dict[int, Dict[str, str]]) -> List[Dict]:
+        self._execute("""
+            SELECT s.rollNumber, s.studentName, s.language, s.classId
+            FROM schedule_classes sc
+            JOIN students s ON s.classId = sc.classId
+            WHERE sc.languageFiltered = 0
+               OR (COALESCE(s.language, '') <> '' AND EXISTS (
+                       SELECT 1 FROM schedule_languages sl
+                       WHERE sl.classId = s.classId AND sl.language = s.language))
+               OR (COALESCE(s.language, '') = '' AND sc.includeMissing = 1)
+            ORDER BY sc.position, s.rollNumber
+        """)
+
+        students = []
+        for roll_number, student_name, language, class_id in self.cursor.fetchall():
+            if class_id not in class_info:
+                continue
+            students.append(
+                {
+                    "rollNumber": roll_number,
+                    "studentName": student_name,
+                    "language": language,
+                    "classId": class_id,
+                    "className": class_info[class_id]["display_name"],
+                }
+            )
+        return students
+
+    def _load_rooms(self) -> List[Dict]:
+        self._execute("""
+            SELECT r.id, r.roomNumber, r.roomCapacity, r.roomBuilding, r.roomRows, r.benchesPerRow, r.seatsPerBench
+            FROM schedule_rooms sr
+            JOIN examRooms r ON r.id = sr.roomId
+            ORDER BY sr.position
+        """)
+        return [
+            {
+                "id": room_id,
+                "roomNumber": room_number,
+                "capacity": capacity,
+                "building": building,
+                "layout": {
+                    "rows": rows,
+                    "benchesPerRow": benches_per_row,
+                    "seatsPerBench": seats_per_bench,
+                } if rows and benches_per_row and seats_per_bench else None,
+                "students": [],
+                "class_counts": {},
+                "class_info": {},  # Store class information for each room
+            }
+            for room_id, room_number, capacity, building, rows, benches_per_row, seats_per_bench in self.cursor.fetchall()
+        ]
@@ -0,0 +1,542 @@
+import json
+import time
+from typing import List, Dict, Optional, Tuple
+from fastapi import HTTPException
+from .config import settings
+from .data_version import writes_tables
+from .models import (
+    ScheduleRequest,
+    ScheduleStudentPatch,
+    ScheduleRoomPatch,
+    ScheduleLanguagePatch,
+)
+from .repository import ScheduleRoomRow, ScheduleSeatRow, StorageTransaction, get_repository
+from .schedule_loader import ScheduleDataLoader
+from .seat_layout import SeatLayoutEngine
+from .services import ScheduleService
+
+
+class SavedScheduleService:
+    """
+    Stores generated arrangements (schedules, scheduleRooms, scheduleSeats)
+    and applies edits by re-seating only the students they affect. Everyone
+    else keeps their room and seat.
+    """
+
+    @staticmethod
+    @writes_tables("schedules")
+    def create_schedule(data: ScheduleRequest) -> Dict:
+        ScheduleService.validate_request(data)
+
+        with get_repository().schedule_loader() as loader:
+            loaded = loader.load(data)
+        ScheduleService.plan_schedule(data, loaded)
+
+        with get_repository().transaction() as tx:
+            schedule_id = tx.create_schedule(data.date, data.model_dump_json(), json.dumps(loaded["class_info"]))
+
+            seats = []
+            for position, room in enumerate(loaded["rooms"]):
+                layout = SeatLayoutEngine.resolve_layout(room, len(room["students"]))
+                schedule_room_id = tx.create_schedule_room(
+                    schedule_id,
+                    (
+                        position,
+                        room["id"],
+                        room["roomNumber"],
+                        room["capacity"],
+                        layout["rows"],
+                        layout["benchesPerRow"],
+                        layout["seatsPerBench"],
+                        len(room["students"]),
+                    ),
+                )
+
+                seats.extend(
+                    (
+                        schedule_room_id,
+                        student["classId"],
+                        student["className"],
+                        student["rollNumber"],
+                        student["studentName"],
+                        student["language"],
+                        student["seat"]["row"],
+                        student["seat"]["bench"],
+                        student["seat"]["seat"],
+                    )
+                    for student in room["students"]
+                )
+
+            tx.add_schedule_seats(schedule_id, seats)
+
+        return SavedScheduleService.get_schedule(schedule_id)
+
+    @staticmethod
+    def get_all_schedules() -> List[Dict]:
+        return [
+            {
+                "id": row[0],
+                "date": row[1],
+                "createdAt": row[2],
+                "updatedAt": row[3],
+                "roomCount": row[4],
+                "studentCount": row[5],
+            }
+            for row in get_repository().list_schedules()
+        ]
+
+    @staticmethod
+    def get_schedule(schedule_id: int) -> Dict:
+        loaded = get_repository().load_schedule(schedule_id)
+        if loaded is None:
+            raise HTTPException(status_code=404, detail="Schedule not found")
+        (date, class_info, created_at, updated_at), rooms, seats = loaded
+
+        students_by_room = {}
+        for seat in seats:
+            students_by_room.setdefault(seat[1], []).append(ScheduleEditor.seat_student(seat))
+
+        seating_arrangement = {}
+        class_summary = {}
+        language_summary = {}
+        room_layouts = {}
+
+        for schedule_room_id, _, _, room_number, _, rows, benches_per_row, seats_per_bench, _ in rooms:
+            students = students_by_room.get(schedule_room_id, [])
+            seating_arrangement[room_number] = students
+
+            room_class_summary = {}
+            room_language_summary = {}
+            for student in students:
+                room_class_summary[student["className"]] = room_class_summary.get(student["className"], 0) + 1
+                # Handle None or empty language values
+                language = student["language"] or "No Language"
+                room_language_summary[language] = room_language_summary.get(language, 0) + 1
+            class_summary[room_number] = room_class_summary
+            language_summary[room_number] = room_language_summary
+
+            room_layouts[room_number] = {
+                "rows": rows,
+                "benchesPerRow": benches_per_row,
+                "seatsPerBench": seats_per_bench,
+                "conflicts": SavedScheduleService._count_conflicts(students, seats_per_bench),
+            }
+
+        return {
+            "id": schedule_id,
+            "date": date,
+            "createdAt": created_at,
+            "updatedAt": updated_at,
+            "seating_arrangement": seating_arrangement,
+            "class_summary": class_summary,
+            "class_info": {int(class_id): info for class_id, info in json.loads(class_info).items()},
+            "language_summary": language_summary,
+            "room_layouts": room_layouts,
+        }
+
+    @staticmethod
+    @writes_tables("schedules")
+    def delete_schedule(schedule_id: int) -> None:
+        with get_repository().transaction() as tx:
+            if tx.get_schedule(schedule_id) is None:
+                raise HTTPException(status_code=404, detail="Schedule not found")
+
+            tx.delete_schedule(schedule_id)
+
+    @staticmethod
+    @writes_tables("schedules")
+    def patch_students(schedule_id: int, patch: ScheduleStudentPatch) -> Dict:
+        """Seat late additions and unseat removed students"""
+        started = time.perf_counter()
+
+        with get_repository().transaction() as tx:
+            editor = ScheduleEditor(tx, schedule_id)
+
+            for ref in patch.remove:
+                if editor.unseat(ref.classId, ref.rollNumber) is None:
+                    raise HTTPException(
+                        status_code=404,
+                        detail=f"Student {ref.rollNumber} of class {ref.classId} is not in this schedule",
+                    )
+
+            for ref in patch.add:
+                editor.seat(editor.lookup_student(ref.classId, ref.rollNumber))
+
+            editor.save()
+
+        return editor.result(started)
+
+    @staticmethod
+    @writes_tables("schedules")
+    def patch_rooms(schedule_id: int, patch: ScheduleRoomPatch) -> Dict:
+        """Add rooms and drop rooms, moving only the students of dropped rooms"""
+        started = time.perf_counter()
+
+        with get_repository().transaction() as tx:
+            editor = ScheduleEditor(tx, schedule_id)
+
+            # Add first so students of dropped rooms can move into the new rooms
+            for room_id in patch.add:
+                editor.add_room(room_id)
+
+            for room_id in patch.remove:
+                editor.remove_room(room_id)
+
+            editor.save()
+
+        return editor.result(started)
+
+    @staticmethod
+    @writes_tables("schedules")
+    def patch_languages(schedule_id: int, patch: ScheduleLanguagePatch) -> Dict:
+        """Change the language selection of classes, seating or unseating only the difference"""
+        started = time.perf_counter()
+
+        with get_repository().transaction() as tx:
+            editor = ScheduleEditor(tx, schedule_id)
+
+            for class_id, languages in patch.language_selections.items():
+                editor.set_languages(class_id, languages)
+
+            editor.save()
+
+        return editor.result(started)
+
+    @staticmethod
+    def _count_conflicts(students: List[Dict], seats_per_bench: int) -> int:
+        """Same-class side-by-side or front-to-back pairs in a room"""
+        cells = {
+            (s["seat"]["row"], (s["seat"]["bench"] - 1) * seats_per_bench + s["seat"]["seat"]): s["classId"]
+            for s in students
+        }
+        return sum(
+            (cells.get((row, column - 1)) == class_id) + (cells.get((row - 1, column)) == class_id)
+            for (row, column), class_id in cells.items()
+        )
+
+
+class ScheduleEditor:
+    """
+    One edit transaction on a saved schedule. Work is proportional to the
+    students being changed and the rooms they touch: a room is read when the
+    edit first touches it, the room to seat a student in comes from the open
+    rooms index (seated < capacity, by position), per-class room counts come
+    from the (scheduleId, classId) index, and a room's seats are read once,
+    the first time a seat is picked in it, then kept current.
+    """
+
+    ROOM_COLUMNS = ("id", "position", "roomId", "roomNumber", "capacity", "seatRows", "benchesPerRow", "seatsPerBench", "seated")
+
+    def __init__(self, tx: StorageTransaction, schedule_id: int):
+        self.tx = tx
+        self.schedule_id = schedule_id
+
+        schedule = tx.get_schedule(schedule_id)
+        if schedule is None:
+            raise HTTPException(status_code=404, detail="Schedule not found")
+        self.request = ScheduleRequest.model_validate_json(schedule[0])
+        self.class_info = {int(class_id): info for class_id, info in json.loads(schedule[1]).items()}
+
+        # scheduleRoomId -> room, for the rooms this edit has touched
+        self.rooms: Dict[int, Dict] = {}
+        # scheduleRoomId -> {(row, column): classId} of taken seats, for the rooms seated into
+        self._occupied: Dict[int, Dict[Tuple[int, int], int]] = {}
+        self._class_counts: Dict[int, Dict[int, int]] = {}
+        self.seated: List[Dict] = []
+        self.unseated: List[Dict] = []
+
+    @staticmethod
+    def seat_student(seat: ScheduleSeatRow) -> Dict:
+        """A stored seat as a seating arrangement entry"""
+        _, _, class_id, class_name, roll_number, student_name, language, row, bench, seat_number = seat
+        return {
+            "rollNumber": roll_number,
+            "studentName": student_name,
+            "language": language,
+            "classId": class_id,
+            "className": class_name,
+            "seat": {"row": row, "bench": bench, "seat": seat_number},
+        }
+
+    def _room(self, row: ScheduleRoomRow) -> Dict:
+        """The editor's copy of a room; changes to it are written through with update_schedule_room"""
+        if row[0] not in self.rooms:
+            self.rooms[row[0]] = dict(zip(self.ROOM_COLUMNS, row))
+        return self.rooms[row[0]]
+
+    def _room_by_id(self, schedule_room_id: int) -> Dict:
+        if schedule_room_id in self.rooms:
+            return self.rooms[schedule_room_id]
+        return self._room(self.tx.schedule_room(schedule_room_id))
+
+    @staticmethod
+    def _cell(room: Dict, row: int, bench: int, seat: int) -> Tuple[int, int]:
+        """0-based (row, column) of a seat in the room's grid"""
+        return row - 1, (bench - 1) * room["seatsPerBench"] + seat - 1
+
+    def _occupancy(self, room: Dict) -> Dict[Tuple[int, int], int]:
+        if room["id"] not in self._occupied:
+            self._occupied[room["id"]] = {
+                self._cell(room, seat[7], seat[8], seat[9]): seat[2] for seat in self.tx.room_seats(room["id"])
+            }
+        return self._occupied[room["id"]]
+
+    def _counts_for_class(self, class_id: int) -> Dict[int, int]:
+        """scheduleRoomId -> number of students of the class in that room"""
+        if class_id not in self._class_counts:
+            self._class_counts[class_id] = self.tx.class_seats_by_room(self.schedule_id, class_id)
+        return self._class_counts[class_id]
+
+    def _class_display_name(self, class_id: int) -> str:
+        if class_id not in self.class_info:
+            class_result = self.tx.get_class(class_id)
+            if class_result is None:
+                raise HTTPException(status_code=404, detail=f"Class {class_id} not found")
+            class_name, shift = class_result
+            self.class_info[class_id] = {
+                "name": class_name,
+                "shift": shift,
+                "display_name": f"{class_name} - {shift}" if shift else class_name,
+            }
+            self.request.classes.append(class_id)
+        return self.class_info[class_id]["display_name"]
+
+    def lookup_student(self, class_id: int, roll_number: str) -> Dict:
+        student = self.tx.get_student(class_id, roll_number)
+        if student is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Student {roll_number} not found in class {class_id}",
+            )
+        return {
+            "rollNumber": student[0],
+            "studentName": student[1],
+            "language": student[2],
+            "classId": class_id,
+            "className": self._class_display_name(class_id),
+        }
+
+    def _room_record(self, room: Dict, student: Dict, seat: Tuple[int, int, int]) -> Dict:
+        return {
+            **student,
+            "roomNumber": room["roomNumber"],
+            "seat": {"row": seat[0], "bench": seat[1], "seat": seat[2]},
+        }
+
+    def _take_seats(self, seats: List[ScheduleSeatRow]) -> List[Tuple[Dict, Dict]]:
+        """Delete the given seat rows and return (room, student) for each"""
+        if not seats:
+            return []
+
+        self.tx.delete_schedule_seats([seat[0] for seat in seats])
+
+        taken = []
+        for seat in seats:
+            room_id, class_id = seat[1], seat[2]
+            room = self._room_by_id(room_id)
+            room["seated"] -= 1
+            if room_id in self._occupied:
+                del self._occupied[room_id][self._cell(room, *seat[7:10])]
+            counts = self._counts_for_class(class_id)
+            counts[room_id] = counts.get(room_id, 0) - 1
+
+            student = self.seat_student(seat)
+            del student["seat"]
+            taken.append((room, self._room_record(room, student, seat[7:10])))
+
+        for room in {room["id"]: room for room, _ in taken}.values():
+            self.tx.update_schedule_room(room["id"], room["seatRows"], room["seated"])
+
+        return taken
+
+    def unseat(self, class_id: int, roll_number: str) -> Optional[Dict]:
+        seat = self.tx.schedule_seat(self.schedule_id, class_id, roll_number)
+        taken = self._take_seats([seat] if seat is not None else [])
+        if not taken:
+            return None
+        self.unseated.append(taken[0][1])
+        return taken[0][1]
+
+    def seat(self, student: Dict) -> Dict:
+        if self.tx.schedule_seat(self.schedule_id, student["classId"], student["rollNumber"]) is not None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Student {student['rollNumber']} is already seated in this schedule",
+            )
+
+        room = self._choose_room(student["classId"])
+        if room is None:
+            raise HTTPException(status_code=400, detail="Not enough capacity in selected rooms for all students")
+
+        seat = self._choose_seat(room, student["classId"])
+        self.tx.add_schedule_seats(
+            self.schedule_id,
+            [
+                (
+                    room["id"],
+                    student["classId"],
+                    student["className"],
+                    student["rollNumber"],
+                    student["studentName"],
+                    student["language"],
+                    *seat,
+                )
+            ],
+        )
+
+        room["seated"] += 1
+        self._occupancy(room)[self._cell(room, *seat)] = student["classId"]
+        self.tx.update_schedule_room(room["id"], room["seatRows"], room["seated"])
+        counts = self._counts_for_class(student["classId"])
+        counts[room["id"]] = counts.get(room["id"], 0) + 1
+
+        record = self._room_record(room, student, seat)
+        self.seated.append(record)
+        return record
+
+    def _choose_room(self, class_id: int) -> Optional[Dict]:
+        """Same rule as placement: first open room under the class limit, else first open room"""
+        at_limit = [
+            room_id for room_id, count in self._counts_for_class(class_id).items()
+            if count >= settings.MAX_STUDENTS_PER_CLASS_PER_ROOM
+        ]
+        row = self.tx.first_open_room(self.schedule_id, at_limit)
+        if row is None and at_limit:
+            row = self.tx.first_open_room(self.schedule_id, [])
+        return self._room(row) if row is not None else None
+
+    def _choose_seat(self, room: Dict, class_id: int) -> Tuple[int, int, int]:
+        """First free seat with no classmate beside, in front or behind; grows the grid if full"""
+        seats_per_bench = room["seatsPerBench"]
+        columns = room["benchesPerRow"] * seats_per_bench
+        occupied = self._occupancy(room)
+
+        first_free = None
+        chosen = None
+        for cell in range(room["seatRows"] * columns):
+            row, column = divmod(cell, columns)
+            if (row, column) in occupied:
+                continue
+            if first_free is None:
+                first_free = (row, column)
+            neighbours = ((row, column - 1), (row, column + 1), (row - 1, column), (row + 1, column))
+            if all(
+                occupied.get(neighbour) != class_id
+                for neighbour in neighbours
+                if 0 <= neighbour[1] < columns
+            ):
+                chosen = (row, column)
+                break
+
+        if chosen is None:
+            chosen = first_free
+        if chosen is None:
+            # Grid is full, add a row at the back
+            chosen = (room["seatRows"], 0)
+            room["seatRows"] += 1
+            self.tx.update_schedule_room(room["id"], room["seatRows"], room["seated"])
+
+        row, column = chosen
+        return row + 1, column // seats_per_bench + 1, column % seats_per_bench + 1
+
+    def add_room(self, room_id: int) -> None:
+        exam_room = self.tx.get_room(room_id)
+        if exam_room is None:
+            raise HTTPException(status_code=404, detail=f"Exam room {room_id} not found")
+        room_number, capacity, _, _, rows, benches_per_row, seats_per_bench = exam_room
+
+        layout = SeatLayoutEngine.resolve_layout(
+            {
+                "capacity": capacity,
+                "layout": {"rows": rows, "benchesPerRow": benches_per_row, "seatsPerBench": seats_per_bench},
+            },
+            0,
+        )
+        last_position = self.tx.last_room_position(self.schedule_id)
+        room = {
+            "position": last_position + 1 if last_position is not None else 0,
+            "roomId": room_id,
+            "roomNumber": room_number,
+            "capacity": capacity,
+            "seatRows": layout["rows"],
+            "benchesPerRow": layout["benchesPerRow"],
+            "seatsPerBench": layout["seatsPerBench"],
+            "seated": 0,
+        }
+        room["id"] = self.tx.create_schedule_room(
+            self.schedule_id,
+            (
+                room["position"],
+                room_id,
+                room_number,
+                capacity,
+                room["seatRows"],
+                room["benchesPerRow"],
+                room["seatsPerBench"],
+                0,
+            ),
+        )
+        self.rooms[room["id"]] = room
+        self._occupied[room["id"]] = {}
+        self.request.exam_rooms.append(room_id)
+
+    def remove_room(self, room_id: int) -> None:
+        dropped = [self._room(row) for row in self.tx.schedule_rooms(self.schedule_id, room_id)]
+        if not dropped:
+            raise HTTPException(status_code=404, detail=f"Exam room {room_id} is not in this schedule")
+
+        moving = []
+        for room in dropped:
+            moving.extend(student for _, student in self._take_seats(self.tx.room_seats(room["id"])))
+            del self.rooms[room["id"]]
+            self._occupied.pop(room["id"], None)
+            self.tx.delete_schedule_room(room["id"])
+        self.request.exam_rooms = [r for r in self.request.exam_rooms if r != room_id]
+
+        for student in sorted(moving, key=lambda s: s["rollNumber"]):
+            del student["roomNumber"], student["seat"]
+            self.seat(student)
+
+    def set_languages(self, class_id: int, languages: List[str]) -> None:
+        if class_id not in self.class_info:
+            raise HTTPException(status_code=400, detail=f"Class {class_id} is not part of this schedule")
+
+        selected_languages = languages or None
+        included = {
+            student["rollNumber"]: student
+            for student in get_repository().students_of_class(class_id)
+            if ScheduleDataLoader.matches_languages(student["language"], selected_languages)
+        }
+
+        seated = set(self.tx.seated_roll_numbers(self.schedule_id, class_id))
+
+        for roll_number in sorted(seated - included.keys()):
+            self.unseat(class_id, roll_number)
+
+        display_name = self._class_display_name(class_id)
+        for roll_number in sorted(included.keys() - seated):
+            student = included[roll_number]
+            self.seat(
+                {
+                    "rollNumber": roll_number,
+                    "studentName": student["studentName"],
+                    "language": student["language"],
+                    "classId": class_id,
+                    "className": display_name,
+                }
+            )
+
+        if self.request.language_selections is None:
+            self.request.language_selections = {}
+        self.request.language_selections[class_id] = languages
+
+    def save(self) -> None:
+        self.tx.update_schedule(self.schedule_id, self.request.model_dump_json(), json.dumps(self.class_info))
+
+    def result(self, started: float) -> Dict:
+        return {
+            "scheduleId": self.schedule_id,
+            "seated": self.seated,
+            "unseated": self.unseated,
+            "patch_time_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
@@ -0,0 +1,116 @@
+import json
+from typing import Dict, Iterator, Optional
+from .models import ScheduleRequest
+from .repository import get_repository
+from .schedule_cache import ScheduleCache
+
+
+def _line(record: Dict) -> bytes:
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class ScheduleStreamer:
+    """
+    Streams a schedule as NDJSON: one "room" record per room, in request
+    order, written as soon as the room is seated and summarised, followed by
+    one "summary" record.
+
+    Loading and placement run before the first line is produced, so request
+    errors (e.g. not enough capacity) are still reported as HTTP errors. The
+    full response is never built and each room's students are released once
+    the room has been written.
+    """
+
+    @staticmethod
+    def open(data: ScheduleRequest) -> Iterator[bytes]:
+        from .services import ScheduleService
+
+        # Streamed results are not cached (that would mean building them in full), but hits are replayed
+        _, cached = ScheduleCache.get(data)
+        if cached is not None:
+            return ScheduleStreamer._replay(cached)
+
+        with get_repository().schedule_loader() as loader:
+            loaded = loader.load(data)
+
+        optimization = ScheduleService.place_students(data, loaded)
+        return ScheduleStreamer._stream(data, loaded, optimization)
+
+    @staticmethod
+    def _room_record(position: int, room_number: str, students, class_summary, language_summary, layout) -> Dict:
+        return {
+            "type": "room",
+            "position": position,
+            "roomNumber": room_number,
+            "students": students,
+            "class_summary": class_summary,
+            "language_summary": language_summary,
+            "layout": layout,
+        }
+
+    @staticmethod
+    def _summary_record(date: str, class_info: Dict, room_count: int, student_count: int,
+                        load_stats: Optional[Dict], optimization: Optional[Dict], cache_status: str) -> Dict:
+        return {
+            "type": "summary",
+            "date": date,
+            "class_info": class_info,
+            "room_count": room_count,
+            "student_count": student_count,
+            "load_stats": load_stats,
+            "optimization": optimization,
+            "cache": {"status": cache_status, **ScheduleCache.stats()},
+        }
+
+    @staticmethod
+    def _stream(data: ScheduleRequest, loaded: Dict, optimization: Optional[Dict]) -> Iterator[bytes]:
+        from .services import ScheduleService
+
+        # Rooms hold the placed students from here on
+        student_count = len(loaded.pop("students"))
+        rooms = loaded["rooms"]
+
+        for position, room in enumerate(rooms):
+            finalised = ScheduleService.finalise_room(room)
+            yield _line(
+                ScheduleStreamer._room_record(
+                    position,
+                    room["roomNumber"],
+                    room["students"],
+                    finalised["class_summary"],
+                    finalised["language_summary"],
+                    finalised["layout"],
+                )
+            )
+            room["students"] = []
+
+        yield _line(
+            ScheduleStreamer._summary_record(
+                data.date, loaded["class_info"], len(rooms), student_count,
+                loaded["load_stats"], optimization, "miss",
+            )
+        )
+
+    @staticmethod
+    def _replay(result: Dict) -> Iterator[bytes]:
+        """Stream a cached schedule result in the same record format"""
+        student_count = 0
+        for position, (room_number, students) in enumerate(result["seating_arrangement"].items()):
+            student_count += len(students)
+            yield _line(
+                ScheduleStreamer._room_record(
+                    position,
+                    room_number,
+                    students,
+                    result["class_summary"][room_number],
+                    result["language_summary"][room_number],
+                    result["room_layouts"][room_number],
+                )
+            )
+
+        yield _line(
+            ScheduleStreamer._summary_record(
+                result["date"], result["class_info"], len(result["seating_arrangement"]), student_count,
+                result["load_stats"], result["optimization"], "hit",
+            )
+        )
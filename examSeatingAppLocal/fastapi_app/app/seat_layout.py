@@ -0,0 +1,194 @@
+import math
+from array import array
+from typing import List, Dict, Optional
+from .config import settings
+
+# Grid cell values other than a class index
+EMPTY_SEAT = -1
+
+
+class SeatLayoutEngine:
+    """
+    Assigns every student of a room to a seat on a rows x benches x seats grid
+    so that no two students of the same class sit side by side (adjacent seats
+    in a row) or one behind the other (same seat in consecutive rows).
+
+    The grid is a flat array of class indexes filled in row-major order by a
+    depth-first search with constraint propagation:
+    - each seat's domain is the classes that still have students left and
+      differ from the seat to the left and the seat in front
+    - classes with the most students left are tried first, leaving a seat
+      empty is tried last
+    - a branch is pruned as soon as any class has more students left than
+      can be seated without adjacency in the remaining seats
+
+    When the room cannot be arranged without conflicts (e.g. one class fills
+    more than half the room) or the search budget runs out, a greedy pass
+    places students with the fewest conflicts and reports how many remain.
+    """
+
+    @staticmethod
+    def resolve_layout(room: Dict, student_count: int) -> Dict[str, int]:
+        """Return the room's grid, growing it when it has fewer seats than students"""
+        layout = room.get("layout") or {}
+        benches_per_row = layout.get("benchesPerRow") or settings.DEFAULT_BENCHES_PER_ROW
+        seats_per_bench = layout.get("seatsPerBench") or settings.DEFAULT_SEATS_PER_BENCH
+        columns = benches_per_row * seats_per_bench
+
+        rows = layout.get("rows") or math.ceil(max(room.get("capacity", 0), 1) / columns)
+        rows = max(rows, math.ceil(student_count / columns))
+
+        return {
+            "rows": rows,
+            "benchesPerRow": benches_per_row,
+            "seatsPerBench": seats_per_bench,
+        }
+
+    @staticmethod
+    def assign_seats(room: Dict) -> Dict[str, int]:
+        """
+        Give every student in room["students"] a "seat" of {row, bench, seat}
+        (1-based) and return the resolved layout with its conflict count.
+        """
+        students = room["students"]
+        layout = SeatLayoutEngine.resolve_layout(room, len(students))
+        columns = layout["benchesPerRow"] * layout["seatsPerBench"]
+        cell_count = layout["rows"] * columns
+
+        # Students of each class keep their roll-number order
+        class_positions: Dict[int, int] = {}
+        class_students: List[List[Dict]] = []
+        for student_data in students:
+            class_id = student_data["classId"]
+            if class_id not in class_positions:
+                class_positions[class_id] = len(class_students)
+                class_students.append([])
+            class_students[class_positions[class_id]].append(student_data)
+
+        remaining = [len(group) for group in class_students]
+        grid = SeatLayoutEngine._search(remaining, cell_count, columns)
+        if grid is None:
+            grid = SeatLayoutEngine._greedy(remaining, cell_count, columns)
+
+        next_student = [0] * len(class_students)
+        for cell, class_index in enumerate(grid):
+            if class_index == EMPTY_SEAT:
+                continue
+            row, column = divmod(cell, columns)
+            student_data = class_students[class_index][next_student[class_index]]
+            next_student[class_index] += 1
+            student_data["seat"] = {
+                "row": row + 1,
+                "bench": column // layout["seatsPerBench"] + 1,
+                "seat": column % layout["seatsPerBench"] + 1,
+            }
+
+        layout["conflicts"] = SeatLayoutEngine.count_conflicts(grid, columns)
+        return layout
+
+    @staticmethod
+    def _candidates(grid: array, cell: int, columns: int, remaining: List[int], empty_left: int) -> List[int]:
+        left = grid[cell - 1] if cell % columns else EMPTY_SEAT
+        front = grid[cell - columns] if cell >= columns else EMPTY_SEAT
+
+        candidates = [
+            class_index
+            for class_index in sorted(range(len(remaining)), key=lambda k: -remaining[k])
+            if remaining[class_index] > 0 and class_index != left and class_index != front
+        ]
+        if empty_left > 0:
+            candidates.append(EMPTY_SEAT)
+        return candidates
+
+    @staticmethod
+    def _search(remaining: List[int], cell_count: int, columns: int) -> Optional[array]:
+        """Depth-first search for a conflict-free grid, None if none was found within budget"""
+        remaining = list(remaining)
+        empty_left = cell_count - sum(remaining)
+
+        # The open seats always form a path (snake through the rows), so no
+        # class can take more than half of them without two being adjacent.
+        if remaining and max(remaining) > (cell_count + 1) // 2:
+            return None
+
+        grid = array("i", [EMPTY_SEAT]) * cell_count
+        stack = [SeatLayoutEngine._candidates(grid, 0, columns, remaining, empty_left)] if cell_count else []
+        budget = settings.SEAT_LAYOUT_SEARCH_LIMIT
+
+        while stack:
+            cell = len(stack) - 1
+            candidates = stack[-1]
+
+            if not candidates:
+                # Backtrack: undo the choice of the previous seat
+                stack.pop()
+                if stack:
+                    previous = grid[cell - 1]
+                    if previous == EMPTY_SEAT:
+                        empty_left += 1
+                    else:
+                        remaining[previous] += 1
+                continue
+
+            budget -= 1
+            if budget < 0:
+                return None
+
+            choice = candidates.pop(0)
+            grid[cell] = choice
+            if choice == EMPTY_SEAT:
+                empty_left -= 1
+            else:
+                remaining[choice] -= 1
+
+            open_seats = cell_count - cell - 1
+            if open_seats == 0:
+                return grid
+
+            if max(remaining, default=0) > (open_seats + 1) // 2:
+                # Prune, try the next candidate for this seat
+                if choice == EMPTY_SEAT:
+                    empty_left += 1
+                else:
+                    remaining[choice] += 1
+                continue
+
+            stack.append(SeatLayoutEngine._candidates(grid, cell + 1, columns, remaining, empty_left))
+
+        return None
+
+    @staticmethod
+    def _greedy(remaining: List[int], cell_count: int, columns: int) -> array:
+        """Fill the grid avoiding adjacency where possible, accepting conflicts otherwise"""
+        remaining = list(remaining)
+        empty_left = cell_count - sum(remaining)
+        grid = array("i", [EMPTY_SEAT]) * cell_count
+
+        for cell in range(cell_count):
+            candidates = SeatLayoutEngine._candidates(grid, cell, columns, remaining, empty_left)
+            if candidates:
+                choice = candidates[0]
+            else:
+                # Every class left would conflict, take the one with most students
+                choice = max(range(len(remaining)), key=lambda k: remaining[k])
+
+            grid[cell] = choice
+            if choice == EMPTY_SEAT:
+                empty_left -= 1
+            else:
+                remaining[choice] -= 1
+
+        return grid
+
+    @staticmethod
+    def count_conflicts(grid: array, columns: int) -> int:
+        """Number of same-class side-by-side or front-to-back seat pairs"""
+        conflicts = 0
+        for cell, class_index in enumerate(grid):
+            if class_index == EMPTY_SEAT:
+                continue
+            if cell % columns and grid[cell - 1] == class_index:
+                conflicts += 1
+            if cell >= columns and grid[cell - columns] == class_index:
+                conflicts += 1
+        return conflicts
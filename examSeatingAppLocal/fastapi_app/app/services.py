@@ -1,11 +1,10 @@
-import sqlite3
-from typing import List, Dict, Tuple
+import time
+from typing import Callable, List, Dict, Iterator, Optional, Tuple
 from fastapi import HTTPException
-from .database import get_db_cursor
+from .data_version import writes_tables
 from .config import settings
 from .models import (
     ClassModel,
-    ClassResponseModel,
     StudentModel,
     StudentResponseModel,
     ExamRoomModel,
@@ -14,71 +13,46 @@ from .models import (
     BulkImportResponse,
 )
 from .excel_utils import ExcelParser, ExcelValidator
+from .placement_engine import PlacementEngine
+from .vectorized_planner import VectorizedPlanner
+from .room_optimizer import RoomOptimizer
+from .seat_layout import SeatLayoutEngine
+from .schedule_cache import ScheduleCache
+from .repository import DuplicateKeyError, get_repository
 
 
 class ClassService:
-    @staticmethod
-    def get_all_classes() -> List[ClassResponseModel]:
-        with get_db_cursor() as cursor:
-            cursor.execute("SELECT * FROM classes")
-            classes = cursor.fetchall()
-            result = []
-
-            for class_row in classes:
-                # Handle both old and new schema
-                if len(class_row) == 2:
-                    class_id, class_name = class_row
-                    shift = None
-                else:
-                    class_id, class_name, shift = class_row
-
-                # Get students for this class
-                cursor.execute(
-                    "SELECT id, rollNumber, studentName, classId, language, dateOfBirth FROM students WHERE classId = ?",
-                    (class_id,),
-                )
-                students = cursor.fetchall()
-
-                student_list = []
-                for student in students:
-                    # Handle both old and new schema
-                    if len(student) == 4:
-                        student_id, roll_num, name, class_id = student
-                        language = None
-                        date_of_birth = None
-                    else:
-                        (
-                            student_id,
-                            roll_num,
-                            name,
-                            class_id,
-                            language,
-                            date_of_birth,
-                        ) = student
-
-                    student_list.append(
-                        StudentResponseModel(
-                            id=student_id,
-                            rollNumber=roll_num,
-                            studentName=name,
-                            classId=class_id,
-                            language=language,
-                            dateOfBirth=date_of_birth,
-                        )
-                    )
+    # Student columns that can be requested through student_fields
+    STUDENT_FIELDS = ("id", "rollNumber", "studentName", "language", "dateOfBirth", "classId")
 
-                result.append(
-                    ClassResponseModel(
-                        id=class_id,
-                        className=class_name,
-                        shift=shift,
-                        students=student_list,
-                    )
-                )
+    @staticmethod
+    def get_all_classes(
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+        include_students: bool = True,
+        student_fields: Optional[List[str]] = None,
+    ) -> Dict[str, any]:
+        """Return {"classes": [...], "next_after": class id or None}
+
+        Classes are ordered by id. With a limit, pass the returned next_after as
+        after to get the next page (keyset pagination); next_after is None on
+        the last page. student_fields restricts each student to those fields.
+        """
+        if limit is not None and limit < 1:
+            raise HTTPException(status_code=400, detail="limit must be at least 1")
+
+        fields = list(student_fields) if student_fields else list(ClassService.STUDENT_FIELDS)
+        unknown = [field for field in fields if field not in ClassService.STUDENT_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown student fields: {', '.join(unknown)}. Must be among: {', '.join(ClassService.STUDENT_FIELDS)}",
+            )
 
-            return result
+        return get_repository().list_classes(limit, after, include_students, fields)
 
     @staticmethod
+    @writes_tables("classes", "students")
     def create_class(class_data: ClassModel) -> None:
         # Validate that shift is provided and not empty
         if not class_data.shift or not class_data.shift.strip():
@@ -86,13 +60,9 @@ class ClassService:
                 status_code=400, detail="Shift is required and cannot be empty"
             )
 
-        with get_db_cursor() as cursor:
+        with get_repository().transaction() as tx:
             # Insert class
-            cursor.execute(
-                "INSERT INTO classes (className, shift) VALUES (?, ?)",
-                (class_data.className, class_data.shift.strip()),
-            )
-            class_id = cursor.lastrowid
+            class_id = tx.create_class(class_data.className, class_data.shift.strip())
 
             # Insert students
             for index, student in enumerate(class_data.students):
@@ -102,21 +72,17 @@ class ClassService:
                     # Generate a simple roll number based on class_id and student index
                     roll_number = f"STU{class_id:03d}{index+1:03d}"
 
-                cursor.execute(
-                    """
-                    INSERT INTO students (rollNumber, studentName, language, dateOfBirth, classId)
-                    VALUES (?, ?, ?, ?, ?)
-                """,
-                    (
-                        roll_number,
-                        student.studentName,
-                        student.language,
-                        student.dateOfBirth,
-                        class_id,
-                    ),
-                )
+                try:
+                    tx.create_student(
+                        class_id, (roll_number, student.studentName, student.language, student.dateOfBirth)
+                    )
+                except DuplicateKeyError:
+                    raise HTTPException(
+                        status_code=400, detail=f"Duplicate roll number in class: {roll_number}"
+                    )
 
     @staticmethod
+    @writes_tables("classes", "students")
     def update_class(class_id: int, class_data: ClassModel) -> None:
         # Validate that shift is provided and not empty
         if not class_data.shift or not class_data.shift.strip():
@@ -124,59 +90,57 @@ class ClassService:
                 status_code=400, detail="Shift is required and cannot be empty"
             )
 
-        with get_db_cursor() as cursor:
-            cursor.execute("SELECT * FROM classes WHERE id=?", (class_id,))
-            if cursor.fetchone() is None:
+        with get_repository().transaction() as tx:
+            if not tx.class_exists(class_id):
                 raise HTTPException(status_code=404, detail="Class not found")
 
             # Update class name and shift
-            cursor.execute(
-                "UPDATE classes SET className=?, shift=? WHERE id=?",
-                (class_data.className, class_data.shift.strip(), class_id),
-            )
+            tx.update_class(class_id, class_data.className, class_data.shift.strip())
 
-            # Delete existing students for this class
-            cursor.execute("DELETE FROM students WHERE classId=?", (class_id,))
-
-            # Insert new students
+            # Replace the class's students, writing only what changed
+            rows = []
             for index, student in enumerate(class_data.students):
                 # Generate rollNumber if not provided
                 roll_number = student.rollNumber
                 if not roll_number:
                     # Generate a simple roll number based on class_id and student index
                     roll_number = f"STU{class_id:03d}{index+1:03d}"
+                rows.append((roll_number, student.studentName, student.language, student.dateOfBirth))
 
-                cursor.execute(
-                    """
-                    INSERT INTO students (rollNumber, studentName, language, dateOfBirth, classId)
-                    VALUES (?, ?, ?, ?, ?)
-                """,
-                    (
-                        roll_number,
-                        student.studentName,
-                        student.language,
-                        student.dateOfBirth,
-                        class_id,
-                    ),
+            # Raising rolls the transaction back, nothing is written
+            _, skipped = tx.replace_students({class_id: rows})
+            if skipped[class_id]:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Duplicate roll numbers in class: {', '.join(skipped[class_id])}",
                 )
 
     @staticmethod
+    @writes_tables("classes", "students")
     def delete_class(class_id: int) -> None:
-        with get_db_cursor() as cursor:
-            cursor.execute("SELECT * FROM classes WHERE id=?", (class_id,))
-            if cursor.fetchone() is None:
+        with get_repository().transaction() as tx:
+            if not tx.class_exists(class_id):
                 raise HTTPException(status_code=404, detail="Class not found")
 
-            # Delete students first (due to foreign key constraint)
-            cursor.execute("DELETE FROM students WHERE classId=?", (class_id,))
-            cursor.execute("DELETE FROM classes WHERE id=?", (class_id,))
+            tx.delete_class(class_id)
 
     @staticmethod
-    def bulk_import_from_excel(file_content: bytes, filename: str = "Unknown") -> BulkImportResponse:
-        """Bulk import classes and students from Excel file"""
+    @writes_tables("classes", "students")
+    def bulk_import_from_excel(
+        file_content: bytes,
+        filename: str = "Unknown",
+        parsed_data: Optional[Dict] = None,
+        progress: Optional[Callable[[Dict], None]] = None,
+    ) -> BulkImportResponse:
+        """
+        Bulk import classes and students from Excel file, or from its already
+        parsed data. progress, if given, is called with the write progress
+        (see _apply_import).
+        """
         try:
             # Parse Excel file
-            parsed_data = ExcelParser.parse_student_excel(file_content, filename)
+            if parsed_data is None:
+                parsed_data = ExcelParser.parse_student_excel(file_content, filename)
 
             # Validate parsed data
             validation_errors = ExcelValidator.validate_parsed_data(parsed_data)
@@ -190,7 +154,8 @@ class ClassService:
             students_created = 0
             details = []
 
-            with get_db_cursor() as cursor:
+            with get_repository().transaction() as tx:
+                rows_by_class = {}
                 for class_data in parsed_data["classes"]:
                     class_name = class_data["class_name"]
                     shift = class_data["shift"]
@@ -204,63 +169,34 @@ class ClassService:
                         )
 
                     # Check if class already exists
-                    cursor.execute(
-                        "SELECT id FROM classes WHERE className = ? AND shift = ?",
-                        (class_name, shift.strip()),
-                    )
-                    existing_class = cursor.fetchone()
+                    class_id = tx.find_class_id(class_name, shift.strip())
 
-                    if existing_class:
-                        class_id = existing_class[0]
-                        # Update existing class - delete old students and add new ones
-                        cursor.execute(
-                            "DELETE FROM students WHERE classId = ?", (class_id,)
-                        )
+                    if class_id is not None:
+                        # Update existing class - its students are replaced by the imported ones
                         action = "updated"
                     else:
                         # Create new class
-                        cursor.execute(
-                            "INSERT INTO classes (className, shift) VALUES (?, ?)",
-                            (class_name, shift.strip()),
-                        )
-                        class_id = cursor.lastrowid
+                        class_id = tx.create_class(class_name, shift.strip())
                         classes_created += 1
                         action = "created"
 
-                    # Add students to the class
-                    class_students_added = 0
-                    for student in students:
-                        try:
-                            cursor.execute(
-                                """
-                                INSERT INTO students (rollNumber, studentName, language, dateOfBirth, classId)
-                                VALUES (?, ?, ?, ?, ?)
-                            """,
-                                (
-                                    student["register_number"],
-                                    student["name"],
-                                    student["language"],
-                                    student["date_of_birth"],
-                                    class_id,
-                                ),
-                            )
-                            class_students_added += 1
-                            students_created += 1
-                        except sqlite3.IntegrityError as e:
-                            # Handle duplicate register numbers
-                            print(
-                                f"Skipping duplicate student {student['register_number']}: {e}"
-                            )
+                    # Stage the class's students, written in one pass below
+                    rows_by_class[class_id] = [
+                        (student["register_number"], student["name"], student["language"], student["date_of_birth"])
+                        for student in students
+                    ]
 
                     details.append(
                         {
                             "className": class_name,
                             "shift": shift.strip(),
                             "action": action,
-                            "studentsAdded": class_students_added,
+                            "classId": class_id,
                         }
                     )
 
+                students_created = ClassService._apply_import(tx, rows_by_class, details, progress)
+
             return BulkImportResponse(
                 message=f"Successfully imported {classes_created} classes with {students_created} students",
                 classesCreated=classes_created,
@@ -277,11 +213,13 @@ class ClassService:
 
 
     @staticmethod
-    def selective_import_from_excel(file_content: bytes, selected_class_identifiers: List[dict], filename: str = "Unknown") -> BulkImportResponse:
-        """Import only selected classes from Excel file"""
+    @writes_tables("classes", "students")
+    def selective_import_from_excel(file_content: bytes, selected_class_identifiers: List[dict], filename: str = "Unknown", parsed_data: Optional[Dict] = None, progress: Optional[Callable[[Dict], None]] = None) -> BulkImportResponse:
+        """Import only selected classes from Excel file, or from its already parsed data; progress as in bulk_import_from_excel"""
         try:
             # Parse Excel file
-            parsed_data = ExcelParser.parse_student_excel(file_content, filename)
+            if parsed_data is None:
+                parsed_data = ExcelParser.parse_student_excel(file_content, filename)
             
             # Filter only selected classes by matching class_name and shift
             all_classes = parsed_data["classes"]
@@ -301,37 +239,29 @@ class ClassService:
             students_created = 0
             details = []
             
-            with get_db_cursor() as cursor:
+            with get_repository().transaction() as tx:
+                rows_by_class = {}
                 for class_data in selected_classes:
                     class_name = class_data["class_name"]
                     shift = class_data["shift"]
                     students = class_data["students"]
                     
                     # Check if class already exists
-                    cursor.execute("SELECT id FROM classes WHERE className = ? AND shift = ?", (class_name, shift.strip()))
-                    existing_class = cursor.fetchone()
+                    class_id = tx.find_class_id(class_name, shift.strip())
                     
-                    if existing_class:
-                        class_id = existing_class[0]
-                        cursor.execute("DELETE FROM students WHERE classId = ?", (class_id,))
+                    if class_id is not None:
                         action = "updated"
                     else:
-                        cursor.execute("INSERT INTO classes (className, shift) VALUES (?, ?)", (class_name, shift.strip()))
-                        class_id = cursor.lastrowid
+                        class_id = tx.create_class(class_name, shift.strip())
                         classes_created += 1
                         action = "created"
                     
-                    # Add students
-                    class_students_added = 0
-                    for student in students:
-                        try:
-                            cursor.execute("INSERT INTO students (rollNumber, studentName, language, dateOfBirth, classId) VALUES (?, ?, ?, ?, ?)", (student["register_number"], student["name"], student["language"], student["date_of_birth"], class_id))
-                            class_students_added += 1
-                            students_created += 1
-                        except sqlite3.IntegrityError:
-                            pass
+                    # Stage students, written in one pass below
+                    rows_by_class[class_id] = [(student["register_number"], student["name"], student["language"], student["date_of_birth"]) for student in students]
                     
-                    details.append({"className": class_name, "shift": shift.strip(), "action": action, "studentsAdded": class_students_added})
+                    details.append({"className": class_name, "shift": shift.strip(), "action": action, "classId": class_id})
+
+                students_created = ClassService._apply_import(tx, rows_by_class, details, progress)
             
             return BulkImportResponse(message=f"Successfully imported {len(selected_classes)} selected classes with {students_created} students", classesCreated=classes_created, studentsCreated=students_created, details=details)
         
@@ -340,400 +270,372 @@ class ClassService:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error during selective import: {str(e)}")
 
+    @staticmethod
+    def _apply_import(
+        tx, rows_by_class: Dict[int, List[tuple]], details: List[dict], progress: Optional[Callable[[Dict], None]] = None
+    ) -> int:
+        """
+        Write the staged import and fill in each class's counts; returns the students imported.
+
+        Without progress the import is written in one pass. With it, class by
+        class, progress being called with {"type": "classes", "classes", "rows"}
+        before writing and {"type": "class", "className", "shift", "action",
+        "rows", "studentsWritten", counts...} after each class: of its rows,
+        studentsWritten (inserted, updated or unchanged) are now in the class
+        and the other "skipped" ones were duplicates.
+        """
+        if progress is None:
+            counts, skipped = tx.replace_students(rows_by_class)
+        else:
+            progress({
+                "type": "classes",
+                "classes": len(rows_by_class),
+                "rows": sum(len(rows) for rows in rows_by_class.values()),
+            })
+            # A class listed twice is written once, with its last rows and detail
+            detail_by_class = {detail["classId"]: detail for detail in details}
+            counts, skipped = {}, {}
+            for class_id, rows in rows_by_class.items():
+                class_counts, class_skipped = tx.replace_students({class_id: rows})
+                counts.update(class_counts)
+                skipped.update(class_skipped)
+                detail = detail_by_class[class_id]
+                progress({
+                    "type": "class",
+                    "className": detail["className"],
+                    "shift": detail["shift"],
+                    "action": detail["action"],
+                    "rows": len(rows),
+                    "studentsWritten": sum(class_counts[class_id][count] for count in ("inserted", "updated", "unchanged")),
+                    **class_counts[class_id],
+                })
+        for register_numbers in skipped.values():
+            for register_number in register_numbers:
+                # Handle duplicate register numbers
+                print(f"Skipping duplicate student {register_number}")
+        students_imported = 0
+        for detail in details:
+            class_counts = counts[detail.pop("classId")]
+            # Students now in the class from this import, as before the diff-based writer
+            detail["studentsAdded"] = class_counts["inserted"] + class_counts["updated"] + class_counts["unchanged"]
+            detail.update(class_counts)
+            students_imported += detail["studentsAdded"]
+        return students_imported
+
 class StudentService:
     @staticmethod
     def get_students_by_class(class_id: int) -> List[StudentResponseModel]:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                "SELECT id, rollNumber, studentName, classId, language, dateOfBirth FROM students WHERE classId = ?",
-                (class_id,),
+        return [StudentResponseModel(**student) for student in get_repository().students_of_class(class_id)]
+
+    @staticmethod
+    def search_students(
+        query: str, limit: Optional[int] = None, offset: int = 0, class_id: Optional[int] = None
+    ) -> Dict[str, any]:
+        """Return {"students": [...], "next_offset": offset or None}
+
+        Students with, for every word of the query, a roll number, name or
+        class name word starting with it, in id order. Each student
+        carries its className and shift. Pass next_offset as offset for the
+        next page; it is None on the last page.
+        """
+        limit = settings.STUDENT_SEARCH_DEFAULT_LIMIT if limit is None else limit
+        if not 1 <= limit <= settings.STUDENT_SEARCH_MAX_LIMIT:
+            raise HTTPException(
+                status_code=400, detail=f"limit must be between 1 and {settings.STUDENT_SEARCH_MAX_LIMIT}"
             )
-            students = cursor.fetchall()
-
-            student_list = []
-            for student in students:
-                # Handle both old and new schema
-                if len(student) == 4:
-                    student_id, roll_num, name, class_id = student
-                    language = None
-                    date_of_birth = None
-                else:
-                    (
-                        student_id,
-                        roll_num,
-                        name,
-                        class_id,
-                        language,
-                        date_of_birth,
-                    ) = student
-
-                student_list.append(
-                    StudentResponseModel(
-                        id=student_id,
-                        rollNumber=roll_num,
-                        studentName=name,
-                        classId=class_id,
-                        language=language,
-                        dateOfBirth=date_of_birth,
-                    )
-                )
+        if offset < 0:
+            raise HTTPException(status_code=400, detail="offset must not be negative")
+        if not query.strip():
+            raise HTTPException(status_code=400, detail="Search query is empty")
 
-            return student_list
+        return get_repository().search_students(query, limit, offset, class_id)
 
     @staticmethod
+    @writes_tables("students")
     def create_student(class_id: int, student_data: StudentModel) -> None:
-        with get_db_cursor() as cursor:
-            cursor.execute("SELECT * FROM classes WHERE id=?", (class_id,))
-            if cursor.fetchone() is None:
+        with get_repository().transaction() as tx:
+            if not tx.class_exists(class_id):
                 raise HTTPException(status_code=404, detail="Class not found")
 
             # Generate rollNumber if not provided
             roll_number = student_data.rollNumber
             if not roll_number:
                 # Get the count of existing students in this class to generate unique roll number
-                cursor.execute(
-                    "SELECT COUNT(*) FROM students WHERE classId=?", (class_id,)
-                )
-                student_count = cursor.fetchone()[0]
+                student_count = tx.count_students(class_id)
                 roll_number = f"STU{class_id:03d}{student_count+1:03d}"
 
             try:
-                cursor.execute(
-                    """
-                    INSERT INTO students (rollNumber, studentName, language, dateOfBirth, classId)
-                    VALUES (?, ?, ?, ?, ?)
-                """,
-                    (
-                        roll_number,
-                        student_data.studentName,
-                        student_data.language,
-                        student_data.dateOfBirth,
-                        class_id,
-                    ),
+                tx.create_student(
+                    class_id,
+                    (roll_number, student_data.studentName, student_data.language, student_data.dateOfBirth),
                 )
-            except sqlite3.IntegrityError:
+            except DuplicateKeyError:
                 raise HTTPException(
                     status_code=400,
                     detail="Student with this roll number already exists in this class",
                 )
 
     @staticmethod
+    @writes_tables("students")
     def delete_student(student_id: int) -> None:
-        with get_db_cursor() as cursor:
-            cursor.execute("SELECT * FROM students WHERE id=?", (student_id,))
-            if cursor.fetchone() is None:
+        with get_repository().transaction() as tx:
+            if not tx.student_exists(student_id):
                 raise HTTPException(status_code=404, detail="Student not found")
 
-            cursor.execute("DELETE FROM students WHERE id=?", (student_id,))
+            tx.delete_student(student_id)
 
 
 class ExamRoomService:
     @staticmethod
     def get_all_exam_rooms() -> List[ExamRoomResponseModel]:
-        with get_db_cursor() as cursor:
-            cursor.execute("SELECT * FROM examRooms")
-            exam_rooms = cursor.fetchall()
-            return [
-                ExamRoomResponseModel(
-                    id=row[0],
-                    roomNumber=row[1],
-                    roomCapacity=row[2],
-                    roomFloor=row[3],
-                    roomBuilding=row[4],
-                )
-                for row in exam_rooms
-            ]
+        return [
+            ExamRoomResponseModel(
+                id=row[0],
+                roomNumber=row[1],
+                roomCapacity=row[2],
+                roomFloor=row[3],
+                roomBuilding=row[4],
+                roomRows=row[5],
+                benchesPerRow=row[6],
+                seatsPerBench=row[7],
+            )
+            for row in get_repository().list_exam_rooms()
+        ]
 
     @staticmethod
-    def create_exam_room(room_data: ExamRoomModel) -> None:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                """
-                INSERT INTO examRooms (roomNumber, roomCapacity, roomFloor, roomBuilding)
-                VALUES (?, ?, ?, ?)
-            """,
-                (
-                    room_data.roomNumber,
-                    room_data.roomCapacity,
-                    room_data.roomFloor,
-                    room_data.roomBuilding,
-                ),
+    def _room_values(room_data: ExamRoomModel) -> tuple:
+        return (
+            room_data.roomNumber,
+            room_data.roomCapacity,
+            room_data.roomFloor,
+            room_data.roomBuilding,
+            room_data.roomRows,
+            room_data.benchesPerRow,
+            room_data.seatsPerBench,
+        )
+
+    @staticmethod
+    def _validate_layout(room_data: ExamRoomModel) -> None:
+        layout = (room_data.roomRows, room_data.benchesPerRow, room_data.seatsPerBench)
+        if all(value is None for value in layout):
+            return
+        if any(value is None or value <= 0 for value in layout):
+            raise HTTPException(
+                status_code=400,
+                detail="Seat layout requires positive roomRows, benchesPerRow and seatsPerBench",
             )
 
     @staticmethod
+    @writes_tables("examRooms")
+    def create_exam_room(room_data: ExamRoomModel) -> None:
+        ExamRoomService._validate_layout(room_data)
+
+        with get_repository().transaction() as tx:
+            tx.create_room(ExamRoomService._room_values(room_data))
+
+    @staticmethod
+    @writes_tables("examRooms")
     def update_exam_room(room_id: int, room_data: ExamRoomModel) -> None:
-        with get_db_cursor() as cursor:
-            cursor.execute("SELECT * FROM examRooms WHERE id=?", (room_id,))
-            if cursor.fetchone() is None:
+        ExamRoomService._validate_layout(room_data)
+
+        with get_repository().transaction() as tx:
+            if not tx.room_exists(room_id):
                 raise HTTPException(status_code=404, detail="Exam room not found")
 
-            cursor.execute(
-                """
-                UPDATE examRooms 
-                SET roomNumber=?, roomCapacity=?, roomFloor=?, roomBuilding=?
-                WHERE id=?
-            """,
-                (
-                    room_data.roomNumber,
-                    room_data.roomCapacity,
-                    room_data.roomFloor,
-                    room_data.roomBuilding,
-                    room_id,
-                ),
-            )
+            tx.update_room(room_id, ExamRoomService._room_values(room_data))
 
     @staticmethod
+    @writes_tables("examRooms")
     def delete_exam_room(room_id: int) -> None:
-        with get_db_cursor() as cursor:
-            cursor.execute("SELECT * FROM examRooms WHERE id=?", (room_id,))
-            if cursor.fetchone() is None:
+        with get_repository().transaction() as tx:
+            if not tx.room_exists(room_id):
                 raise HTTPException(status_code=404, detail="Exam room not found")
 
-            cursor.execute("DELETE FROM examRooms WHERE id=?", (room_id,))
+            tx.delete_room(room_id)
 
 
 class ScheduleService:
+    # "standard": indexed first-fit placement
+    # "vectorized": NumPy array planner for large what-if runs
+    SCHEDULE_MODES = ("standard", "vectorized", "optimized")
+
+    @staticmethod
+    def validate_request(data: ScheduleRequest) -> None:
+        if data.mode not in ScheduleService.SCHEDULE_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid schedule mode '{data.mode}'. Must be one of: {', '.join(ScheduleService.SCHEDULE_MODES)}",
+            )
+        if data.time_budget_ms is not None and data.time_budget_ms < 0:
+            raise HTTPException(status_code=400, detail="time_budget_ms cannot be negative")
+
     @staticmethod
     def schedule_exam(data: ScheduleRequest) -> Dict[str, any]:
-        max_students_per_class = settings.MAX_STUDENTS_PER_CLASS_PER_ROOM
+        ScheduleService.validate_request(data)
 
-        with get_db_cursor() as cursor:
-            # Fetch class information including shift
-            class_info = {}
-            for class_id in data.classes:
-                cursor.execute(
-                    "SELECT className, shift FROM classes WHERE id = ?", (class_id,)
-                )
-                class_result = cursor.fetchone()
-                if class_result:
-                    class_name, shift = class_result
-                    # Create display name with shift for PDF
-                    display_name = f"{class_name} - {shift}" if shift else class_name
-                    class_info[class_id] = {
-                        "name": class_name,
-                        "shift": shift,
-                        "display_name": display_name,
-                    }
-
-            # Fetch students for selected classes
-            students_by_class = {}
-            all_students = []
-
-            for class_id in data.classes:
-                if class_id in class_info:
-                    # Check if language selections are specified for this class
-                    selected_languages = None
-                    if (
-                        hasattr(data, "language_selections")
-                        and data.language_selections
-                        and class_id in data.language_selections
-                    ):
-                        selected_languages = data.language_selections[class_id]
-                        # If empty array is provided, treat as no filtering (include all students)
-                        if (
-                            isinstance(selected_languages, list)
-                            and len(selected_languages) == 0
-                        ):
-                            selected_languages = None
-                    # If class is not in language_selections dict, no filtering is applied (selected_languages remains None)
-
-                    cursor.execute(
-                        "SELECT rollNumber, studentName, language FROM students WHERE classId = ? ORDER BY rollNumber",
-                        (class_id,),
-                    )
-                    student_results = cursor.fetchall()
-
-                    class_students = []
-                    for row in student_results:
-                        roll_number = row[0]
-                        student_name = row[1] if len(row) > 1 else None
-                        language = row[2] if len(row) > 2 else None
-
-                        # Filter by language if specified
-                        if selected_languages:
-                            if language and language not in selected_languages:
-                                continue  # Skip students with non-matching languages
-                            if not language and None not in selected_languages:
-                                continue  # Skip students without language if not explicitly included
-
-                        student_data = {
-                            "rollNumber": roll_number,
-                            "studentName": student_name,
-                            "language": language,
-                            "classId": class_id,
-                            "className": class_info[class_id]["display_name"],
-                        }
-                        class_students.append(student_data)
+        # Repeat requests against unchanged data are answered from the cache
+        cache_key, cached = ScheduleCache.get(data)
+        if cached is not None:
+            return {**cached, "cache": {"status": "hit", **ScheduleCache.stats()}}
 
-                    students_by_class[class_id] = class_students
-                    # Add to all_students list with new format
-                    all_students.extend(class_students)
+        with get_repository().schedule_loader() as loader:
+            # Fetch classes, language-filtered students and rooms in a fixed number of queries
+            loaded = loader.load(data)
 
-            # Sort all students by roll number
-            all_students.sort(key=lambda x: x["rollNumber"])
+        result = ScheduleService.plan_schedule(data, loaded)
+        ScheduleCache.put(cache_key, result)
 
-            # Fetch room details
-            rooms = []
-            for room_id in data.exam_rooms:
-                cursor.execute(
-                    "SELECT roomNumber, roomCapacity FROM examRooms WHERE id = ?",
-                    (room_id,),
-                )
-                result = cursor.fetchone()
-                if result:
-                    rooms.append(
-                        {
-                            "roomNumber": result[0],
-                            "capacity": result[1],
-                            "students": [],
-                            "class_counts": {},
-                            "class_info": {},  # Store class information for each room
-                        }
-                    )
+        return {**result, "cache": {"status": "miss", **ScheduleCache.stats()}}
 
-            # Calculate total capacity
-            total_capacity = sum(room["capacity"] for room in rooms)
-            if total_capacity < len(all_students):
-                raise HTTPException(
-                    status_code=400,
-                    detail="Not enough capacity in selected rooms for all students",
-                )
+    @staticmethod
+    async def schedule_batch(sessions: List[ScheduleRequest]) -> Dict[str, any]:
+        """Schedule several sessions sharing one data load, planning them in parallel"""
+        for data in sessions:
+            ScheduleService.validate_request(data)
 
-            # Place students in rooms with class information
-            ScheduleService._place_students_in_rooms_with_student_info(
-                all_students, rooms, data.split, max_students_per_class
-            )
+        from .schedule_batch import BatchScheduler
 
-            # Build response with class and language information
-            seating_arrangement = {}
-            class_summary = {}
-            language_summary = {}
-
-            for room in rooms:
-                # Students already have complete information including language
-                seating_arrangement[room["roomNumber"]] = room["students"]
-
-                # Create class summary for this room
-                class_summary[room["roomNumber"]] = room.get("class_info", {})
-
-                # Create language summary for this room
-                room_language_summary = {}
-                for student in room["students"]:
-                    language = student.get("language")
-                    # Handle None or empty language values
-                    if not language:
-                        language = "No Language"
-                    if language not in room_language_summary:
-                        room_language_summary[language] = 0
-                    room_language_summary[language] += 1
-                language_summary[room["roomNumber"]] = room_language_summary
-
-            return {
-                "date": data.date,
-                "seating_arrangement": seating_arrangement,
-                "class_summary": class_summary,
-                "class_info": class_info,
-                "language_summary": language_summary,
-            }
+        return await BatchScheduler.run(sessions)
 
     @staticmethod
-    def _place_students_in_rooms_with_student_info(
-        all_students: List[Dict], rooms: List[Dict], split: bool, max_per_class: int
-    ):
-        """Place students in rooms with class distribution logic and include student information"""
-        if split and len(rooms) > 1:
-            # Place students in rooms with class distribution
-            for student_data in all_students:
-                placed = False
-                class_id = student_data["classId"]
+    def stream_schedule(data: ScheduleRequest) -> Iterator[bytes]:
+        """Schedule exam seating as NDJSON lines, one per room followed by a summary"""
+        ScheduleService.validate_request(data)
 
-                # First try rooms where this class has fewer than max students
-                for room in rooms:
-                    class_count = room["class_counts"].get(class_id, 0)
-                    if (
-                        len(room["students"]) < room["capacity"]
-                        and class_count < max_per_class
-                    ):
-                        # Add student with complete information
-                        room["students"].append(student_data)
-                        room["class_counts"][class_id] = class_count + 1
+        from .schedule_stream import ScheduleStreamer
 
-                        # Update class info for the room
-                        class_display_name = student_data["className"]
-                        if class_display_name not in room["class_info"]:
-                            room["class_info"][class_display_name] = 0
-                        room["class_info"][class_display_name] += 1
+        return ScheduleStreamer.open(data)
 
-                        placed = True
-                        break
+    @staticmethod
+    def plan_schedule(
+        data: ScheduleRequest, loaded: Dict, timings: Optional[Dict[str, float]] = None
+    ) -> Dict[str, any]:
+        """Seat the loaded students in the loaded rooms and build the schedule response
+
+        Works only on the loaded data (no database access), so sessions can be
+        planned in worker processes. If a timings dict is given, the duration of
+        each stage (sort_ms, place_ms, summarise_ms) is written into it.
+        """
+        optimization = ScheduleService.place_students(data, loaded, timings)
+        placed_at = time.perf_counter()
+
+        # Build response with class and language information
+        seating_arrangement = {}
+        class_summary = {}
+        language_summary = {}
+        room_layouts = {}
+
+        for room in loaded["rooms"]:
+            finalised = ScheduleService.finalise_room(room)
+
+            # Students already have complete information including language and seat
+            seating_arrangement[room["roomNumber"]] = room["students"]
+            class_summary[room["roomNumber"]] = finalised["class_summary"]
+            language_summary[room["roomNumber"]] = finalised["language_summary"]
+            room_layouts[room["roomNumber"]] = finalised["layout"]
+
+        if timings is not None:
+            timings["summarise_ms"] = round((time.perf_counter() - placed_at) * 1000, 3)
+
+        return {
+            "date": data.date,
+            "seating_arrangement": seating_arrangement,
+            "class_summary": class_summary,
+            "class_info": loaded["class_info"],
+            "language_summary": language_summary,
+            "room_layouts": room_layouts,
+            "load_stats": loaded.get("load_stats"),
+            "optimization": optimization,
+        }
 
-                # If no room has space under the class limit, try any room with capacity
-                if not placed:
-                    for room in rooms:
-                        if len(room["students"]) < room["capacity"]:
-                            room["students"].append(student_data)
-                            class_count = room["class_counts"].get(class_id, 0)
-                            room["class_counts"][class_id] = class_count + 1
+    @staticmethod
+    def place_students(
+        data: ScheduleRequest, loaded: Dict, timings: Optional[Dict[str, float]] = None
+    ) -> Optional[Dict]:
+        """Distribute the loaded students over the loaded rooms with the requested planner
 
-                            # Update class info for the room
-                            class_display_name = student_data["className"]
-                            if class_display_name not in room["class_info"]:
-                                room["class_info"][class_display_name] = 0
-                            room["class_info"][class_display_name] += 1
+        Returns the optimizer stats for the "optimized" mode, otherwise None.
+        """
+        max_students_per_class = settings.MAX_STUDENTS_PER_CLASS_PER_ROOM
+        all_students = loaded["students"]
+        rooms = loaded["rooms"]
 
-                            placed = True
-                            break
+        # Calculate total capacity
+        total_capacity = sum(room["capacity"] for room in rooms)
+        if total_capacity < len(all_students):
+            raise HTTPException(
+                status_code=400,
+                detail="Not enough capacity in selected rooms for all students",
+            )
 
-                if not placed:
-                    raise HTTPException(
-                        status_code=500,
-                        detail="Failed to place all students despite sufficient capacity",
-                    )
+        optimization = None
+        started = time.perf_counter()
+        if data.mode == "optimized":
+            # Fewest rooms, then fewest buildings, within the time budget
+            time_budget_ms = data.time_budget_ms
+            if time_budget_ms is None:
+                time_budget_ms = settings.OPTIMIZATION_TIME_BUDGET_MS
+            optimization = RoomOptimizer(rooms, max_students_per_class, time_budget_ms).place(all_students)
+            # Sorting happens inside the optimizer and is counted as placement
+            sorted_at = started
+        elif data.mode == "vectorized":
+            # Sorts by roll number and fills rooms with array operations
+            VectorizedPlanner.place(all_students, rooms, max_students_per_class)
+            # Sorting happens inside the planner and is counted as placement
+            sorted_at = started
         else:
-            # For non-split option, still respect the class size limit if possible
-            for student_data in all_students:
-                placed = False
-                class_id = student_data["classId"]
+            # Sort all students by roll number
+            all_students.sort(key=lambda x: x["rollNumber"])
+            sorted_at = time.perf_counter()
 
-                # Try to place in a room where the class has fewer than max students
-                for room in rooms:
-                    if len(room["students"]) < room["capacity"]:
-                        class_count = room["class_counts"].get(class_id, 0)
-                        if class_count < max_per_class:
-                            room["students"].append(student_data)
-                            room["class_counts"][class_id] = class_count + 1
+            # Place students in rooms with class information
+            ScheduleService._place_students_in_rooms_with_student_info(
+                all_students, rooms, data.split, max_students_per_class
+            )
 
-                            # Update class info for the room
-                            class_display_name = student_data["className"]
-                            if class_display_name not in room["class_info"]:
-                                room["class_info"][class_display_name] = 0
-                            room["class_info"][class_display_name] += 1
+        if timings is not None:
+            timings["sort_ms"] = round((sorted_at - started) * 1000, 3)
+            timings["place_ms"] = round((time.perf_counter() - sorted_at) * 1000, 3)
 
-                            placed = True
-                            break
+        return optimization
 
-                # If no room has space under the class limit, try any room with capacity
-                if not placed:
-                    for room in rooms:
-                        if len(room["students"]) < room["capacity"]:
-                            room["students"].append(student_data)
-                            class_count = room["class_counts"].get(class_id, 0)
-                            room["class_counts"][class_id] = class_count + 1
-
-                            # Update class info for the room
-                            class_display_name = student_data["className"]
-                            if class_display_name not in room["class_info"]:
-                                room["class_info"][class_display_name] = 0
-                            room["class_info"][class_display_name] += 1
-
-                            placed = True
-                            break
+    @staticmethod
+    def finalise_room(room: Dict) -> Dict:
+        """Seat a placed room's students on its grid and summarise it by class and language"""
+        # Give every student a seat on the room grid, keeping classes apart
+        layout = SeatLayoutEngine.assign_seats(room)
+
+        # Create language summary for this room, unless the planner already counted it
+        room_language_summary = room.get("language_summary")
+        if room_language_summary is None:
+            room_language_summary = {}
+            for student in room["students"]:
+                language = student.get("language")
+                # Handle None or empty language values
+                if not language:
+                    language = "No Language"
+                if language not in room_language_summary:
+                    room_language_summary[language] = 0
+                room_language_summary[language] += 1
+
+        return {
+            "layout": layout,
+            "class_summary": room.get("class_info", {}),
+            "language_summary": room_language_summary,
+        }
 
-                if not placed:
-                    raise HTTPException(
-                        status_code=500,
-                        detail="Failed to place all students despite sufficient capacity",
-                    )
+    @staticmethod
+    def _place_students_in_rooms_with_student_info(
+        all_students: List[Dict], rooms: List[Dict], split: bool, max_per_class: int
+    ):
+        """Place students in rooms with class distribution logic and include student information
+
+        Split and non-split requests share the same first-fit rule: the first room
+        with a free seat where the class is under the limit, otherwise the first
+        room with any free seat. PlacementEngine indexes the rooms so each student
+        is placed without rescanning every room.
+        """
+        PlacementEngine(rooms, max_per_class).place_all(all_students)
 
     @staticmethod
     def _place_students_in_rooms(
@@ -0,0 +1,525 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from .data_version import DataVersion
+from .database import get_db_cursor, init_database
+from .import_writer import StudentImportWriter
+from .read_model import ReadModel
+from .repository import (
+    DuplicateKeyError,
+    Repository,
+    RoomValues,
+    ScheduleRoomRow,
+    ScheduleRoomValues,
+    ScheduleSeatRow,
+    ScheduleSeatValues,
+    StorageTransaction,
+    StudentRow,
+    UserRow,
+)
+from .student_search import fts_query, tokenize
+
+# scheduleRooms columns in ScheduleRoomRow order
+SCHEDULE_ROOM_COLUMNS = "id, position, roomId, roomNumber, capacity, seatRows, benchesPerRow, seatsPerBench, seated"
+# scheduleSeats columns in ScheduleSeatRow order
+SCHEDULE_SEAT_COLUMNS = (
+    "id, scheduleRoomId, classId, className, rollNumber, studentName, language, seatRow, seatBench, seatNumber"
+)
+
+
+class SqliteTransaction(StorageTransaction):
+    """Writes to students record the classes they change (DataVersion.record), for ReadModel patching"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def _exists(self, table: str, row_id: int) -> bool:
+        self.cursor.execute(f"SELECT 1 FROM {table} WHERE id = ?", (row_id,))
+        return self.cursor.fetchone() is not None
+
+    def class_exists(self, class_id: int) -> bool:
+        return self._exists("classes", class_id)
+
+    def find_class_id(self, class_name: str, shift: Optional[str] = None) -> Optional[int]:
+        if shift is None:
+            self.cursor.execute("SELECT id FROM classes WHERE className = ?", (class_name,))
+        else:
+            self.cursor.execute("SELECT id FROM classes WHERE className = ? AND shift = ?", (class_name, shift))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    def create_class(self, class_name: str, shift: Optional[str]) -> int:
+        self.cursor.execute("INSERT INTO classes (className, shift) VALUES (?, ?)", (class_name, shift))
+        return self.cursor.lastrowid
+
+    def update_class(self, class_id: int, class_name: str, shift: Optional[str]) -> None:
+        self.cursor.execute("UPDATE classes SET className=?, shift=? WHERE id=?", (class_name, shift, class_id))
+
+    def delete_class(self, class_id: int) -> None:
+        # Delete students first (due to foreign key constraint)
+        self.cursor.execute("DELETE FROM students WHERE classId=?", (class_id,))
+        DataVersion.record("students", class_id)
+        self.cursor.execute("DELETE FROM classes WHERE id=?", (class_id,))
+
+    def student_exists(self, student_id: int) -> bool:
+        return self._exists("students", student_id)
+
+    def count_students(self, class_id: int) -> int:
+        self.cursor.execute("SELECT COUNT(*) FROM students WHERE classId=?", (class_id,))
+        return self.cursor.fetchone()[0]
+
+    def create_student(self, class_id: int, row: StudentRow) -> int:
+        try:
+            self.cursor.execute(
+                """
+                INSERT INTO students (rollNumber, studentName, language, dateOfBirth, classId)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (*row, class_id),
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(str(e))
+        DataVersion.record("students", class_id)
+        return self.cursor.lastrowid
+
+    def delete_student(self, student_id: int) -> None:
+        self.cursor.execute("SELECT classId FROM students WHERE id=?", (student_id,))
+        DataVersion.record("students", *(class_id for class_id, in self.cursor.fetchall()))
+        self.cursor.execute("DELETE FROM students WHERE id=?", (student_id,))
+
+    def replace_students(
+        self, rows_by_class: Dict[int, List[StudentRow]]
+    ) -> Tuple[Dict[int, Dict[str, int]], Dict[int, List[str]]]:
+        writer = StudentImportWriter(self.cursor)
+        DataVersion.record("students", *rows_by_class)
+        for class_id, rows in rows_by_class.items():
+            writer.stage(class_id, rows)
+        skipped = {class_id: writer.skipped(class_id) for class_id in rows_by_class}
+        return writer.apply(), skipped
+
+    def room_exists(self, room_id: int) -> bool:
+        return self._exists("examRooms", room_id)
+
+    def find_room_id(self, room_number: str) -> Optional[int]:
+        self.cursor.execute("SELECT id FROM examRooms WHERE roomNumber = ?", (room_number,))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    def create_room(self, values: RoomValues) -> int:
+        self.cursor.execute(
+            """
+            INSERT INTO examRooms (roomNumber, roomCapacity, roomFloor, roomBuilding,
+                                   roomRows, benchesPerRow, seatsPerBench)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+            values,
+        )
+        return self.cursor.lastrowid
+
+    def update_room(self, room_id: int, values: RoomValues) -> None:
+        self.cursor.execute(
+            """
+            UPDATE examRooms
+            SET roomNumber=?, roomCapacity=?, roomFloor=?, roomBuilding=?,
+                roomRows=?, benchesPerRow=?, seatsPerBench=?
+            WHERE id=?
+        """,
+            (*values, room_id),
+        )
+
+    def delete_room(self, room_id: int) -> None:
+        self.cursor.execute("DELETE FROM examRooms WHERE id=?", (room_id,))
+
+    def get_username(self, user_id: int) -> Optional[str]:
+        self.cursor.execute("SELECT username FROM users WHERE id = ?", (user_id,))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    def create_user(self, username: str, password: str, name: str) -> int:
+        try:
+            self.cursor.execute(
+                "INSERT INTO users (username, password, name) VALUES (?, ?, ?)",
+                (username, password, name),
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(str(e))
+        return self.cursor.lastrowid
+
+    def delete_user(self, user_id: int) -> None:
+        self.cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+
+    def revoke_token(self, token_id: str, expires_at: int) -> None:
+        self.cursor.execute("DELETE FROM revokedTokens WHERE expiresAt <= ?", (int(time.time()),))
+        self.cursor.execute(
+            "INSERT OR IGNORE INTO revokedTokens (tokenId, expiresAt) VALUES (?, ?)", (token_id, expires_at)
+        )
+
+    def get_class(self, class_id: int) -> Optional[Tuple[str, Optional[str]]]:
+        self.cursor.execute("SELECT className, shift FROM classes WHERE id = ?", (class_id,))
+        return self.cursor.fetchone()
+
+    def get_student(self, class_id: int, roll_number: str) -> Optional[StudentRow]:
+        self.cursor.execute(
+            "SELECT rollNumber, studentName, language, dateOfBirth FROM students WHERE classId = ? AND rollNumber = ?",
+            (class_id, roll_number),
+        )
+        return self.cursor.fetchone()
+
+    def get_room(self, room_id: int) -> Optional[RoomValues]:
+        self.cursor.execute(
+            """
+            SELECT roomNumber, roomCapacity, roomFloor, roomBuilding, roomRows, benchesPerRow, seatsPerBench
+            FROM examRooms WHERE id = ?
+        """,
+            (room_id,),
+        )
+        return self.cursor.fetchone()
+
+    def get_schedule(self, schedule_id: int) -> Optional[Tuple[str, str]]:
+        self.cursor.execute("SELECT request, classInfo FROM schedules WHERE id = ?", (schedule_id,))
+        return self.cursor.fetchone()
+
+    def create_schedule(self, date: str, request: str, class_info: str) -> int:
+        self.cursor.execute(
+            "INSERT INTO schedules (date, request, classInfo) VALUES (?, ?, ?)", (date, request, class_info)
+        )
+        return self.cursor.lastrowid
+
+    def update_schedule(self, schedule_id: int, request: str, class_info: str) -> None:
+        self.cursor.execute(
+            "UPDATE schedules SET request = ?, classInfo = ?, updatedAt = CURRENT_TIMESTAMP WHERE id = ?",
+            (request, class_info, schedule_id),
+        )
+
+    def delete_schedule(self, schedule_id: int) -> None:
+        # Rooms and seats go with it (ON DELETE CASCADE)
+        self.cursor.execute("DELETE FROM schedules WHERE id = ?", (schedule_id,))
+
+    def schedule_rooms(self, schedule_id: int, room_id: Optional[int] = None) -> List[ScheduleRoomRow]:
+        room_filter = "AND roomId = ?" if room_id is not None else ""
+        self.cursor.execute(
+            f"""
+            SELECT {SCHEDULE_ROOM_COLUMNS}
+            FROM scheduleRooms WHERE scheduleId = ? {room_filter} ORDER BY position
+        """,
+            (schedule_id,) if room_id is None else (schedule_id, room_id),
+        )
+        return self.cursor.fetchall()
+
+    def schedule_room(self, schedule_room_id: int) -> Optional[ScheduleRoomRow]:
+        self.cursor.execute(f"SELECT {SCHEDULE_ROOM_COLUMNS} FROM scheduleRooms WHERE id = ?", (schedule_room_id,))
+        return self.cursor.fetchone()
+
+    def first_open_room(self, schedule_id: int, exclude: List[int]) -> Optional[ScheduleRoomRow]:
+        # "seated < capacity" as written in idx_scheduleRooms_open, so the partial index serves it
+        exclude_filter = f"AND id NOT IN ({', '.join('?' for _ in exclude)})" if exclude else ""
+        self.cursor.execute(
+            f"""
+            SELECT {SCHEDULE_ROOM_COLUMNS}
+            FROM scheduleRooms WHERE scheduleId = ? AND seated < capacity {exclude_filter}
+            ORDER BY position LIMIT 1
+        """,
+            (schedule_id, *exclude),
+        )
+        return self.cursor.fetchone()
+
+    def last_room_position(self, schedule_id: int) -> Optional[int]:
+        self.cursor.execute("SELECT MAX(position) FROM scheduleRooms WHERE scheduleId = ?", (schedule_id,))
+        return self.cursor.fetchone()[0]
+
+    def create_schedule_room(self, schedule_id: int, values: ScheduleRoomValues) -> int:
+        self.cursor.execute(
+            """
+            INSERT INTO scheduleRooms (scheduleId, position, roomId, roomNumber, capacity,
+                                       seatRows, benchesPerRow, seatsPerBench, seated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+            (schedule_id, *values),
+        )
+        return self.cursor.lastrowid
+
+    def update_schedule_room(self, schedule_room_id: int, seat_rows: int, seated: int) -> None:
+        self.cursor.execute(
+            "UPDATE scheduleRooms SET seatRows = ?, seated = ? WHERE id = ?", (seat_rows, seated, schedule_room_id)
+        )
+
+    def delete_schedule_room(self, schedule_room_id: int) -> None:
+        self.cursor.execute("DELETE FROM scheduleRooms WHERE id = ?", (schedule_room_id,))
+
+    def add_schedule_seats(self, schedule_id: int, seats: List[ScheduleSeatValues]) -> None:
+        try:
+            self.cursor.executemany(
+                """
+                INSERT INTO scheduleSeats (scheduleId, scheduleRoomId, classId, className, rollNumber,
+                                           studentName, language, seatRow, seatBench, seatNumber)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                [(schedule_id, *seat) for seat in seats],
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(str(e))
+
+    def schedule_seat(self, schedule_id: int, class_id: int, roll_number: str) -> Optional[ScheduleSeatRow]:
+        self.cursor.execute(
+            f"SELECT {SCHEDULE_SEAT_COLUMNS} FROM scheduleSeats WHERE scheduleId = ? AND classId = ? AND rollNumber = ?",
+            (schedule_id, class_id, roll_number),
+        )
+        return self.cursor.fetchone()
+
+    def room_seats(self, schedule_room_id: int) -> List[ScheduleSeatRow]:
+        self.cursor.execute(
+            f"SELECT {SCHEDULE_SEAT_COLUMNS} FROM scheduleSeats WHERE scheduleRoomId = ? ORDER BY rollNumber, id",
+            (schedule_room_id,),
+        )
+        return self.cursor.fetchall()
+
+    def delete_schedule_seats(self, seat_ids: List[int]) -> None:
+        self.cursor.executemany("DELETE FROM scheduleSeats WHERE id = ?", [(seat_id,) for seat_id in seat_ids])
+
+    def class_seats_by_room(self, schedule_id: int, class_id: int) -> Dict[int, int]:
+        self.cursor.execute(
+            """
+            SELECT scheduleRoomId, COUNT(*) FROM scheduleSeats
+            WHERE scheduleId = ? AND classId = ? GROUP BY scheduleRoomId
+        """,
+            (schedule_id, class_id),
+        )
+        return dict(self.cursor.fetchall())
+
+    def seated_roll_numbers(self, schedule_id: int, class_id: int) -> List[str]:
+        self.cursor.execute(
+            "SELECT rollNumber FROM scheduleSeats WHERE scheduleId = ? AND classId = ?", (schedule_id, class_id)
+        )
+        return [row[0] for row in self.cursor.fetchall()]
+
+
+class SqliteRepository(Repository):
+    """The SQLite database at DATABASE_PATH, with reads served by the ReadModel when it is enabled"""
+
+    name = "sqlite"
+
+    def __init__(self):
+        init_database()
+        with get_db_cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'studentSearch'")
+            # No FTS5 in this SQLite build: migration 5 left the index out
+            self.full_text_search = cursor.fetchone() is not None
+
+    @contextmanager
+    def transaction(self) -> Iterator[SqliteTransaction]:
+        with get_db_cursor() as cursor:
+            yield SqliteTransaction(cursor)
+
+    def list_classes(
+        self, limit: Optional[int], after: Optional[int], include_students: bool, fields: List[str]
+    ) -> Dict[str, any]:
+        if ReadModel.enabled():
+            return ReadModel.snapshot().list_classes(limit, after, include_students, fields)
+
+        params: List = []
+        page_filter = ""
+        if after is not None:
+            page_filter = "WHERE id > ?"
+            params.append(after)
+        page_limit = ""
+        if limit is not None:
+            # One extra class tells whether there is a next page; its students are not joined
+            page_limit = "LIMIT ?"
+            params.append(limit + 1)
+
+        page = f"""
+            WITH page AS (
+                SELECT id, className, shift, ROW_NUMBER() OVER (ORDER BY id) AS position
+                FROM classes {page_filter}
+                ORDER BY id {page_limit}
+            )
+        """
+        if include_students:
+            student_join = "AND page.position <= ?" if limit is not None else ""
+            if limit is not None:
+                params.append(limit)
+            query = f"""
+                {page}
+                SELECT page.id, page.className, page.shift, page.position, s.id,
+                       {", ".join(f"s.{field}" for field in fields)}
+                FROM page
+                LEFT JOIN students s ON s.classId = page.id {student_join}
+                ORDER BY page.id, s.id
+            """
+        else:
+            query = f"{page} SELECT id, className, shift, position FROM page ORDER BY id"
+
+        with get_db_cursor() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+
+        classes = []
+        next_after = None
+        for row in rows:
+            class_id, class_name, shift, position = row[:4]
+            if limit is not None and position > limit:
+                next_after = classes[-1]["id"]
+                break
+
+            if not classes or classes[-1]["id"] != class_id:
+                class_data = {"id": class_id, "className": class_name, "shift": shift}
+                if include_students:
+                    class_data["students"] = []
+                classes.append(class_data)
+
+            # Classes without students come back as a single row with no student
+            if include_students and row[4] is not None:
+                classes[-1]["students"].append(dict(zip(fields, row[5:])))
+
+        return {"classes": classes, "next_after": next_after}
+
+    def students_of_class(self, class_id: int) -> List[Dict]:
+        if ReadModel.enabled():
+            return ReadModel.snapshot().students_of_class(class_id)
+
+        with get_db_cursor() as cursor:
+            cursor.execute(
+                "SELECT id, rollNumber, studentName, classId, language, dateOfBirth FROM students WHERE classId = ? ORDER BY id",
+                (class_id,),
+            )
+            return [
+                {
+                    "id": student_id,
+                    "rollNumber": roll_number,
+                    "studentName": name,
+                    "classId": student_class_id,
+                    "language": language,
+                    "dateOfBirth": date_of_birth,
+                }
+                for student_id, roll_number, name, student_class_id, language, date_of_birth in cursor.fetchall()
+            ]
+
+    def list_exam_rooms(self) -> List[Tuple]:
+        if ReadModel.enabled():
+            return ReadModel.snapshot().exam_rooms()
+
+        with get_db_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT id, roomNumber, roomCapacity, roomFloor, roomBuilding,
+                       roomRows, benchesPerRow, seatsPerBench
+                FROM examRooms
+            """
+            )
+            return cursor.fetchall()
+
+    def search_students(self, query: str, limit: int, offset: int, class_id: Optional[int]) -> Dict[str, any]:
+        columns = """
+            s.id, s.rollNumber, s.studentName, s.language, s.dateOfBirth, s.classId, c.className, c.shift
+        """
+        class_filter = "AND s.classId = ?" if class_id is not None else ""
+        class_params = [class_id] if class_id is not None else []
+
+        if self.full_text_search:
+            match = fts_query(query)
+            if match is None:
+                return {"students": [], "next_offset": None}
+            sql = f"""
+                SELECT {columns}
+                FROM studentSearch
+                JOIN students s ON s.id = studentSearch.rowid
+                JOIN classes c ON c.id = s.classId
+                WHERE studentSearch MATCH ? {class_filter}
+                ORDER BY studentSearch.rowid
+                LIMIT ? OFFSET ?
+            """
+            params = [match, *class_params]
+        else:
+            # Without FTS5: a scan of all students, matching words anywhere rather than as prefixes
+            words = tokenize(query)
+            if not words:
+                return {"students": [], "next_offset": None}
+            word_filter = " AND ".join(
+                "(s.rollNumber LIKE ? OR s.studentName LIKE ? OR c.className LIKE ?)" for _ in words
+            )
+            sql = f"""
+                SELECT {columns}
+                FROM students s JOIN classes c ON c.id = s.classId
+                WHERE {word_filter} {class_filter}
+                ORDER BY s.id
+                LIMIT ? OFFSET ?
+            """
+            params = [f"%{word}%" for word in words for _ in range(3)] + class_params
+
+        with get_db_cursor() as cursor:
+            # One extra row tells whether there is a next page
+            cursor.execute(sql, (*params, limit + 1, offset))
+            rows = cursor.fetchall()
+
+        students = [
+            {
+                "id": student_id,
+                "rollNumber": roll_number,
+                "studentName": name,
+                "language": language,
+                "dateOfBirth": date_of_birth,
+                "classId": student_class_id,
+                "className": class_name,
+                "shift": shift,
+            }
+            for student_id, roll_number, name, language, date_of_birth, student_class_id, class_name, shift in rows[:limit]
+        ]
+        return {"students": students, "next_offset": offset + limit if len(rows) > limit else None}
+
+    def schedule_loader(self):
+        return ReadModel.schedule_loader()
+
+    def authenticate_user(self, username: str, password: str) -> Optional[UserRow]:
+        with get_db_cursor() as cursor:
+            cursor.execute(
+                "SELECT id, username, name, created_at FROM users WHERE username = ? AND password = ?",
+                (username, password),
+            )
+            return cursor.fetchone()
+
+    def list_users(self) -> List[UserRow]:
+        with get_db_cursor() as cursor:
+            cursor.execute(
+                "SELECT id, username, name, created_at FROM users WHERE username != 'admin' ORDER BY created_at DESC, id DESC"
+            )
+            return cursor.fetchall()
+
+    def token_revoked(self, token_id: str, user_id: int) -> bool:
+        with get_db_cursor() as cursor:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM revokedTokens WHERE tokenId = ?)"
+                " OR NOT EXISTS (SELECT 1 FROM users WHERE id = ?)",
+                (token_id, user_id),
+            )
+            return bool(cursor.fetchone()[0])
+
+    def list_schedules(self) -> List[Tuple]:
+        with get_db_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT s.id, s.date, s.createdAt, s.updatedAt,
+                       (SELECT COUNT(*) FROM scheduleRooms r WHERE r.scheduleId = s.id),
+                       (SELECT COALESCE(SUM(r.seated), 0) FROM scheduleRooms r WHERE r.scheduleId = s.id)
+                FROM schedules s
+                ORDER BY s.id DESC
+            """
+            )
+            return cursor.fetchall()
+
+    def load_schedule(
+        self, schedule_id: int
+    ) -> Optional[Tuple[Tuple[str, str, str, str], List[ScheduleRoomRow], List[ScheduleSeatRow]]]:
+        with get_db_cursor() as cursor:
+            cursor.execute(
+                "SELECT date, classInfo, createdAt, updatedAt FROM schedules WHERE id = ?", (schedule_id,)
+            )
+            schedule = cursor.fetchone()
+            if schedule is None:
+                return None
+            rooms = SqliteTransaction(cursor).schedule_rooms(schedule_id)
+            cursor.execute(
+                f"SELECT {SCHEDULE_SEAT_COLUMNS} FROM scheduleSeats WHERE scheduleId = ? ORDER BY rollNumber, id",
+                (schedule_id,),
+            )
+            return schedule, rooms, cursor.fetchall()
@@ -0,0 +1,82 @@
+"""
+Student search by roll number, student name and class name.
+
+A query matches students having, for every word of the query, a word
+starting with it (prefix matching, case and accent insensitive). The SQLite
+backend answers from the studentSearch FTS5 table kept current by triggers
+(migration 5); the memory backend from a StudentSearchIndex built from its
+read snapshot. Words are split the way FTS5's unicode61 tokenizer does.
+"""
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import List, Optional
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lower-cased words of a text, accents removed"""
+    if not text:
+        return []
+    text = str(text).lower()
+    if text.isascii():
+        return _WORD.findall(text)
+    folded = unicodedata.normalize("NFKD", text)
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return _WORD.findall(folded)
+
+
+def fts_query(query: str) -> Optional[str]:
+    """FTS5 MATCH expression requiring a prefix match for every word, None if the query has no words"""
+    words = tokenize(query)
+    if not words:
+        return None
+    # Words hold letters and digits only, so quoting them is enough to keep FTS5 syntax out
+    return " AND ".join(f'"{word}"*' for word in words)
+
+
+class StudentSearchIndex:
+    """
+    Sorted (word, student row) pairs over a read snapshot's students: the
+    rows matching a prefix are one bisect away. Rows are positions in the
+    snapshot's StudentTable.
+    """
+
+    def __init__(self, snapshot):
+        classes = snapshot.classes
+        students = snapshot.students
+        class_words = {
+            class_id: tokenize(classes.names[position]) for class_id, position in classes.positions.items()
+        }
+
+        entries = []
+        for row in range(len(students.ids)):
+            words = set(tokenize(students.roll_numbers[row]))
+            words.update(tokenize(students.names[row]))
+            words.update(class_words.get(students.class_ids[row], ()))
+            entries.extend((word, row) for word in words)
+        entries.sort()
+
+        self.words = [word for word, _ in entries]
+        self.rows = array("l", (row for _, row in entries))
+        self.student_ids = students.ids
+
+    def _prefix_rows(self, prefix: str) -> set:
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + "\U0010ffff", start)
+        return set(self.rows[start:end])
+
+    def search(self, query: str) -> List[int]:
+        """Rows matching every word of the query, in student id order"""
+        words = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not words:
+            return []
+        # Longest words first: they match the fewest rows
+        matches = self._prefix_rows(words[0])
+        for word in words[1:]:
+            if not matches:
+                break
+            matches &= self._prefix_rows(word)
+        return sorted(matches, key=self.student_ids.__getitem__)
@@ -0,0 +1,173 @@
+"""
+Uploaded files, without holding large ones in memory.
+
+spool_upload takes over the file Starlette spooled an upload to while
+parsing the form: up to UPLOAD_SPOOL_BYTES parsers get its bytes, past that
+the path of a temporary file holding it (picklable, so parsing processes
+open the file themselves instead of receiving its bytes). Size limits are
+checked as data arrives: UploadLimitMiddleware refuses multipart request
+bodies over UPLOAD_MAX_BYTES, or over the file limit of the route they are
+sent to, before or while they are received, so the form is never parsed in
+full. Both answer 413.
+"""
+import io
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from .config import settings
+
+# An upload as parsers take it: its bytes, or the path of the file it was spooled to
+UploadSource = Union[bytes, str]
+
+# Bytes copied at a time
+UPLOAD_CHUNK = 1024 * 1024
+
+# Allowance over a route's file limit for the rest of the form (part headers, other fields)
+FORM_OVERHEAD = 64 * 1024
+
+
+def open_source(source: UploadSource) -> BinaryIO:
+    """A binary file object reading the upload; the caller closes it"""
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    return open(source, "rb")
+
+
+def _format_size(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.3g} MB"
+    if size >= 1024:
+        return f"{size / 1024:.3g} KB"
+    return f"{size} bytes"
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File too large, the limit is {_format_size(limit)}")
+
+
+class SpooledUpload:
+    """An upload held in memory (content) or in a temporary file (path); close() removes the file"""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.size = 0
+        self.content: Optional[bytes] = None
+        self.path: Optional[str] = None
+
+    @property
+    def source(self) -> UploadSource:
+        return self.path if self.path is not None else self.content
+
+    def open(self) -> BinaryIO:
+        return open_source(self.source)
+
+    def close(self) -> None:
+        path, self.path = self.path, None
+        if path is not None:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _size(file: BinaryIO) -> int:
+    file.seek(0, os.SEEK_END)
+    return file.tell()
+
+
+def _copy_to_named_file(file: BinaryIO) -> str:
+    """Path of a new temporary file holding the contents of file; the caller removes it"""
+    file.seek(0)
+    with tempfile.NamedTemporaryFile(prefix="upload-", delete=False) as spool:
+        try:
+            shutil.copyfileobj(file, spool, UPLOAD_CHUNK)
+        except BaseException:
+            spool.close()
+            os.unlink(spool.name)
+            raise
+    return spool.name
+
+
+async def spool_upload(file: UploadFile, max_bytes: int) -> SpooledUpload:
+    """
+    Take over an upload from the file Starlette received it in: its bytes up
+    to UPLOAD_SPOOL_BYTES, a named temporary file beyond (Starlette's own
+    spool file has no name, so it is copied once, in a thread); 413 if it is
+    over max_bytes (0: no limit).
+    """
+    upload = SpooledUpload(file.filename)
+    upload.size = file.size if file.size is not None else await run_in_threadpool(_size, file.file)
+    if max_bytes and upload.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    if upload.size <= settings.UPLOAD_SPOOL_BYTES:
+        await file.seek(0)
+        upload.content = await file.read()
+    else:
+        upload.path = await run_in_threadpool(_copy_to_named_file, file.file)
+    return upload
+
+
+class UploadLimitMiddleware:
+    """
+    Answer 413 to multipart request bodies over UPLOAD_MAX_BYTES, or over
+    the file limit of their route plus FORM_OVERHEAD (0: no limit): at once
+    when Content-Length announces one, otherwise as soon as that many bytes
+    have arrived (the route's form parsing stops with the error), so
+    oversized uploads are never received in full. route_limits maps paths to
+    the names of the settings holding their file limits, read per request.
+    """
+
+    def __init__(self, app, route_limits: Optional[Dict[str, str]] = None):
+        self.app = app
+        self.route_limits = route_limits or {}
+
+    def _limits(self, path: str) -> Tuple[int, int]:
+        """Largest body for the path (0: no limit) and the limit to report when it is passed"""
+        body_limit = reported = settings.UPLOAD_MAX_BYTES
+        setting = self.route_limits.get(path.rstrip("/"))
+        file_limit = getattr(settings, setting) if setting is not None else 0
+        if file_limit and (not body_limit or file_limit + FORM_OVERHEAD < body_limit):
+            body_limit, reported = file_limit + FORM_OVERHEAD, file_limit
+        return body_limit, reported
+
+    async def __call__(self, scope, receive, send):
+        limit, reported = self._limits(scope["path"]) if scope["type"] == "http" else (0, 0)
+        if not limit:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit:
+            error = _too_large(reported)
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _too_large(reported)
+            return message
+
+        await self.app(scope, limited_receive, send)
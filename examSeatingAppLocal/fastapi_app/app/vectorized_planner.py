@@ -0,0 +1,132 @@
+import numpy as np
+from typing import List, Dict
+
+
+class VectorizedPlanner:
+    """
+    Array-based seating planner for large what-if runs.
+
+    Students are represented as integer arrays (class index, language code
+    and roll-number sort key) and room assignment is computed per class with
+    cumulative sums instead of appending to per-room dicts one student at a time:
+
+    1. Every room hands out up to ``max_per_class`` seats to each class, in the
+       order classes first appear in the roll-number ordering, until the room
+       is full.
+    2. Students that could not be seated under the cap take the remaining free
+       seats room by room, like the fallback of the standard planner.
+    3. Within a class, students are seated in roll-number order across the
+       rooms it was allotted.
+
+    The result is written back into the room dicts used by ScheduleService
+    (students, class_counts, class_info and language_summary) so it converts
+    to the usual ScheduleResponse shape. Rooms are filled with the same
+    capacity and per-class rules as the standard planner, but the arrangement
+    is not guaranteed to be seat-for-seat identical.
+    """
+
+    NO_LANGUAGE = "No Language"
+
+    @staticmethod
+    def place(all_students: List[Dict], rooms: List[Dict], max_per_class: int) -> None:
+        """Place students (in any order) into empty rooms"""
+        student_count = len(all_students)
+        room_count = len(rooms)
+        if student_count == 0 or room_count == 0:
+            return
+
+        # Sort key: position of each student in roll-number order
+        roll_numbers = np.array([s["rollNumber"] for s in all_students])
+        sort_key = np.argsort(roll_numbers, kind="stable")
+
+        class_ids = np.fromiter((s["classId"] for s in all_students), dtype=np.int64, count=student_count)[sort_key]
+        language_labels, language_code = np.unique(
+            np.array([s["language"] or VectorizedPlanner.NO_LANGUAGE for s in all_students])[sort_key],
+            return_inverse=True,
+        )
+
+        # Class index in order of first appearance in the roll-number ordering
+        unique_ids, first_seen, class_index = np.unique(class_ids, return_index=True, return_inverse=True)
+        appearance = np.argsort(first_seen, kind="stable")
+        remap = np.empty_like(appearance)
+        remap[appearance] = np.arange(len(appearance))
+        class_index = remap[class_index]
+        ordered_class_ids = unique_ids[appearance]
+        class_count = len(ordered_class_ids)
+        class_sizes = np.bincount(class_index, minlength=class_count)
+
+        capacities = np.fromiter((max(room["capacity"], 0) for room in rooms), dtype=np.int64, count=room_count)
+        quota = VectorizedPlanner._allocate_quota(class_sizes, capacities, max_per_class)
+
+        # Rank of each student within its class
+        order_in_class = np.argsort(class_index, kind="stable")
+        class_starts = np.concatenate(([0], np.cumsum(class_sizes)[:-1]))
+        rank_in_class = np.empty(student_count, dtype=np.int64)
+        rank_in_class[order_in_class] = np.arange(student_count) - class_starts[class_index[order_in_class]]
+
+        # Room of each student: position of its in-class rank within the class's cumulative quota.
+        # Rows are offset by class so one searchsorted covers every class.
+        offset = student_count + 1
+        flat_quota = (np.cumsum(quota, axis=1) + (np.arange(class_count) * offset)[:, None]).ravel()
+        room_index = (
+            np.searchsorted(flat_quota, rank_in_class + class_index * offset, side="right")
+            - class_index * room_count
+        )
+
+        class_counts = np.bincount(
+            room_index * class_count + class_index, minlength=room_count * class_count
+        ).reshape(room_count, class_count)
+        language_counts = np.bincount(
+            room_index * len(language_labels) + language_code, minlength=room_count * len(language_labels)
+        ).reshape(room_count, len(language_labels))
+
+        # Stable sort keeps roll-number order within each room
+        room_order = np.argsort(room_index, kind="stable")
+        bounds = np.searchsorted(room_index[room_order], np.arange(room_count + 1))
+        student_positions = sort_key[room_order].tolist()
+
+        display_names = {}
+        for student_data in all_students:
+            display_names.setdefault(student_data["classId"], student_data["className"])
+
+        for position, room in enumerate(rooms):
+            room["students"] = [all_students[i] for i in student_positions[bounds[position]:bounds[position + 1]]]
+
+            for class_position in np.flatnonzero(class_counts[position]).tolist():
+                class_id = int(ordered_class_ids[class_position])
+                seated = int(class_counts[position, class_position])
+                room["class_counts"][class_id] = seated
+
+                # Update class info for the room
+                class_display_name = display_names[class_id]
+                if class_display_name not in room["class_info"]:
+                    room["class_info"][class_display_name] = 0
+                room["class_info"][class_display_name] += seated
+
+            room["language_summary"] = {
+                str(language_labels[code]): int(language_counts[position, code])
+                for code in np.flatnonzero(language_counts[position]).tolist()
+            }
+
+    @staticmethod
+    def _allocate_quota(class_sizes: np.ndarray, capacities: np.ndarray, max_per_class: int) -> np.ndarray:
+        """Return a (classes x rooms) matrix of seats given to each class in each room"""
+        quota = np.zeros((len(class_sizes), len(capacities)), dtype=np.int64)
+        remaining = class_sizes.copy()
+        free = capacities.copy()
+
+        # Capped pass, then a fallback pass that ignores the per-class cap
+        for cap in (max(max_per_class, 0), None):
+            for room in range(len(capacities)):
+                if not remaining.any():
+                    break
+                if free[room] == 0:
+                    continue
+                wanted = remaining if cap is None else np.minimum(remaining, cap)
+                before = np.cumsum(wanted) - wanted
+                granted = np.clip(free[room] - before, 0, wanted)
+                quota[:, room] += granted
+                remaining -= granted
+                free[room] -= granted.sum()
+
+        return quota
@@ -0,0 +1,198 @@
+"""
+Benchmark student extraction from Excel sheets.
+
+    python -m benchmarks.excel_benchmark --rows 50000 --output results.json
+
+A workbook in the bulk import layout (title, header, then each student row
+followed by its date-of-birth row) is generated in memory, with dates of
+birth stored partly as dates and partly as text. Each sheet is read once
+with WorkbookReader; extraction is then timed with ExcelParser and with
+the row-by-row reference extractor below (the implementation ExcelParser
+replaced), and the two results are compared. Results are written as JSON.
+"""
+import argparse
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from openpyxl import Workbook
+
+from app.config import settings
+from app.excel_reader import SheetData, WorkbookReader
+from app.excel_utils import ExcelParser
+from .schedule_benchmark import _git_commit
+
+TEXT_DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y")
+
+
+def generate_workbook(sheets: int, rows: int, text_dates: float, seed: int) -> bytes:
+    """A workbook of `sheets` sheets with `rows` students each"""
+    rng = random.Random(seed)
+    workbook = Workbook(write_only=True)
+    first_birthday = date(2002, 1, 1)
+    for sheet_number in range(sheets):
+        sheet = workbook.create_sheet(f"Sheet{sheet_number + 1}")
+        sheet.append(["ACADEMIC YEAR 2024-2025"])
+        sheet.append([])
+        sheet.append(["S.NO", "REGISTER NO", "NAME", "DEPARTMENT", "SHIFT", "LANGUAGE"])
+        for row in range(rows):
+            sheet.append([
+                row + 1,
+                2100000 + sheet_number * rows + row,
+                f"Student {sheet_number}-{row}",
+                rng.choice(("I BSC CS", "II BCOM", "III BA ENGLISH", "I MSC MATHS")),
+                rng.choice(("I", "II")),
+                rng.choice(("TAMIL", "HINDI", "FRENCH")),
+            ])
+            birthday = first_birthday + timedelta(days=rng.randrange(5 * 365))
+            if rng.random() < text_dates:
+                sheet.append([None, None, birthday.strftime(rng.choice(TEXT_DATE_FORMATS))])
+            else:
+                sheet.append([None, None, datetime(birthday.year, birthday.month, birthday.day)])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def row_by_row_extract(sheet: SheetData) -> List[Dict]:
+    """The row-by-row extraction ExcelParser._extract_students replaced, kept as the reference"""
+    students = []
+    rows = sheet.rows
+    has_language_column = sheet.width > 5
+    if sheet.width < 5:
+        return students
+
+    i = 0
+    while i < len(rows):
+        try:
+            row = rows[i]
+            if row[0] is not None and str(row[0]).replace('.0', '').isdigit():
+                student = {
+                    'serial_no': int(float(row[0])),
+                    'register_number': str(int(float(row[1]))) if row[1] is not None else '',
+                    'name': str(row[2]).strip() if row[2] is not None else '',
+                    'department': str(row[3]).strip() if row[3] is not None else '',
+                    'shift': str(row[4]).strip() if row[4] is not None else '',
+                    'date_of_birth': None
+                }
+                if has_language_column:
+                    student['language'] = str(row[5]).strip() if row[5] is not None else ''
+                else:
+                    student['language'] = ''
+
+                if i + 1 < len(rows):
+                    next_row = rows[i + 1]
+                    if next_row[2] is not None and next_row[0] is None:
+                        dob = next_row[2]
+                        if isinstance(dob, datetime) and pd.Timestamp.min <= dob <= pd.Timestamp.max:
+                            student['date_of_birth'] = dob.strftime('%Y-%m-%d')
+                        else:
+                            try:
+                                parsed_date = pd.to_datetime(str(dob))
+                                student['date_of_birth'] = parsed_date.strftime('%Y-%m-%d')
+                            except:
+                                student['date_of_birth'] = str(dob)
+                        i += 1
+
+                students.append(student)
+        except Exception:
+            pass
+        i += 1
+
+    return students
+
+
+def _time_ms(function, sheets: List[SheetData]) -> Tuple[float, List]:
+    started = time.perf_counter()
+    results = [function(sheet) for sheet in sheets]
+    return round((time.perf_counter() - started) * 1000, 3), results
+
+
+def _summary(values: List[float]) -> Dict:
+    return {"min": min(values), "median": round(statistics.median(values), 3), "max": max(values)}
+
+
+def run_benchmark(sheets: int, rows: int, text_dates: float, repeat: int, seed: int) -> Dict:
+    started = time.perf_counter()
+    content = generate_workbook(sheets, rows, text_dates, seed)
+    generate_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    started = time.perf_counter()
+    with WorkbookReader(content) as workbook:
+        sheet_data = [workbook.read_sheet(name) for name in workbook.sheet_names]
+    read_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    vectorized_runs, row_by_row_runs = [], []
+    identical = True
+    for _ in range(repeat):
+        vectorized_ms, vectorized = _time_ms(ExcelParser._extract_students, sheet_data)
+        row_by_row_ms, reference = _time_ms(row_by_row_extract, sheet_data)
+        vectorized_runs.append(vectorized_ms)
+        row_by_row_runs.append(row_by_row_ms)
+        identical = identical and vectorized == reference
+
+    return {
+        "benchmark": "excel_extract_students",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "api_version": settings.API_VERSION,
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "sheets": sheets,
+        "rows_per_sheet": rows,
+        "text_dates": text_dates,
+        "seed": seed,
+        "repeat": repeat,
+        "workbook_bytes": len(content),
+        "generate_ms": generate_ms,
+        "read_ms": read_ms,
+        "students": sum(len(students) for students in vectorized),
+        "extract_ms": _summary(vectorized_runs),
+        "row_by_row_extract_ms": _summary(row_by_row_runs),
+        "speedup": round(statistics.median(row_by_row_runs) / max(statistics.median(vectorized_runs), 0.001), 2),
+        "identical": identical,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark student extraction from Excel sheets")
+    parser.add_argument("--rows", type=int, default=50000, help="Students per sheet (default: 50000)")
+    parser.add_argument("--sheets", type=int, default=1, help="Sheets in the workbook (default: 1)")
+    parser.add_argument(
+        "--text-dates", type=float, default=0.5, help="Share of dates of birth stored as text (default: 0.5)"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs (default: 3)")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.repeat < 1:
+        sys.exit("--repeat must be at least 1")
+    if args.rows < 1 or args.sheets < 1:
+        sys.exit("--rows and --sheets must be at least 1")
+    if not 0 <= args.text_dates <= 1:
+        sys.exit("--text-dates must be between 0 and 1")
+
+    results = run_benchmark(args.sheets, args.rows, args.text_dates, args.repeat, args.seed)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Benchmark ScheduleService against a synthetic institution.
+
+    python -m benchmarks.schedule_benchmark --preset large --output results.json
+
+The institution is generated into a throwaway SQLite file (with
+--storage memory, that file is then loaded as the in-memory snapshot). Each run times
+schedule_exam end to end (with the result cache cleared) and then each stage
+on its own: load, sort, place and summarise. Peak memory is measured in a
+separate run under tracemalloc so it does not distort the timings. Results
+are written as JSON to compare runs across versions.
+"""
+import argparse
+import dataclasses
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
+
+from app.config import settings
+from app.database import init_database
+from app.models import ScheduleRequest
+from app.schedule_cache import ScheduleCache
+from app.repository import STORAGE_BACKENDS, close_repository, get_repository
+from app.services import ScheduleService
+from .synthetic import InstitutionSpec, PRESETS, generate_institution
+
+STAGES = ("total_ms", "load_ms", "sort_ms", "place_ms", "summarise_ms")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _max_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_once(data: ScheduleRequest) -> Dict:
+    """Time one end-to-end schedule and one stage-by-stage schedule"""
+    ScheduleCache.clear()
+    started = time.perf_counter()
+    ScheduleService.schedule_exam(data)
+    total_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    with get_repository().schedule_loader() as loader:
+        loaded = loader.load(data)
+    timings = {}
+    ScheduleService.plan_schedule(data, loaded, timings)
+
+    return {
+        "total_ms": total_ms,
+        "load_ms": loaded["load_stats"]["load_time_ms"],
+        "load_query_count": loaded["load_stats"]["query_count"],
+        **timings,
+    }
+
+
+def measure_memory(data: ScheduleRequest) -> Dict:
+    ScheduleCache.clear()
+    tracemalloc.start()
+    try:
+        ScheduleService.schedule_exam(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    ScheduleCache.clear()
+
+    return {"tracemalloc_peak_bytes": peak, "max_rss_kb": _max_rss_kb()}
+
+
+def summarise(runs: List[Dict]) -> Dict:
+    return {
+        stage: {
+            "min": min(run[stage] for run in runs),
+            "median": round(statistics.median(run[stage] for run in runs), 3),
+            "max": max(run[stage] for run in runs),
+        }
+        for stage in STAGES
+    }
+
+
+def run_benchmark(spec: InstitutionSpec, mode: str, split: bool, repeat: int, db_path: str, storage: str = "sqlite") -> Dict:
+    settings.STORAGE_BACKEND = "sqlite"
+    settings.DATABASE_PATH = db_path
+    init_database()
+
+    started = time.perf_counter()
+    ids = generate_institution(db_path, spec)
+    generate_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    if storage == "memory":
+        settings.STORAGE_BACKEND = "memory"
+        settings.MEMORY_SNAPSHOT_PATH = db_path
+
+    data = ScheduleRequest(
+        date="benchmark",
+        classes=ids["class_ids"],
+        exam_rooms=ids["room_ids"],
+        split=split,
+        mode=mode,
+    )
+
+    try:
+        runs = [run_once(data) for _ in range(repeat)]
+        memory = measure_memory(data)
+    finally:
+        close_repository()
+
+    return {
+        "benchmark": "schedule_exam",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "api_version": settings.API_VERSION,
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "spec": spec.to_dict(),
+        "storage": storage,
+        "mode": mode,
+        "split": split,
+        "repeat": repeat,
+        "generate_ms": generate_ms,
+        "runs": runs,
+        "summary": summarise(runs),
+        "memory": memory,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark exam scheduling on a synthetic institution")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="medium")
+    parser.add_argument("--classes", type=int, help="Override the preset's class count")
+    parser.add_argument("--students", type=int, help="Override the preset's student count")
+    parser.add_argument("--languages", type=int, help="Override the preset's language count")
+    parser.add_argument("--rooms", type=int, help="Override the preset's room count")
+    parser.add_argument("--seed", type=int, help="Override the preset's random seed")
+    parser.add_argument("--mode", choices=ScheduleService.SCHEDULE_MODES, default="standard")
+    parser.add_argument("--split", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--storage", choices=STORAGE_BACKENDS, default="sqlite")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs (default: 3)")
+    parser.add_argument("--db", help="SQLite file to generate into (default: a temporary file, removed afterwards)")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.repeat < 1:
+        sys.exit("--repeat must be at least 1")
+
+    overrides = {
+        field: getattr(args, field)
+        for field in ("classes", "students", "languages", "rooms", "seed")
+        if getattr(args, field) is not None
+    }
+    spec = dataclasses.replace(PRESETS[args.preset], **overrides)
+
+    if args.db:
+        if os.path.exists(args.db):
+            sys.exit(f"{args.db} already exists; the benchmark needs a fresh database")
+        results = run_benchmark(spec, args.mode, args.split, args.repeat, args.db, args.storage)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results = run_benchmark(spec, args.mode, args.split, args.repeat, os.path.join(tmp_dir, "benchmark.db"), args.storage)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
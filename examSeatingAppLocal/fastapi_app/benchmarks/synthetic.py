@@ -0,0 +1,99 @@
+import math
+import random
+import sqlite3
+from dataclasses import dataclass, asdict
+from typing import Dict
+from app.config import settings
+
+
+@dataclass
+class InstitutionSpec:
+    """Size of a generated institution"""
+
+    classes: int = 200
+    students: int = 10000
+    languages: int = 4
+    rooms: int = 200
+    capacity_slack: float = 1.2  # Total room capacity / student count
+    layout_ratio: float = 0.5  # Share of rooms with a configured seat grid
+    missing_language_ratio: float = 0.02  # Share of students without a language
+    seed: int = 42
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def generate_institution(db_path: str, spec: InstitutionSpec) -> Dict:
+    """
+    Fill an initialised database with synthetic classes, students and rooms.
+
+    Students are spread evenly over the classes, rooms share the total
+    capacity evenly (capacity_slack above the student count). Returns the ids
+    of the created classes and rooms.
+    """
+    if spec.classes < 1 or spec.rooms < 1:
+        raise ValueError("At least one class and one room are required")
+
+    rng = random.Random(spec.seed)
+    languages = [f"LANG{index}" for index in range(spec.languages)]
+    shifts = ["I", "II"]
+
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+
+        cursor.executemany(
+            "INSERT INTO classes (className, shift) VALUES (?, ?)",
+            [(f"CLS{index:04d}", shifts[index % len(shifts)]) for index in range(spec.classes)],
+        )
+        cursor.execute("SELECT id FROM classes ORDER BY id DESC LIMIT ?", (spec.classes,))
+        class_ids = sorted(row[0] for row in cursor.fetchall())
+
+        student_rows = []
+        for number in range(spec.students):
+            class_id = class_ids[number % spec.classes]
+            if not languages or rng.random() < spec.missing_language_ratio:
+                language = None
+            else:
+                language = rng.choice(languages)
+            student_rows.append((f"R{class_id:04d}{number:07d}", f"Student {number}", language, class_id))
+        cursor.executemany(
+            "INSERT INTO students (rollNumber, studentName, language, classId) VALUES (?, ?, ?, ?)",
+            student_rows,
+        )
+
+        capacity = max(1, math.ceil(spec.students * spec.capacity_slack / spec.rooms))
+        benches_per_row = settings.DEFAULT_BENCHES_PER_ROW
+        seats_per_bench = settings.DEFAULT_SEATS_PER_BENCH
+        columns = benches_per_row * seats_per_bench
+        room_rows = []
+        for index in range(spec.rooms):
+            if rng.random() < spec.layout_ratio:
+                layout = (math.ceil(capacity / columns), benches_per_row, seats_per_bench)
+            else:
+                layout = (None, None, None)
+            room_rows.append((f"BR{index:05d}", capacity, str(index % 5), f"B{index % 10}", *layout))
+        cursor.executemany(
+            """
+            INSERT INTO examRooms (roomNumber, roomCapacity, roomFloor, roomBuilding,
+                                   roomRows, benchesPerRow, seatsPerBench)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+            room_rows,
+        )
+        cursor.execute("SELECT id FROM examRooms ORDER BY id DESC LIMIT ?", (spec.rooms,))
+        room_ids = sorted(row[0] for row in cursor.fetchall())
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    return {"class_ids": class_ids, "room_ids": room_ids}
+
+
+# Named sizes for quick comparisons; "large" is the biggest institution we plan for
+PRESETS = {
+    "small": InstitutionSpec(classes=20, students=1000, languages=3, rooms=25),
+    "medium": InstitutionSpec(classes=200, students=10000, languages=4, rooms=200),
+    "large": InstitutionSpec(classes=1000, students=100000, languages=6, rooms=2000),
+}